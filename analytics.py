@@ -0,0 +1,204 @@
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from models import Assignment, Employee, ShiftDefinition, WeeklySummary
+from snapshot import ShiftSnapshot
+from conflicts import ConflictGraph, HISTORY_DAYS
+
+# Friday and Saturday (date.weekday() numbering) make up the weekend
+WEEKEND_WEEKDAYS = (4, 5)
+
+
+# ==========================================
+#   Materialized weekly summary maintenance
+# ==========================================
+
+def _count_rest_gaps(session, workplace_id, week_start, num_days):
+    """
+    Counts short rests per (employee, shift) inside the week: pairs of worked shifts that are
+    edges of the workplace's conflict graph, including transitions from the end of the
+    previous week (live or archived). Only the planning window is scanned, so this stays cheap.
+    """
+    shifts = [ShiftSnapshot.from_orm(s) for s in session.query(ShiftDefinition).filter(
+        ShiftDefinition.workplace_id == workplace_id).order_by(ShiftDefinition.id)]
+    graph = ConflictGraph(shifts, num_days)
+    rows = session.query(Assignment.employee_id, Assignment.shift_id, Assignment.date).filter(
+        Assignment.workplace_id == workplace_id,
+        Assignment.date >= week_start - timedelta(days=HISTORY_DAYS),
+        Assignment.date < week_start + timedelta(days=num_days),
+    ).all()
+
+    # The previous week's last days may already be archived (history_archive imports this module)
+    from history_archive import iter_archived_cells
+    rows += [(emp_id, shift_id, day) for _, emp_id, day, shift_id in iter_archived_cells(
+        session, workplace_id, week_start - timedelta(days=HISTORY_DAYS), week_start + timedelta(days=num_days))]
+
+    cells_by_emp = defaultdict(set)
+    for emp_id, shift_id, day in rows:
+        cells_by_emp[emp_id].add(((day - week_start).days, shift_id))
+
+    gaps = defaultdict(int)
+    for emp_id, cells in cells_by_emp.items():
+        for c in graph.conflicts:
+            # Gaps are attributed to the later shift, which always falls inside the week
+            if c.second in cells and c.first in cells:
+                gaps[(emp_id, c.second[1])] += 1
+    return gaps
+
+
+def refresh_weekly_summary(session: Session, workplace_id: int, week_start, num_days=7):
+    """
+    Recomputes the summary rows of one workplace/week from the assignments table.
+    Called by save_results_to_db after every solve, so dashboards never rescan history.
+    The caller owns the transaction (no commit here).
+    """
+    week_end = week_start + timedelta(days=num_days)
+    weekend_dates = [week_start + timedelta(days=d) for d in range(num_days)
+                     if (week_start + timedelta(days=d)).weekday() in WEEKEND_WEEKDAYS]
+
+    # 1. Aggregate the week's assignments in SQL
+    counts = session.query(
+        Assignment.employee_id,
+        Assignment.shift_id,
+        func.count(Assignment.id),
+        func.sum(case((Assignment.date.in_(weekend_dates), 1), else_=0)),
+    ).filter(
+        Assignment.workplace_id == workplace_id,
+        Assignment.date >= week_start,
+        Assignment.date < week_end,
+    ).group_by(Assignment.employee_id, Assignment.shift_id).all()
+
+    gaps = _count_rest_gaps(session, workplace_id, week_start, num_days)
+
+    # 2. Replace the week's summary rows
+    session.query(WeeklySummary).filter(
+        WeeklySummary.workplace_id == workplace_id,
+        WeeklySummary.week_start == week_start,
+    ).delete(synchronize_session=False)
+
+    session.bulk_insert_mappings(WeeklySummary, [
+        {
+            "workplace_id": workplace_id,
+            "employee_id": emp_id,
+            "shift_id": shift_id,
+            "week_start": week_start,
+            "num_shifts": num_shifts,
+            "num_weekend_shifts": num_weekend or 0,
+            "num_rest_gaps": gaps.get((emp_id, shift_id), 0),
+        }
+        for emp_id, shift_id, num_shifts, num_weekend in counts
+    ])
+
+
+def rebuild_weekly_summaries(session: Session, workplace_id: int, first_day_of_week=6):
+    """
+    Backfills the summary table for every week that has assignments (one-off migration).
+    :param first_day_of_week: date.weekday() of the week start (6 = Sunday)
+    """
+    dates = [d for (d,) in session.query(Assignment.date).filter(
+        Assignment.workplace_id == workplace_id).distinct()]
+    week_starts = {d - timedelta(days=(d.weekday() - first_day_of_week) % 7) for d in dates}
+    for week_start in sorted(week_starts):
+        refresh_weekly_summary(session, workplace_id, week_start)
+    session.commit()
+    return len(week_starts)
+
+
+# ==========================================
+#   Queries (GROUP BY over the summary table)
+# ==========================================
+
+def employee_shift_counts(session: Session, workplace_id: int, start_date, end_date):
+    """
+    Per-employee, per-shift-type totals for weeks starting in [start_date, end_date).
+    Answers e.g. "how many nights did each employee work over the last quarter".
+    :return: List of dicts sorted by employee and shift
+    """
+    rows = session.query(
+        Employee.id, Employee.name, ShiftDefinition.id, ShiftDefinition.shift_name,
+        func.sum(WeeklySummary.num_shifts),
+        func.sum(WeeklySummary.num_weekend_shifts),
+        func.sum(WeeklySummary.num_rest_gaps),
+    ).join(Employee, Employee.id == WeeklySummary.employee_id
+    ).join(ShiftDefinition, ShiftDefinition.id == WeeklySummary.shift_id
+    ).filter(
+        WeeklySummary.workplace_id == workplace_id,
+        WeeklySummary.week_start >= start_date,
+        WeeklySummary.week_start < end_date,
+    ).group_by(Employee.id, Employee.name, ShiftDefinition.id, ShiftDefinition.shift_name
+    ).order_by(Employee.id, ShiftDefinition.id).all()
+
+    return [
+        {
+            "employee_id": emp_id,
+            "employee_name": emp_name,
+            "shift_id": shift_id,
+            "shift_name": shift_name,
+            "shifts": int(shifts or 0),
+            "weekend_shifts": int(weekend or 0),
+            "rest_gaps": int(gaps or 0),
+        }
+        for emp_id, emp_name, shift_id, shift_name, shifts, weekend, gaps in rows
+    ]
+
+
+def employee_totals(session: Session, workplace_id: int, start_date, end_date):
+    """Per-employee totals (all shift types) for weeks starting in [start_date, end_date)."""
+    rows = session.query(
+        Employee.id, Employee.name,
+        func.sum(WeeklySummary.num_shifts),
+        func.sum(WeeklySummary.num_weekend_shifts),
+        func.sum(WeeklySummary.num_rest_gaps),
+        func.count(func.distinct(WeeklySummary.week_start)),
+    ).join(Employee, Employee.id == WeeklySummary.employee_id
+    ).filter(
+        WeeklySummary.workplace_id == workplace_id,
+        WeeklySummary.week_start >= start_date,
+        WeeklySummary.week_start < end_date,
+    ).group_by(Employee.id, Employee.name).order_by(Employee.id).all()
+
+    return [
+        {
+            "employee_id": emp_id,
+            "employee_name": emp_name,
+            "shifts": int(shifts or 0),
+            "weekend_shifts": int(weekend or 0),
+            "rest_gaps": int(gaps or 0),
+            "weeks_worked": int(weeks or 0),
+        }
+        for emp_id, emp_name, shifts, weekend, gaps, weeks in rows
+    ]
+
+
+def jain_index(values):
+    """
+    Jain's fairness index: 1.0 when everyone carries the same load, 1/n when one person carries it all.
+    """
+    values = list(values)
+    squares = sum(v * v for v in values)
+    if not values or squares == 0:
+        return 1.0
+    return sum(values) ** 2 / (len(values) * squares)
+
+
+def fairness_report(session: Session, workplace_id: int, start_date, end_date):
+    """
+    Fairness indices over the active employees of the workplace, for total load,
+    weekend load and each shift type. Employees with no shifts count as zero load.
+    """
+    employee_ids = [e_id for (e_id,) in session.query(Employee.id).filter(
+        Employee.workplace_id == workplace_id, Employee.is_active.is_(True))]
+
+    totals = {row["employee_id"]: row for row in employee_totals(session, workplace_id, start_date, end_date)}
+    per_shift = defaultdict(dict)
+    for row in employee_shift_counts(session, workplace_id, start_date, end_date):
+        per_shift[row["shift_name"]][row["employee_id"]] = row["shifts"]
+
+    report = {
+        "total_shifts": jain_index(totals[e]["shifts"] if e in totals else 0 for e in employee_ids),
+        "weekend_shifts": jain_index(totals[e]["weekend_shifts"] if e in totals else 0 for e in employee_ids),
+    }
+    for shift_name, counts in per_shift.items():
+        report[f"shift:{shift_name}"] = jain_index(counts.get(e, 0) for e in employee_ids)
+    return report
@@ -0,0 +1,225 @@
+import csv
+import math
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from models import Workplace, Employee, ShiftDefinition, SharedEmployee, WeeklyConstraint, ConstraintType
+
+# One availability entry per row. Column names are case-insensitive:
+#   employee  employee id or name
+#   date      YYYY-MM-DD (or a date cell)  -- or --  day: index 0..num_days-1 from the week start
+#   shift     shift id or shift_name
+#   type      cannot_work (default) / must_work / prefer_not / prefer_yes
+REQUIRED_COLUMNS = ("employee", "shift")
+MAX_REPORTED_ERRORS = 50
+
+
+class AvailabilityError(ValueError):
+    """The file did not validate; nothing was written. errors: list of (row number, message)."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        shown = "; ".join(f"row {row}: {message}" for row, message in errors[:5])
+        more = f" (+{len(errors) - 5} more)" if len(errors) > 5 else ""
+        super().__init__(f"{len(errors)} invalid availability row(s): {shown}{more}")
+
+
+# ==========================================
+#   Readers (streaming, row dicts with lower-case keys)
+# ==========================================
+
+def _rows_from_header(rows):
+    header = None
+    for number, values in enumerate(rows, start=1):
+        if header is None:
+            header = [str(v).strip().lower() if v is not None else "" for v in values]
+            continue
+        if all(v is None or str(v).strip() == "" for v in values):
+            continue  # Blank line
+        yield number, dict(zip(header, values))
+
+
+def iter_xlsx_rows(path, sheet=None):
+    """Streams the rows of a workbook in openpyxl read-only mode (constant memory)."""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.active
+        yield from _rows_from_header(ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+
+def iter_csv_rows(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from _rows_from_header(csv.reader(f))
+
+
+def read_availability(path, sheet=None):
+    """Picks the reader by file extension (.xlsx/.xlsm or .csv)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        return iter_xlsx_rows(path, sheet)
+    if extension == ".csv":
+        return iter_csv_rows(path)
+    raise ValueError(f"Unsupported availability file '{path}' (expected .xlsx or .csv).")
+
+
+# ==========================================
+#   Validation
+# ==========================================
+
+_AMBIGUOUS = object()  # Name shared by several records in a _name_index
+
+
+def _name_index(pairs):
+    """name -> id for (id, name) pairs; a name used more than once maps to _AMBIGUOUS."""
+    index = {}
+    for record_id, name in pairs:
+        index[name] = _AMBIGUOUS if name in index else record_id
+    return index
+
+
+def _lookup(value, by_id, by_name):
+    """Resolves a cell holding an id (int or numeric text) or a unique name."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) and int(value) == value:
+        return by_id.get(int(value))
+    text = str(value).strip()
+    if text.isdigit() and int(text) in by_id:
+        return by_id[int(text)]
+    found = by_name.get(text)
+    if found is _AMBIGUOUS:
+        raise ValueError(f"name '{text}' matches several records, use the id instead")
+    return found
+
+
+def _parse_date(row, start_date, num_days):
+    value = row.get("date")
+    if value not in (None, ""):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(str(value).strip())
+    day = row.get("day")
+    if day in (None, ""):
+        raise ValueError("needs a 'date' or 'day' value")
+    try:
+        offset = float(str(day).strip())
+    except ValueError:
+        raise ValueError(f"day '{day}' is not a number") from None
+    # Checked before int()/timedelta, which raise OverflowError on inf or huge values
+    if not math.isfinite(offset) or not 0 <= offset < num_days:
+        raise ValueError(f"day '{day}' outside the planning window 0..{num_days - 1}")
+    if offset != int(offset):
+        raise ValueError(f"day '{day}' is not a whole number")
+    return start_date + timedelta(days=int(offset))
+
+
+def parse_availability(session: Session, workplace_id, start_date, rows):
+    """
+    Validates availability rows against the workplace's employees (home and shared),
+    its ShiftDefinitions and the planning window.
+    :return: (list of WeeklyConstraint mappings, list of (row number, error))
+    """
+    workplace = session.get(Workplace, workplace_id)
+    if workplace is None:
+        raise ValueError(f"Workplace {workplace_id} not found.")
+    end_date = start_date + timedelta(days=workplace.num_days_in_cycle)
+
+    # 1. Lookup tables (three queries, whatever the file size)
+    employees = (
+        session.query(Employee.id, Employee.name)
+        .outerjoin(SharedEmployee, SharedEmployee.employee_id == Employee.id)
+        .filter((Employee.workplace_id == workplace_id) | (SharedEmployee.workplace_id == workplace_id))
+        .distinct()
+        .all()
+    )
+    emp_by_id = {emp_id: emp_id for emp_id, _ in employees}
+    emp_by_name = _name_index(employees)
+    shifts = session.query(ShiftDefinition.id, ShiftDefinition.shift_name).filter(
+        ShiftDefinition.workplace_id == workplace_id).all()
+    shift_by_id = {s_id: s_id for s_id, _ in shifts}
+    shift_by_name = _name_index(shifts)
+    kinds = {kind.value: kind for kind in ConstraintType}
+
+    # 2. Row by row; keep going to report every problem at once
+    entries, errors = {}, []
+    for number, row in rows:
+        try:
+            missing = [column for column in REQUIRED_COLUMNS if row.get(column) in (None, "")]
+            if missing:
+                raise ValueError(f"missing {', '.join(missing)}")
+            emp_id = _lookup(row["employee"], emp_by_id, emp_by_name)
+            if emp_id is None:
+                raise ValueError(f"unknown employee '{row['employee']}' for this workplace")
+            shift_id = _lookup(row["shift"], shift_by_id, shift_by_name)
+            if shift_id is None:
+                raise ValueError(f"unknown shift '{row['shift']}' for this workplace")
+            day = _parse_date(row, start_date, workplace.num_days_in_cycle)
+            if not start_date <= day < end_date:
+                raise ValueError(f"date {day} outside the planning window {start_date}..{end_date - timedelta(days=1)}")
+            kind_name = str(row.get("type") or ConstraintType.CANNOT_WORK.value).strip().lower()
+            if kind_name not in kinds:
+                raise ValueError(f"unknown type '{kind_name}' (expected one of {', '.join(kinds)})")
+        except ValueError as e:
+            errors.append((number, str(e)))
+            if len(errors) >= MAX_REPORTED_ERRORS:
+                break
+            continue
+
+        key = (emp_id, day, shift_id)
+        if key in entries and entries[key]["constraint_type"] != kinds[kind_name]:
+            errors.append((number, f"conflicting types for employee {emp_id}, {day}, shift {shift_id}"))
+            continue
+        entries[key] = {"employee_id": emp_id, "shift_id": shift_id, "date": day,
+                        "constraint_type": kinds[kind_name]}
+
+    return list(entries.values()), errors
+
+
+# ==========================================
+#   Import
+# ==========================================
+
+def import_availability(session: Session, workplace_id, start_date, rows):
+    """
+    Validates and stores availability for one workplace/week in a single transaction.
+    For every employee in the file, their existing WeeklyConstraint rows for this
+    workplace's shifts in the window are replaced by the file's rows; other employees
+    are left untouched. Nothing is written when any row is invalid.
+    :param rows: (row number, dict) pairs, e.g. from read_availability
+    :return: Dict with the number of employees, inserted and replaced rows
+    """
+    entries, errors = parse_availability(session, workplace_id, start_date, rows)
+    if errors:
+        raise AvailabilityError(errors)
+
+    workplace = session.get(Workplace, workplace_id)
+    end_date = start_date + timedelta(days=workplace.num_days_in_cycle)
+    employee_ids = sorted({entry["employee_id"] for entry in entries})
+    shift_ids = session.query(ShiftDefinition.id).filter(ShiftDefinition.workplace_id == workplace_id)
+
+    try:
+        replaced = 0
+        if employee_ids:
+            replaced = session.query(WeeklyConstraint).filter(
+                WeeklyConstraint.employee_id.in_(employee_ids),
+                WeeklyConstraint.shift_id.in_(shift_ids.scalar_subquery()),
+                WeeklyConstraint.date >= start_date,
+                WeeklyConstraint.date < end_date,
+            ).delete(synchronize_session=False)
+        if entries:
+            # One executemany instead of an ORM object per row
+            session.execute(insert(WeeklyConstraint), entries)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    return {"employees": len(employee_ids), "inserted": len(entries), "replaced": replaced}
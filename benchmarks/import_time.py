@@ -0,0 +1,83 @@
+"""
+Cold-start benchmark for the main.py CLI commands.
+
+Runs every command in a fresh interpreter against a throw-away seeded database
+and reports the median wall time plus the import time measured by `-X importtime`.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    "help": ["--help"],
+    "list-workplaces": ["list-workplaces"],
+    "export": ["export"],
+    "solve": ["solve"],
+}
+
+# Heavy third-party packages whose presence we report per command
+HEAVY_MODULES = ("ortools", "sqlalchemy", "openpyxl", "numpy", "cv2")
+
+
+def _run(args, workdir, importtime=False):
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += [os.path.join(REPO_DIR, "main.py")] + args
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True)
+    return time.perf_counter() - start, proc
+
+
+def _parse_importtime(stderr):
+    """Sums the cumulative time of top-level imports and lists loaded heavy packages."""
+    total_us = 0
+    heavy = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # Format: "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative, name = line[len("import time:"):].split("|")
+        root = name.strip().split(".")[0]
+        if root in HEAVY_MODULES:
+            heavy.add(root)
+        if not name[1:].startswith(" "):  # Nested imports are indented further
+            total_us += int(cumulative)
+    return total_us / 1000.0, sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="auto_shift_bench_")
+    try:
+        # Seed a scratch database and solve one week so every command has real data to work on
+        subprocess.run([sys.executable, os.path.join(REPO_DIR, "seed.py")], cwd=workdir,
+                       env=dict(os.environ, PYTHONPATH=REPO_DIR), capture_output=True, check=True)
+        _run(COMMANDS["solve"], workdir)
+
+        print(f"{'command':<18}{'median wall (ms)':>18}{'imports (ms)':>15}  heavy modules loaded")
+        for name, cmd_args in COMMANDS.items():
+            timings = [_run(cmd_args, workdir)[0] for _ in range(args.repeat)]
+            _, proc = _run(cmd_args, workdir, importtime=True)
+            import_ms, heavy = _parse_importtime(proc.stderr)
+            print(f"{name:<18}{statistics.median(timings) * 1000:>18.1f}{import_ms:>15.1f}  {', '.join(heavy) or '-'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
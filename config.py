@@ -8,6 +8,24 @@ from typing import List, Tuple, Optional
 ENABLE_IMAGE_PARSING = False
 IMAGE_FILENAME = "images/image3.png"
 
+# Dump every solve's input snapshot, CP-SAT model and parameters for offline replay
+CAPTURE_INSTANCES = False
+CAPTURE_DIR = "captures"
+
+# Generated Excel reports, cached by content hash (least recently used evicted above the size bound)
+REPORT_CACHE_DIR = "reports"
+REPORT_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Assignment rows older than this many weeks before the current one are packed into
+# per-employee weekly bitmaps by 'python main.py archive' (history_archive.py)
+ARCHIVE_KEEP_WEEKS = 4
+
+# Durable solve queue (job_queue.py / worker.py): a worker heartbeats every third of the lease;
+# a job whose lease runs out is retried up to JOB_MAX_ATTEMPTS times in total
+JOB_LEASE_SECONDS = 120
+JOB_MAX_ATTEMPTS = 3
+WORKER_POLL_SECONDS = 5
+
 # ==========================================
 #         Shift Rules & Weights
 # ==========================================
@@ -15,6 +33,14 @@ NUM_DAYS = 7
 NUM_SHIFTS = 3
 SHIFTS_PER_DAY_DEMAND = 2
 
+# Shift times (ShiftDefinition.start_time / duration_minutes). Shifts without times tile the
+# day in id order from this hour: 3 shifts -> 07-15, 15-23, 23-07.
+DEFAULT_DAY_START_HOUR = 7
+# Rest between two worked shifts: below MIN_REST_HOURS is forbidden, below SHORT_REST_HOURS
+# is penalized with the rest_gap weight (see conflicts.py)
+MIN_REST_HOURS = 8
+SHORT_REST_HOURS = 12
+
 # Optimization Weights
 WEIGHTS = {
     'TARGET_SHIFTS': 40,
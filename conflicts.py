@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Set, Tuple
+
+import config
+
+MINUTES_PER_DAY = 24 * 60
+# Previous-week days that can still conflict with the first days of the week (-1 = last Saturday)
+HISTORY_DAYS = 2
+
+
+@dataclass(frozen=True, slots=True)
+class ShiftWindow:
+    """When a shift runs, in minutes from midnight of the day it starts (end may pass midnight)."""
+    shift_id: int
+    start: int
+    end: int
+
+
+@dataclass(frozen=True, slots=True)
+class Conflict:
+    """
+    Two (day, shift_id) cells one employee should not both work; first starts earlier.
+    first may lie in the previous week (negative day), second always lies in the week.
+    """
+    first: Tuple[int, int]
+    second: Tuple[int, int]
+    rest_minutes: int  # Negative when the shifts overlap
+    hard: bool         # Rest below the minimum: forbidden, otherwise only penalized
+
+
+def _by_site(shifts):
+    """Shifts grouped by owning workplace, in the given order (a pooled input holds several sites)."""
+    sites = {}
+    for s in shifts:
+        sites.setdefault(s.workplace_id, []).append(s)
+    return sites
+
+
+def shift_windows(shifts) -> Dict[int, ShiftWindow]:
+    """
+    Resolves each shift's time window. Shifts without a start time or duration tile their
+    site's day in id order from config.DEFAULT_DAY_START_HOUR (3 shifts: 07-15, 15-23, 23-07),
+    which is the morning/evening/night layout the rules assumed before shifts had times.
+    """
+    windows = {}
+    for site_shifts in _by_site(shifts).values():
+        length = MINUTES_PER_DAY // len(site_shifts)
+        for position, s in enumerate(site_shifts):
+            start = s.start_minute
+            if start is None:
+                start = (config.DEFAULT_DAY_START_HOUR * 60 + position * length) % MINUTES_PER_DAY
+            duration = s.duration_minutes if s.duration_minutes is not None else length
+            windows[s.id] = ShiftWindow(shift_id=s.id, start=start, end=start + duration)
+    return windows
+
+
+def history_cells(state, shifts) -> Set[Tuple[int, int]]:
+    """
+    Maps last week's history flags onto cells before the week: Saturday is day -1 and
+    Friday day -2; 'noon' is the second shift of the day and 'night' the last one, at the
+    employee's home site (state.workplace_id; the first site when unknown).
+    :param state: Anything with the worked_last_* flags (EmployeeSnapshot, config.WeeklyState)
+    """
+    sites = _by_site(shifts)
+    if not sites:
+        return set()
+    home = getattr(state, "workplace_id", None)
+    ids = [s.id for s in sites.get(home) or next(iter(sites.values()))]
+    cells = set()
+    if state.worked_last_sat_noon and len(ids) > 1:
+        cells.add((-1, ids[1]))
+    if state.worked_last_sat_night:
+        cells.add((-1, ids[-1]))
+    if state.worked_last_fri_night:
+        cells.add((-2, ids[-1]))
+    return cells
+
+
+class ConflictGraph:
+    """
+    Sparse graph of the (day, shift) cells that are too close for one employee to work both:
+    the shifts overlap or the rest between them is below short_rest_hours. Edges below
+    min_rest_hours are hard. Pairs on the same day are left out (one shift per day already
+    excludes them), so the graph only holds the day-boundary transitions that actually conflict,
+    including those from the last HISTORY_DAYS days of the previous week.
+    """
+
+    def __init__(self, shifts: Sequence, num_days: int, min_rest_hours=None, short_rest_hours=None):
+        min_rest = (config.MIN_REST_HOURS if min_rest_hours is None else min_rest_hours) * 60
+        short_rest = (config.SHORT_REST_HOURS if short_rest_hours is None else short_rest_hours) * 60
+        short_rest = max(short_rest, min_rest)
+        self.num_days = num_days
+        self.windows = shift_windows(shifts)
+
+        # 1. Conflicting shift pairs by day offset (independent of the week length)
+        self.patterns = []  # (first shift_id, second shift_id, day offset, rest minutes)
+        for a in self.windows.values():
+            for b in self.windows.values():
+                last_offset = (a.end + short_rest - b.start) // MINUTES_PER_DAY
+                for offset in range(1, last_offset + 1):
+                    rest = offset * MINUTES_PER_DAY + b.start - a.end
+                    if rest < short_rest:
+                        self.patterns.append((a.shift_id, b.shift_id, offset, rest))
+
+        # 2. Expanded over the week; the first cell may fall in the previous week
+        self.conflicts: List[Conflict] = []
+        for first_id, second_id, offset, rest in self.patterns:
+            for d in range(max(0, offset - HISTORY_DAYS), num_days):
+                self.conflicts.append(Conflict(first=(d - offset, first_id), second=(d, second_id),
+                                               rest_minutes=rest, hard=rest < min_rest))
+
+    def within_week(self, hard=None):
+        """Conflicts between two cells of the week (optionally only hard or only soft ones)."""
+        return [c for c in self.conflicts if c.first[0] >= 0 and (hard is None or c.hard == hard)]
+
+    def from_history(self, worked_cells):
+        """Conflicts of week cells with cells an employee worked last week (see history_cells)."""
+        if not worked_cells:
+            return []
+        return [c for c in self.conflicts if c.first[0] < 0 and c.first in worked_cells]
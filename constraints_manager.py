@@ -1,86 +1,228 @@
 from ortools.sat.python import cp_model
-from models import Employee, ShiftDefinition, WorkplaceWeights, EmployeeSettings
-from typing import List, Dict
+from snapshot import (EmployeeSnapshot, ShiftSnapshot, WeightsSnapshot, SettingsSnapshot,
+                      ConstraintSnapshot, CANNOT_WORK, MUST_WORK)
+from conflicts import ConflictGraph, history_cells
+from dataclasses import dataclass
+from typing import List, Dict, Sequence, Optional
+
+# Objective term families (also the names used in WorkplaceWeights.priority_order)
+REST_GAP = "rest_gap"
+TARGET_SHIFTS = "target_shifts"
+CONSECUTIVE_NIGHTS = "consecutive_nights"
+
+
+def _is_zero(cell):
+    """True for a cell presolve fixed to 0 (variables are never compared with ==)."""
+    return isinstance(cell, int) and cell == 0
+
+
+@dataclass(frozen=True, slots=True)
+class ObjectiveTerm:
+    """
+    One penalty of the objective: weight * var, tagged with the rule family it belongs to and
+    the employee/day it is charged to (day None = a weekly term), for ShiftOptimizer.penalty_breakdown.
+    var is an int constant when presolve fixed every cell the penalty depends on.
+    """
+    family: str
+    var: object
+    weight: int
+    employee_id: Optional[int] = None
+    day: Optional[int] = None
+
+    @property
+    def expr(self):
+        return self.var * self.weight
 
 
 class ConstraintManager:
-    def __init__(self, model, shift_vars, employees, shifts, weights, num_days=7):
+    """
+    Adds the rules to a model whose shift_vars may hold int constants (0/1) for cells fixed by
+    presolve.py. Constraints that become constant are checked here rather than added, and
+    penalties on fixed cells are simplified; eliminated_* count what never reached the model.
+    """
+
+    def __init__(self, model, shift_vars, employees: Sequence[EmployeeSnapshot], shifts: Sequence[ShiftSnapshot],
+                 weights: WeightsSnapshot, num_days=7, weekly_constraints: Sequence[ConstraintSnapshot] = (),
+                 demand_cells=None, conflicts=None):
         self.model = model
         self.shift_vars = shift_vars
         self.employees = employees
         self.shifts = shifts
         self.weights = weights
         self.num_days = num_days
+        self.weekly_constraints = weekly_constraints
+        self.demand_cells = demand_cells
+        self.objective_terms: List[ObjectiveTerm] = []
+        # Overlapping / short-rest cell pairs, computed once from the shift times
+        self.conflicts = conflicts or ConflictGraph(shifts, num_days)
+        self.eliminated_constraints = 0
+        self.eliminated_variables = 0
+
+        # Handles of constraints whose bounds depend on input data, so a built model
+        # can be re-targeted (e.g. what-if scenarios) without rebuilding it
+        self.demand_constraints = {}        # (day, shift_id) -> ct  (sum == num_staff)
+        self.weekly_limit_constraints = {}  # emp_id -> (max ct, min ct)
+        self.target_constraints = {}        # emp_id -> (over ct, under ct, target)
+
+        # Plain-int keys resolved once; the loops below only index dicts/lists
+        self._emp_ids = [emp.id for emp in employees]
+        self._shift_ids = [s.id for s in shifts]
+        self._emp_shift_vars = {
+            emp_id: [shift_vars[(emp_id, d, s_id)] for d in range(num_days) for s_id in self._shift_ids]
+            for emp_id in self._emp_ids
+        }
 
-    def apply_all_constraints(self, employee_settings: Dict[int, EmployeeSettings], employee_states: Dict[int, any]):
+    def apply_all_constraints(self, employee_settings: Dict[int, SettingsSnapshot], employee_states: Dict[int, any]):
         """
         Main entry point.
-        :param employee_settings: Dictionary mapping employee_id to its settings from DB.
+        :param employee_settings: Dictionary mapping employee_id to its settings snapshot.
         :param employee_states: Dictionary mapping employee_id to its dynamic state (last week history).
         """
         self._add_hard_constraints(employee_settings)
-        return self._get_objective_terms(employee_settings, employee_states)
+        self.objective_terms = self._get_objective_terms(employee_settings, employee_states)
+        return [term.expr for term in self.objective_terms]
+
+    def add(self, constraint):
+        """
+        model.Add for a bounded linear expression that may have collapsed to a bool because all
+        its cells are constants: a true one is dropped, a false one is kept as an empty clause
+        so the solve still reports INFEASIBLE.
+        :return: The linear constraint handle, or None when the constraint folded to a constant
+                 (no bounds left to patch, see scenarios._is_patchable)
+        """
+        if isinstance(constraint, bool):
+            if constraint:
+                self.eliminated_constraints += 1
+            else:
+                self.model.AddBoolOr([])
+            return None
+        return self.model.Add(constraint)
+
+    def objective_by_family(self) -> Dict[str, list]:
+        """Groups the weighted objective expressions by family (call after apply_all_constraints)."""
+        groups = {}
+        for term in self.objective_terms:
+            groups.setdefault(term.family, []).append(term.expr)
+        return groups
 
     def _add_hard_constraints(self, employee_settings):
+        add = self.add
+        shift_vars = self.shift_vars
+        emp_ids = self._emp_ids
+
         # 1. Demand Constraint: Every shift must be filled
         for d in range(self.num_days):
             for s_def in self.shifts:
+                s_id = s_def.id
+                if self.demand_cells is not None and (d, s_id) not in self.demand_cells:
+                    continue  # Covered by another sub-problem
                 # Sum of all employees assigned to this specific shift on this day
-                shift_total = sum(self.shift_vars[(emp.id, d, s_def.id)] for emp in self.employees)
+                shift_total = sum(shift_vars[(emp_id, d, s_id)] for emp_id in emp_ids)
                 # Must equal the required number of staff defined in DB
-                self.model.Add(shift_total == s_def.num_staff)
+                # (presolved cells are constants in the sum, which lowers the demand left for the variables)
+                self.demand_constraints[(d, s_id)] = add(shift_total == s_def.num_staff)
 
         # 2. Daily Limit: One shift per day per employee
-        for emp in self.employees:
+        for emp_id in emp_ids:
             for d in range(self.num_days):
-                self.model.Add(sum(self.shift_vars[(emp.id, d, s.id)] for s in self.shifts) <= 1)
+                add(sum(shift_vars[(emp_id, d, s_id)] for s_id in self._shift_ids) <= 1)
 
         # 3. Weekly Limits (from EmployeeSettings)
-        for emp in self.employees:
-            settings = employee_settings.get(emp.id)
+        for emp_id in emp_ids:
+            settings = employee_settings.get(emp_id)
             if settings:
-                all_emp_shifts = [self.shift_vars[(emp.id, d, s.id)] for d in range(self.num_days) for s in self.shifts]
-                self.model.Add(sum(all_emp_shifts) <= settings.max_shifts_per_week)
-                self.model.Add(sum(all_emp_shifts) >= settings.min_shifts_per_week)
+                all_emp_shifts = self._emp_shift_vars[emp_id]
+                self.weekly_limit_constraints[emp_id] = (
+                    add(sum(all_emp_shifts) <= settings.max_shifts_per_week),
+                    add(sum(all_emp_shifts) >= settings.min_shifts_per_week),
+                )
+
+        # 4. Weekly requests (WeeklyConstraint): absolute blocks and forced shifts
+        for c in self.weekly_constraints:
+            var = shift_vars.get((c.employee_id, c.day, c.shift_id))
+            if var is None:
+                continue  # Inactive employee or a shift/day outside the model
+            if c.kind == CANNOT_WORK:
+                add(var == 0)
+            elif c.kind == MUST_WORK:
+                add(var == 1)
+
+        # 5. Minimum rest: only the cell pairs the conflict graph marks as hard
+        hard_pairs = self.conflicts.within_week(hard=True)
+        for emp in self.employees:
+            emp_id = emp.id
+            for c in hard_pairs:
+                first, second = shift_vars[(emp_id, *c.first)], shift_vars[(emp_id, *c.second)]
+                if _is_zero(first) or _is_zero(second):
+                    self.eliminated_constraints += 1
+                    continue
+                add(first + second <= 1)
+            # Too close to a shift worked at the end of last week
+            for c in self.conflicts.from_history(history_cells(emp, self.shifts)):
+                if c.hard:
+                    add(shift_vars[(emp_id, *c.second)] == 0)
 
     def _get_objective_terms(self, employee_settings, employee_states):
         objective_terms = []
 
         # Mapping to the actual columns in WorkplaceWeights model
         w = {
-            'REST_GAP': self.weights.rest_gap,
-            'TARGET_SHIFTS': self.weights.target_shifts,
-            'CONSECUTIVE': self.weights.consecutive_nights
+            REST_GAP: self.weights.rest_gap,
+            TARGET_SHIFTS: self.weights.target_shifts,
+            CONSECUTIVE_NIGHTS: self.weights.consecutive_nights
         }
 
-        for emp in self.employees:
-            # Note: We use the attributes directly from the Employee model history fields
-            # as defined in models.py
-
-            morning_shift_id = self.shifts[0].id
-            evening_shift_id = self.shifts[1].id if len(self.shifts) > 1 else None
-
-            # 1. History-based constraints (from Employee table fields)
-            if emp.worked_last_sat_noon:  # From models.py
-                # Penalty for working Sunday morning after Saturday noon
-                objective_terms.append(self.shift_vars[(emp.id, 0, morning_shift_id)] * w['REST_GAP'])
+        soft_pairs = self.conflicts.within_week(hard=False)
 
-            if emp.worked_last_sat_night and evening_shift_id:
-                # Penalty for working Sunday evening after Saturday night
-                objective_terms.append(self.shift_vars[(emp.id, 0, evening_shift_id)] * w['REST_GAP'])
+        for emp in self.employees:
+            emp_id = emp.id
+
+            # 1. Short rests (soft edges of the conflict graph), charged to the day the rest ends
+            for c in soft_pairs:
+                first = self.shift_vars[(emp_id, *c.first)]
+                second = self.shift_vars[(emp_id, *c.second)]
+                if isinstance(first, int) or isinstance(second, int):
+                    # A fixed cell: the pair penalty is 0, constant, or linear in the other cell
+                    self.eliminated_variables += 1
+                    self.eliminated_constraints += 2
+                    if not (_is_zero(first) or _is_zero(second)):
+                        other = second if isinstance(first, int) else first
+                        objective_terms.append(ObjectiveTerm(REST_GAP, other, w[REST_GAP], emp_id, c.second[0]))
+                    continue
+                both_working = self.model.NewBoolVar(
+                    f'short_rest_e{emp_id}_d{c.first[0]}s{c.first[1]}_d{c.second[0]}s{c.second[1]}')
+                self.model.AddBoolAnd([first, second]).OnlyEnforceIf(both_working)
+                self.model.AddBoolOr([first.Not(), second.Not()]).OnlyEnforceIf(both_working.Not())
+                objective_terms.append(ObjectiveTerm(REST_GAP, both_working, w[REST_GAP], emp_id, c.second[0]))
+
+            # History-based: short rest after a shift worked at the end of last week
+            for c in self.conflicts.from_history(history_cells(emp, self.shifts)):
+                var = self.shift_vars[(emp_id, *c.second)]
+                if not c.hard and not _is_zero(var):
+                    objective_terms.append(ObjectiveTerm(REST_GAP, var, w[REST_GAP], emp_id, c.second[0]))
 
             # 2. Target Shifts Delta calculation
-            settings = employee_settings.get(emp.id)
+            settings = employee_settings.get(emp_id)
             if settings:
                 # Use the logic: target is halfway between min and max from EmployeeSettings
                 target = (settings.min_shifts_per_week + settings.max_shifts_per_week) // 2
 
-                all_emp_shifts = [self.shift_vars[(emp.id, d, s.id)] for d in range(self.num_days) for s in self.shifts]
-                total_worked = sum(all_emp_shifts)
-
-                delta = self.model.NewIntVar(0, self.num_days, f'delta_target_e{emp.id}')
-                self.model.Add(total_worked - target <= delta)
-                self.model.Add(target - total_worked <= delta)
-                objective_terms.append(delta * w['TARGET_SHIFTS'])
-
-        return objective_terms
\ No newline at end of file
+                total_worked = sum(self._emp_shift_vars[emp_id])
+                if isinstance(total_worked, int):
+                    # Every cell fixed: the deviation is a constant
+                    self.eliminated_variables += 1
+                    self.eliminated_constraints += 2
+                    if total_worked != target:
+                        objective_terms.append(ObjectiveTerm(TARGET_SHIFTS, abs(total_worked - target),
+                                                             w[TARGET_SHIFTS], emp_id))
+                    continue
+
+                delta = self.model.NewIntVar(0, self.num_days, f'delta_target_e{emp_id}')
+                self.target_constraints[emp_id] = (
+                    self.model.Add(total_worked - target <= delta),
+                    self.model.Add(target - total_worked <= delta),
+                    target,
+                )
+                objective_terms.append(ObjectiveTerm(TARGET_SHIFTS, delta, w[TARGET_SHIFTS], emp_id))
+
+        return objective_terms
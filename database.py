@@ -1,16 +1,60 @@
-from sqlalchemy import create_engine
+import os
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from models import Base, Workplace, Employee, ShiftDefinition, Assignment
 
-# 1. Connection string for local SQLite
-DATABASE_URL = "sqlite:///./auto_shift.db"
+# 1. Connection string: local SQLite by default. Workers on several hosts need a shared
+# server database instead (e.g. DATABASE_URL=postgresql://..., with its driver installed).
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./auto_shift.db")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
 # 2. Create the engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Each thread/job gets its own connection from the pool, so SQLite must allow
+# connections to be used outside the thread that created them.
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": 30} if IS_SQLITE else {},
+    pool_pre_ping=True,
+)
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """
+    WAL mode lets readers proceed while a solve job is committing its results,
+    and busy_timeout makes concurrent writers wait instead of failing immediately.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _configure_sqlite)
+
 
 # 3. Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+@contextmanager
+def session_scope():
+    """
+    Provides a short-lived session per unit of work (one CLI run or one solve job).
+    Commits on success, rolls back on error and always returns the connection to the pool.
+    """
+    session = SessionLocal()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
 def init_db():
     """
     Creates the .db file and all tables defined in models.py
@@ -20,4 +64,4 @@ def init_db():
     print("Database and all tables created successfully!")
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
@@ -0,0 +1,176 @@
+import dataclasses
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from snapshot import SolverInput, CANNOT_WORK
+
+# Solver statuses ordered from best to worst; the merged status is the worst of the parts
+_STATUS_RANK = ("OPTIMAL", "FEASIBLE", "UNKNOWN", "MODEL_INVALID", "INFEASIBLE")
+
+
+# ==========================================
+#   Eligibility graph
+# ==========================================
+
+class DisjointSet:
+    """Union-find with path halving, keyed by arbitrary hashable nodes."""
+
+    def __init__(self):
+        self.parent = {}
+
+    def add(self, node):
+        self.parent.setdefault(node, node)
+
+    def find(self, node):
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+@dataclasses.dataclass
+class Component:
+    """A group of employees and (day, shift) cells that share no eligibility edge with the rest."""
+    employee_ids: List[int] = dataclasses.field(default_factory=list)
+    cells: List[tuple] = dataclasses.field(default_factory=list)
+
+    @property
+    def size(self):
+        """Number of employee-cell pairs, a proxy for the component's model size."""
+        return len(self.employee_ids) * max(len(self.cells), 1)
+
+
+def find_components(data: SolverInput) -> List[Component]:
+    """
+    Splits a workplace/week into independent groups.
+    An employee is eligible for a (day, shift) cell unless the cell is CANNOT_WORK for them
+    or their weekly maximum is 0. Demand couples the employees of a cell and the weekly
+    limits couple the cells of an employee, so the connected components of this bipartite
+    graph can be solved separately without changing the optimum.
+    :return: Components, largest first
+    """
+    settings = data.settings_by_employee
+    blocked = {(c.employee_id, c.day, c.shift_id) for c in data.constraints if c.kind == CANNOT_WORK}
+    cells = [(d, s.id) for d in range(data.num_days) for s in data.shifts]
+
+    # 1. Union employees with every cell they may work
+    groups = DisjointSet()
+    for cell in cells:
+        groups.add(("cell", cell))
+    for emp in data.employees:
+        node = ("emp", emp.id)
+        groups.add(node)
+        emp_settings = settings.get(emp.id)
+        if emp_settings is not None and emp_settings.max_shifts_per_week <= 0:
+            continue
+        for d, s_id in cells:
+            if (emp.id, d, s_id) not in blocked:
+                groups.union(node, ("cell", (d, s_id)))
+
+    # 2. Collect the members of every root
+    components = {}
+    for emp in data.employees:
+        components.setdefault(groups.find(("emp", emp.id)), Component()).employee_ids.append(emp.id)
+    for cell in cells:
+        components.setdefault(groups.find(("cell", cell)), Component()).cells.append(cell)
+
+    return sorted(components.values(), key=lambda c: c.size, reverse=True)
+
+
+def pack_components(components: List[Component], max_parts) -> List[Component]:
+    """
+    Merges components into at most max_parts parts of similar size (largest first into
+    the currently smallest part), so tiny groups do not each pay for a process round-trip.
+    """
+    parts = [Component() for _ in range(min(max_parts, len(components)))]
+    for component in sorted(components, key=lambda c: c.size, reverse=True):
+        part = min(parts, key=lambda p: p.size)
+        part.employee_ids.extend(component.employee_ids)
+        part.cells.extend(component.cells)
+    return [part for part in parts if part.employee_ids or part.cells]
+
+
+def sub_input(data: SolverInput, component: Component) -> SolverInput:
+    """Restricts a snapshot to one component's employees and demand cells."""
+    employee_ids = set(component.employee_ids)
+    return dataclasses.replace(
+        data,
+        employees=tuple(e for e in data.employees if e.id in employee_ids),
+        settings=tuple(s for s in data.settings if s.employee_id in employee_ids),
+        constraints=tuple(c for c in data.constraints if c.employee_id in employee_ids),
+        demand_cells=frozenset(component.cells),
+    )
+
+
+# ==========================================
+#   Parallel solve
+# ==========================================
+
+def solve_snapshot(data: SolverInput, num_workers=None):
+    """Process-pool worker: solves one snapshot and returns plain (picklable) results."""
+    from ortools.sat.python import cp_model
+    from solver import ShiftOptimizer
+
+    optimizer = ShiftOptimizer.from_input(data, num_workers=num_workers)
+    status = optimizer.solve(data.settings_by_employee)
+    solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    return {
+        "status": optimizer.solver.StatusName(status),
+        "objective": optimizer.objective_value() if solved else None,
+        "assignments": optimizer.get_results_as_dicts() if solved else [],
+        "penalties": optimizer.penalty_breakdown() if solved else [],
+        "num_employees": len(data.employees),
+        "num_cells": len(data.demand_cells) if data.demand_cells is not None else data.num_days * len(data.shifts),
+        "wall_time": optimizer.solver.WallTime(),
+    }
+
+
+def _uncoverable(data: SolverInput, component: Component):
+    """A component with demand but no eligible employee can never be staffed."""
+    staff = {s.id: s.num_staff for s in data.shifts}
+    return not component.employee_ids and any(staff[s_id] > 0 for _, s_id in component.cells)
+
+
+def solve_decomposed(data: SolverInput, max_workers=None, num_workers=None):
+    """
+    Solves each independent part of a workplace/week as its own CP-SAT model in a process
+    pool and merges the results. Wall time follows the largest part instead of the site.
+    :param max_workers: Parallel sub-solves (default: CPU count)
+    :param num_workers: CP-SAT workers per sub-solve (default: CPUs / parallel sub-solves)
+    :return: Dict with the merged status name, objective, assignments, penalty breakdown and per-part stats
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    components = find_components(data)
+
+    # A cell nobody may work is infeasible on its own, no need to build any model
+    if any(_uncoverable(data, c) for c in components):
+        return {"status": "INFEASIBLE", "objective": None, "assignments": [], "penalties": [], "parts": []}
+
+    parts = pack_components(components, max_workers)
+    if num_workers is None:
+        num_workers = max(1, (os.cpu_count() or 1) // len(parts))
+
+    inputs = [sub_input(data, part) for part in parts]
+    if len(inputs) == 1:
+        results = [solve_snapshot(inputs[0], num_workers)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(inputs))) as pool:
+            futures = [pool.submit(solve_snapshot, part_input, num_workers) for part_input in inputs]
+            results = [future.result() for future in futures]
+
+    status = max((r["status"] for r in results), key=_STATUS_RANK.index)
+    solved = status in ("OPTIMAL", "FEASIBLE")
+    return {
+        "status": status,
+        "objective": sum(r["objective"] for r in results) if solved else None,
+        "assignments": [a for r in results for a in r["assignments"]] if solved else [],
+        "penalties": [p for r in results for p in r["penalties"]] if solved else [],
+        "parts": [{k: v for k, v in r.items() if k not in ("assignments", "penalties")} for r in results],
+    }
@@ -1,19 +1,84 @@
 # excel_writer.py
+import hashlib
+import json
+import os
+import tempfile
 import openpyxl
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from sqlalchemy.orm import Session
 from models import Assignment, Employee, ShiftDefinition, Workplace
 from datetime import timedelta
+import config
 
+# Part of the cache key: bump when the workbook layout changes so old reports are not served
+REPORT_LAYOUT_VERSION = 1
+NUM_REPORT_DAYS = 7
+DAY_NAMES = ["ראשון", "שני", "שלישי", "רביעי", "חמישי", "שישי", "שבת"]
 
-def create_excel_report_from_db(session: Session, workplace_id: int, start_date):
+
+def _load_report_data(session: Session, workplace_id: int, start_date):
     """
-    Generates a visual Excel schedule based on assignments stored in the database.
+    Fetches everything the report shows in three queries (workplace, shifts, the week's
+    assignments with their employee's name and color), as plain values.
     """
-    # Fetch workplace info
-    workplace = session.query(Workplace).get(workplace_id)
-    employees = [e for e in workplace.employees if e.is_active]
-    shifts = workplace.shifts
+    workplace = session.get(Workplace, workplace_id)
+    if workplace is None:
+        raise ValueError(f"Workplace {workplace_id} not found.")
+
+    shifts = (
+        session.query(ShiftDefinition.id, ShiftDefinition.shift_name, ShiftDefinition.num_staff)
+        .filter(ShiftDefinition.workplace_id == workplace_id)
+        .order_by(ShiftDefinition.id)
+        .all()
+    )
+
+    end_date = start_date + timedelta(days=NUM_REPORT_DAYS)
+    # Ordered by id to keep slotting consistent between calls
+    rows = (
+        session.query(Assignment.date, Assignment.shift_id, Employee.name, Employee.color)
+        .join(Employee, Employee.id == Assignment.employee_id)
+        .filter(
+            Assignment.workplace_id == workplace_id,
+            Assignment.date >= start_date,
+            Assignment.date < end_date,
+        )
+        .order_by(Assignment.id)
+        .all()
+    )
+    # An archived week (history_archive.py) has no rows left; decode its bitmaps instead
+    if not rows:
+        from history_archive import iter_archived_cells
+        archived = list(iter_archived_cells(session, workplace_id, start_date, end_date))
+        if archived:
+            people = dict((e_id, (name, color)) for e_id, name, color in session.query(
+                Employee.id, Employee.name, Employee.color).filter(Employee.id.in_({c[1] for c in archived})))
+            rows = [(day, shift_id, *people[emp_id]) for _, emp_id, day, shift_id in archived]
+    cells = {}
+    for day, shift_id, name, color in rows:
+        cells.setdefault(((day - start_date).days, shift_id), []).append((name, color))
+
+    return {
+        "workplace_id": workplace_id,
+        "start_date": start_date,
+        "shifts": [tuple(s) for s in shifts],
+        "cells": cells,
+    }
+
+
+def report_key(data) -> str:
+    """Content hash of a report: identical assignments, names, colors and shifts -> identical key."""
+    canonical = {
+        "layout": REPORT_LAYOUT_VERSION,
+        "start_date": data["start_date"].isoformat(),
+        "shifts": data["shifts"],
+        "cells": sorted([day, shift_id, people] for (day, shift_id), people in data["cells"].items()),
+    }
+    payload = json.dumps(canonical, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _render_workbook(data):
+    start_date = data["start_date"]
 
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -29,49 +94,110 @@ def create_excel_report_from_db(session: Session, workplace_id: int, start_date)
 
     # Build Header Row (Dates)
     ws.cell(row=1, column=1).value = "Shift / Day"
-    for d in range(7):
+    for d in range(NUM_REPORT_DAYS):
         current_date = start_date + timedelta(days=d)
         cell = ws.cell(row=1, column=d + 2)
         # Displaying Day Name and Date
-        day_name = ["ראשון", "שני", "שלישי", "רביעי", "חמישי", "שישי", "שבת"][d]
-        cell.value = f"{day_name}\n{current_date.strftime('%d/%m')}"
+        cell.value = f"{DAY_NAMES[d]}\n{current_date.strftime('%d/%m')}"
         cell.font = header_font
         cell.fill = header_fill
         cell.alignment = center_align
 
     # Fill Assignments
     current_row = 2
-    for s_def in shifts:
+    for shift_id, shift_name, num_staff in data["shifts"]:
         # Each shift might have multiple slots (num_staff)
-        for slot in range(s_def.num_staff):
-            ws.cell(row=current_row, column=1).value = f"{s_def.shift_name} ({slot + 1})"
+        for slot in range(num_staff):
+            ws.cell(row=current_row, column=1).value = f"{shift_name} ({slot + 1})"
             ws.cell(row=current_row, column=1).alignment = center_align
             ws.cell(row=current_row, column=1).border = thin_border
 
-            for d in range(7):
-                target_date = start_date + timedelta(days=d)
-                # Fetch assignment for this specific date, shift, and slot
-                # We order by ID to maintain consistent slotting
-                assign = session.query(Assignment).filter(
-                    Assignment.workplace_id == workplace_id,
-                    Assignment.shift_id == s_def.id,
-                    Assignment.date == target_date
-                ).all()
+            for d in range(NUM_REPORT_DAYS):
+                assigned = data["cells"].get((d, shift_id), [])
 
                 cell = ws.cell(row=current_row, column=d + 2)
                 cell.border = thin_border
                 cell.alignment = center_align
 
-                if len(assign) > slot:
-                    emp = assign[slot].employee
-                    cell.value = emp.name
-                    if emp.color:
-                        cell.fill = PatternFill(start_color=emp.color, end_color=emp.color, fill_type="solid")
+                if len(assigned) > slot:
+                    name, color = assigned[slot]
+                    cell.value = name
+                    if color:
+                        cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
 
             current_row += 1
         current_row += 1  # Add a gap between different shift types
 
-    # Save file
-    filename = f"schedule_{start_date.strftime('%Y%m%d')}.xlsx"
-    wb.save(filename)
-    print(f"✅ Visual Excel report saved as: {filename}")
\ No newline at end of file
+    return wb
+
+
+def _evict(cache_dir, max_bytes, keep):
+    """Deletes the least recently used reports until the cache fits in max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".xlsx"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue  # Removed by a concurrent request
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def create_excel_report_from_db(session: Session, workplace_id: int, start_date, cache_dir=None, max_cache_bytes=None):
+    """
+    Generates a visual Excel schedule based on assignments stored in the database.
+    Reports are cached by content hash: an unchanged week is served from the cache
+    without rendering. New files are written atomically (temp file + rename).
+    :param cache_dir: Report directory (default: config.REPORT_CACHE_DIR)
+    :param max_cache_bytes: Size bound of the directory (default: config.REPORT_CACHE_MAX_BYTES)
+    :return: Path of the report
+    """
+    cache_dir = cache_dir or config.REPORT_CACHE_DIR
+    max_cache_bytes = max_cache_bytes if max_cache_bytes is not None else config.REPORT_CACHE_MAX_BYTES
+    os.makedirs(cache_dir, exist_ok=True)
+
+    data = _load_report_data(session, workplace_id, start_date)
+    prefix = f"schedule_wp{workplace_id}_{start_date.strftime('%Y%m%d')}_"
+    path = os.path.join(cache_dir, f"{prefix}{report_key(data)[:16]}.xlsx")
+
+    if os.path.exists(path):
+        os.utime(path)  # Mark as recently used for eviction
+        print(f"✅ Visual Excel report (unchanged) at: {path}")
+        return path
+
+    # Save file: readers only ever see the old report or the complete new one
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=prefix, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            _render_workbook(data).save(f)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates owner-only files; reports are served to others
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    # Older versions of this week's report can never be served again
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name.endswith(".xlsx") and os.path.join(cache_dir, name) != path:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except FileNotFoundError:
+                pass
+    _evict(cache_dir, max_cache_bytes, keep=path)
+
+    print(f"✅ Visual Excel report saved as: {path}")
+    return path
@@ -0,0 +1,197 @@
+import csv
+import heapq
+import io
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+from models import Assignment, Employee, ShiftDefinition, Workplace
+from history_archive import iter_archived_cells
+
+# Machine-readable schedule exports. Every exporter is a generator of text chunks fed by
+# a server-side cursor, so memory use does not grow with the size of the history.
+
+EXPORT_FIELDS = ("date", "workplace_id", "workplace", "employee_id", "employee", "shift_id", "shift")
+ICAL_PRODID = "-//auto-shift//schedule export//EN"
+
+
+def iter_assignment_rows(session: Session, workplace_id=None, start_date=None, end_date=None,
+                         employee_id=None, batch_size=1000):
+    """
+    Streams assignments joined with their employee, shift and workplace as dicts
+    (keys: assignment_id + EXPORT_FIELDS), ordered by employee, date and shift. Archived weeks
+    (history_archive.py) are decoded and merged in, with assignment_id None.
+    :param end_date: Exclusive upper bound
+    :param batch_size: Rows fetched per round trip (yield_per; the cursor is server-side)
+    """
+    query = (
+        session.query(
+            Assignment.id, Assignment.date,
+            Workplace.id, Workplace.name,
+            Employee.id, Employee.name,
+            ShiftDefinition.id, ShiftDefinition.shift_name,
+        )
+        .join(Employee, Employee.id == Assignment.employee_id)
+        .join(ShiftDefinition, ShiftDefinition.id == Assignment.shift_id)
+        .join(Workplace, Workplace.id == Assignment.workplace_id)
+    )
+    if workplace_id is not None:
+        query = query.filter(Assignment.workplace_id == workplace_id)
+    if employee_id is not None:
+        query = query.filter(Assignment.employee_id == employee_id)
+    if start_date is not None:
+        query = query.filter(Assignment.date >= start_date)
+    if end_date is not None:
+        query = query.filter(Assignment.date < end_date)
+    query = query.order_by(Assignment.employee_id, Assignment.date, Assignment.shift_id)
+
+    live = query.execution_options(yield_per=batch_size)
+    archived = _iter_archived_rows(session, workplace_id, start_date, end_date, employee_id)
+    for row in heapq.merge(live, archived, key=lambda r: (r[4], r[1], r[6])):
+        assignment_id, day, wp_id, wp_name, emp_id, emp_name, shift_id, shift_name = row
+        yield {
+            "assignment_id": assignment_id,
+            "date": day,
+            "workplace_id": wp_id,
+            "workplace": wp_name,
+            "employee_id": emp_id,
+            "employee": emp_name,
+            "shift_id": shift_id,
+            "shift": shift_name,
+        }
+
+
+def _iter_archived_rows(session, workplace_id, start_date, end_date, employee_id):
+    """Archived cells shaped like the live query's rows (names looked up once, on first use)."""
+    names = None
+    for wp_id, emp_id, day, shift_id in iter_archived_cells(session, workplace_id, start_date, end_date, employee_id):
+        if names is None:
+            names = {model: dict(session.query(model.id, name)) for model, name in (
+                (Workplace, Workplace.name), (Employee, Employee.name), (ShiftDefinition, ShiftDefinition.shift_name))}
+        yield (None, day, wp_id, names[Workplace][wp_id], emp_id, names[Employee][emp_id],
+               shift_id, names[ShiftDefinition][shift_id])
+
+
+# ==========================================
+#   CSV / NDJSON
+# ==========================================
+
+def iter_csv(rows):
+    """Renders rows as CSV text chunks (header first)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow([row["date"].isoformat() if field == "date" else row[field] for field in EXPORT_FIELDS])
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    """Renders rows as newline-delimited JSON, one object per assignment."""
+    for row in rows:
+        record = {field: row[field] for field in EXPORT_FIELDS}
+        record["date"] = row["date"].isoformat()
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+# ==========================================
+#   iCalendar (RFC 5545)
+# ==========================================
+
+def _ical_text(value):
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def _ical_line(line):
+    """Folds a content line at 75 octets (continuation lines start with a space)."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74
+        # Never split inside a multi-byte UTF-8 sequence
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+    parts.append(data.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ical_event(row, stamp):
+    day = row["date"]
+    return "".join(_ical_line(line) for line in (
+        "BEGIN:VEVENT",
+        # Keyed on the cell, not the row id: archived rows have none, and the UID must not change
+        # when a week moves to the archive (clients merge events sharing a UID)
+        f"UID:shift-{row['employee_id']}-{day:%Y%m%d}-{row['shift_id']}@auto-shift",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+        f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}",
+        f"SUMMARY:{_ical_text(row['shift'])} - {_ical_text(row['workplace'])}",
+        "TRANSP:OPAQUE",
+        "END:VEVENT",
+    ))
+
+
+def _ical_header(name):
+    return "".join(_ical_line(line) for line in (
+        "BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{ICAL_PRODID}", "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_ical_text(name)}",
+    ))
+
+
+def iter_ical(rows, calendar_name="Shifts"):
+    """Renders rows (usually one employee's) as a single VCALENDAR of all-day events."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield _ical_header(calendar_name)
+    for row in rows:
+        yield _ical_event(row, stamp)
+    yield _ical_line("END:VCALENDAR")
+
+
+def write_ical_feeds(rows, directory):
+    """
+    Writes one .ics feed per employee in a single pass over rows ordered by employee
+    (as iter_assignment_rows yields them); only one file is open at a time.
+    :return: Number of feeds written
+    """
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    current_id, f, count = None, None, 0
+    try:
+        for row in rows:
+            if row["employee_id"] != current_id:
+                if f is not None:
+                    f.write(_ical_line("END:VCALENDAR"))
+                    f.close()
+                current_id = row["employee_id"]
+                f = open(os.path.join(directory, f"employee_{current_id}.ics"), "w", encoding="utf-8", newline="")
+                f.write(_ical_header(row["employee"]))
+                count += 1
+            f.write(_ical_event(row, stamp))
+        if f is not None:
+            f.write(_ical_line("END:VCALENDAR"))
+    finally:
+        if f is not None:
+            f.close()
+    return count
+
+
+def write_chunks(chunks, path):
+    """Writes streamed chunks to a file, or to stdout when path is '-'."""
+    if path == "-":
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+        return
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in chunks:
+            f.write(chunk)
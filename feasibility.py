@@ -0,0 +1,240 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List
+
+from snapshot import SolverInput, CANNOT_WORK, MUST_WORK
+
+
+# ==========================================
+#   Max flow (Dinic)
+# ==========================================
+
+class _FlowNetwork:
+    """Adjacency-list flow network; edge e and its reverse are stored at e and e ^ 1."""
+
+    def __init__(self, num_nodes):
+        self.adjacency = [[] for _ in range(num_nodes)]
+        self.to = []
+        self.capacity = []
+
+    def add_edge(self, u, v, capacity):
+        self.adjacency[u].append(len(self.to))
+        self.to.append(v)
+        self.capacity.append(capacity)
+        self.adjacency[v].append(len(self.to))
+        self.to.append(u)
+        self.capacity.append(0)
+        return len(self.to) - 2
+
+    def _levels(self, source):
+        level = [-1] * len(self.adjacency)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for e in self.adjacency[u]:
+                v = self.to[e]
+                if self.capacity[e] > 0 and level[v] < 0:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level
+
+    def max_flow(self, source, sink):
+        total = 0
+        while True:
+            level = self._levels(source)
+            if level[sink] < 0:
+                return total
+            next_edge = [0] * len(self.adjacency)
+            while True:
+                pushed = self._augment(source, sink, level, next_edge)
+                if not pushed:
+                    break
+                total += pushed
+
+    def _augment(self, source, sink, level, next_edge):
+        """Finds one blocking-flow path with an explicit stack (paths are short but recursion is avoidable)."""
+        path = []
+        u = source
+        while u != sink:
+            adjacency = self.adjacency[u]
+            while next_edge[u] < len(adjacency):
+                e = adjacency[next_edge[u]]
+                v = self.to[e]
+                if self.capacity[e] > 0 and level[v] == level[u] + 1:
+                    break
+                next_edge[u] += 1
+            else:
+                # Dead end: retreat one step and never try this node again in this phase
+                if not path:
+                    return 0
+                level[u] = -1
+                e = path.pop()
+                u = self.to[e ^ 1]
+                next_edge[u] += 1
+                continue
+            path.append(e)
+            u = self.to[e]
+
+        pushed = min(self.capacity[e] for e in path)
+        for e in path:
+            self.capacity[e] -= pushed
+            self.capacity[e ^ 1] += pushed
+        return pushed
+
+    def reaches_sink(self, sink):
+        """
+        Nodes that can still push flow to the sink in the residual graph (reverse BFS).
+        After max_flow this is the sink side of the min cut closest to the sink.
+        """
+        seen = [False] * len(self.adjacency)
+        seen[sink] = True
+        queue = deque([sink])
+        while queue:
+            w = queue.popleft()
+            for e in self.adjacency[w]:
+                u = self.to[e]
+                if not seen[u] and self.capacity[e ^ 1] > 0:
+                    seen[u] = True
+                    queue.append(u)
+        return seen
+
+
+# ==========================================
+#   Precheck
+# ==========================================
+
+@dataclass
+class FeasibilityReport:
+    """
+    Outcome of the capacity precheck. feasible=False is a proof of infeasibility;
+    feasible=True only means the precheck found no contradiction (CP-SAT decides).
+    """
+    feasible: bool = True
+    total_demand: int = 0
+    max_coverage: int = 0
+    # (day, shift_id, num_staff, available employees) for cells fewer people may work than required
+    understaffed_cells: List[tuple] = field(default_factory=list)
+    # Smallest set of (day, shift_id) cells that together need more shifts than the
+    # employees able to work them can give (sink side of the min cut)
+    bottleneck_cells: List[tuple] = field(default_factory=list)
+    # Human-readable reasons, one per violated condition
+    reasons: List[str] = field(default_factory=list)
+
+    def fail(self, reason):
+        self.feasible = False
+        self.reasons.append(reason)
+
+
+def check_feasibility(data: SolverInput) -> FeasibilityReport:
+    """
+    Necessary conditions for a schedule to exist, checked without CP-SAT:
+      1. every (day, shift) has at least num_staff employees who may work it,
+      2. employees with a minimum can reach it on the days open to them, and the sum
+         of minimums fits in the total demand (every shift worked fills one demand slot),
+      3. MUST_WORK requests respect one-shift-per-day, the weekly maximum and num_staff,
+      4. the whole demand fits through source -> employee (weekly max) -> employee-day (1)
+         -> allowed cell -> sink (num_staff), solved as a max-flow problem.
+    :return: FeasibilityReport (feasible=False proves that CP-SAT would return INFEASIBLE)
+    """
+    report = FeasibilityReport()
+    settings = data.settings_by_employee
+    shift_ids = [s.id for s in data.shifts]
+    cells = [(d, s_id) for d in range(data.num_days) for s_id in shift_ids]
+    staff = {s.id: s.num_staff for s in data.shifts}
+    demand = {cell: staff[cell[1]] if data.demand_cells is None or cell in data.demand_cells else 0
+              for cell in cells}
+    report.total_demand = sum(demand.values())
+
+    blocked = {(c.employee_id, c.day, c.shift_id) for c in data.constraints if c.kind == CANNOT_WORK}
+    pinned = {(c.employee_id, c.day, c.shift_id) for c in data.constraints
+              if c.kind == MUST_WORK and 0 <= c.day < data.num_days and c.shift_id in staff}
+
+    def weekly_max(emp_id):
+        s = settings.get(emp_id)
+        return min(s.max_shifts_per_week, data.num_days) if s is not None else data.num_days
+
+    # 1. Per-cell availability
+    available = {cell: 0 for cell in cells}
+    for emp in data.employees:
+        if weekly_max(emp.id) <= 0:
+            continue
+        for d, s_id in cells:
+            if (emp.id, d, s_id) not in blocked:
+                available[(d, s_id)] += 1
+    for (d, s_id), count in available.items():
+        if count < demand[(d, s_id)]:
+            report.understaffed_cells.append((d, s_id, demand[(d, s_id)], count))
+            report.fail(f"Day {d}, shift {s_id}: needs {demand[(d, s_id)]}, only {count} available")
+
+    # 2. Weekly minimums
+    min_total = 0
+    for emp in data.employees:
+        s = settings.get(emp.id)
+        if s is None or s.min_shifts_per_week <= 0:
+            continue
+        min_total += s.min_shifts_per_week
+        open_days = sum(1 for d in range(data.num_days)
+                        if any((emp.id, d, s_id) not in blocked for s_id in shift_ids))
+        reachable = min(open_days, weekly_max(emp.id))
+        if s.min_shifts_per_week > reachable:
+            report.fail(f"Employee {emp.id}: minimum {s.min_shifts_per_week} shifts, at most {reachable} possible")
+    if min_total > report.total_demand:
+        report.fail(f"Weekly minimums add up to {min_total} shifts, demand is only {report.total_demand}")
+
+    # 3. MUST_WORK requests
+    pinned_per_cell = {}
+    pinned_per_emp_day = {}
+    pinned_per_emp = {}
+    for emp_id, d, s_id in pinned:
+        pinned_per_cell[(d, s_id)] = pinned_per_cell.get((d, s_id), 0) + 1
+        pinned_per_emp_day[(emp_id, d)] = pinned_per_emp_day.get((emp_id, d), 0) + 1
+        pinned_per_emp[emp_id] = pinned_per_emp.get(emp_id, 0) + 1
+        if (emp_id, d, s_id) in blocked:
+            report.fail(f"Employee {emp_id}: both must and cannot work day {d}, shift {s_id}")
+    for (d, s_id), count in pinned_per_cell.items():
+        if count > demand[(d, s_id)]:
+            report.fail(f"Day {d}, shift {s_id}: {count} employees must work it, num_staff is {demand[(d, s_id)]}")
+    for (emp_id, d), count in pinned_per_emp_day.items():
+        if count > 1:
+            report.fail(f"Employee {emp_id}: must work {count} shifts on day {d}")
+    for emp_id, count in pinned_per_emp.items():
+        if emp_id in settings and count > settings[emp_id].max_shifts_per_week:
+            report.fail(f"Employee {emp_id}: must work {count} shifts, maximum is {settings[emp_id].max_shifts_per_week}")
+
+    # 4. Max flow over the whole week
+    num_emps, num_days, num_cells = len(data.employees), data.num_days, len(cells)
+    source, sink = 0, 1
+    emp_node = {emp.id: 2 + i for i, emp in enumerate(data.employees)}
+    emp_day_base = 2 + num_emps
+    cell_base = emp_day_base + num_emps * num_days
+    cell_node = {cell: cell_base + i for i, cell in enumerate(cells)}
+
+    network = _FlowNetwork(cell_base + num_cells)
+    for i, emp in enumerate(data.employees):
+        capacity = weekly_max(emp.id)
+        if capacity <= 0:
+            continue
+        network.add_edge(source, emp_node[emp.id], capacity)
+        for d in range(num_days):
+            emp_day = emp_day_base + i * num_days + d
+            network.add_edge(emp_node[emp.id], emp_day, 1)
+            for s_id in shift_ids:
+                if (emp.id, d, s_id) not in blocked and demand[(d, s_id)] > 0:
+                    network.add_edge(emp_day, cell_node[(d, s_id)], 1)
+    for cell in cells:
+        if demand[cell] > 0:
+            network.add_edge(cell_node[cell], sink, demand[cell])
+
+    report.max_coverage = network.max_flow(source, sink)
+    if report.max_coverage < report.total_demand:
+        open_to_sink = network.reaches_sink(sink)
+        report.bottleneck_cells = [cell for cell in cells if demand[cell] > 0 and open_to_sink[cell_node[cell]]]
+        if len(report.bottleneck_cells) == sum(1 for cell in cells if demand[cell] > 0):
+            where = "the whole week, weekly maximums are too low"
+        else:
+            where = ", ".join(f"day {d} shift {s_id}" for d, s_id in report.bottleneck_cells)
+        report.fail(f"At most {report.max_coverage} of {report.total_demand} required shifts can be staffed "
+                    f"(bottleneck: {where})")
+
+    return report
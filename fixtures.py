@@ -0,0 +1,271 @@
+import csv
+import json
+import os
+import random
+from datetime import date, time, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import (Workplace, Employee, ShiftDefinition, EmployeeSettings, WorkplaceWeights,
+                    WeeklyConstraint, ConstraintType)
+import config
+
+# Declarative fixture (JSON / YAML; CSV is an employee list, see read_fixture):
+#
+#   start_date: 2026-01-04            # week 0 of the constraints, default next Sunday
+#   workplaces:
+#     - name: SL_HE
+#       num_days_in_cycle: 7          # optional, default config.NUM_DAYS
+#       shifts: [{name: בוקר, num_staff: 2, start_time: "07:00", duration_minutes: 480}, ...]
+#                                     # optional, default from config; times optional too
+#       weights: {target_shifts: 40, rest_gap: 40}  # optional WorkplaceWeights columns
+#       employees:
+#         - name: Ira
+#           color: FF9999
+#           max_shifts_per_week: 5
+#           constraints: [{week: 0, day: 0, shift: בוקר, type: cannot_work}]  # shift: name or index
+#       generate:                     # synthetic staff for staging / load tests
+#         employees: 5000
+#         weeks: 52
+#         unavailability: 0.1         # probability of cannot_work per (week, day, shift)
+#         max_shifts_per_week: [3, 6] # inclusive range
+#         seed: 1
+
+# Parent tables first, so a batch never references rows that are not inserted yet
+_TABLE_ORDER = (Workplace, ShiftDefinition, WorkplaceWeights, Employee, EmployeeSettings, WeeklyConstraint)
+_COLORS = ("FF9999", "99CCFF", "99FF99", "FFCC99", "CC99FF", "FFFF99", "66CCCC", "FF99CC")
+BATCH_SIZE = 20_000
+
+
+class _IdAllocator:
+    """
+    Hands out primary keys in blocks after one MAX(id) query per table, so children can
+    reference their parents without a flush per parent row.
+    Assumes no other writer inserts into the same tables while the fixture loads.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.next_id = {}
+
+    def take(self, model, count=1):
+        if model not in self.next_id:
+            self.next_id[model] = (self.session.query(func.max(model.id)).scalar() or 0) + 1
+        start = self.next_id[model]
+        self.next_id[model] += count
+        return range(start, start + count)
+
+
+class _BatchInserter:
+    """Buffers row mappings per table and writes them with executemany in batches."""
+
+    def __init__(self, session, batch_size=BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+        self.pending = {model: [] for model in _TABLE_ORDER}
+        self.counts = {model.__tablename__: 0 for model in _TABLE_ORDER}
+
+    def add(self, model, row):
+        rows = self.pending[model]
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, upto=None):
+        """Writes the buffers of every table up to (and including) upto, parents first."""
+        for model in _TABLE_ORDER:
+            rows = self.pending[model]
+            if rows:
+                # Core insert on the table: plain executemany, no ORM bookkeeping per row
+                self.session.connection().execute(model.__table__.insert(), rows)
+                self.counts[model.__tablename__] += len(rows)
+                self.pending[model] = []
+            if model is upto:
+                break
+
+
+# ==========================================
+#   Reading fixture files
+# ==========================================
+
+def read_fixture(path):
+    """
+    Loads a fixture from .json, .yaml/.yml (requires PyYAML) or .csv.
+    A CSV holds one employee per row (columns: workplace, name and optionally color,
+    is_active, min_shifts_per_week, max_shifts_per_week); its workplaces get the
+    default shifts.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    if extension in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError("YAML fixtures need PyYAML (pip install pyyaml); use JSON or CSV instead.")
+        with open(path, encoding="utf-8") as f:
+            return yaml.safe_load(f)
+    if extension == ".csv":
+        workplaces = {}
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                employee = {k: v for k, v in row.items() if k != "workplace" and v not in (None, "")}
+                workplace = workplaces.setdefault(row["workplace"], {"name": row["workplace"], "employees": []})
+                workplace["employees"].append(employee)
+        return {"workplaces": list(workplaces.values())}
+    raise ValueError(f"Unsupported fixture file '{path}' (expected .json, .yaml or .csv).")
+
+
+def _as_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def _as_time(value):
+    """'07:00' / '7:30' / a time / minutes after midnight (YAML 1.1 reads an unquoted 7:30 as 450)."""
+    if value is None or isinstance(value, time):
+        return value
+    if isinstance(value, int):
+        return time(value // 60 % 24, value % 60)
+    return time.fromisoformat(str(value).zfill(5))
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+def _default_shifts():
+    names = ["בוקר", "ערב", "לילה"]
+    return [{"name": names[i] if i < len(names) else f"Shift_{i}", "num_staff": config.SHIFTS_PER_DAY_DEMAND}
+            for i in range(config.NUM_SHIFTS)]
+
+
+# ==========================================
+#   Loading
+# ==========================================
+
+def load_fixture(session: Session, fixture, start_date=None, batch_size=BATCH_SIZE):
+    """
+    Inserts a fixture in one transaction: ids are allocated up front and rows are written
+    with executemany in batches (no per-row flush).
+    :param start_date: Date of week 0 for constraints (default: fixture 'start_date', else next Sunday)
+    :return: Dict of inserted row counts per table
+    """
+    from scheduling import get_next_sunday
+
+    start_date = _as_date(start_date) or _as_date(fixture.get("start_date")) or get_next_sunday()
+    ids = _IdAllocator(session)
+    rows = _BatchInserter(session, batch_size)
+    try:
+        for wp in fixture.get("workplaces", ()):
+            _load_workplace(wp, start_date, ids, rows)
+        rows.flush()
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return rows.counts
+
+
+def _load_workplace(wp, start_date, ids, rows):
+    # 1. Workplace, shifts and weights
+    wp_id = ids.take(Workplace)[0]
+    shifts = wp.get("shifts") or _default_shifts()
+    num_days = int(wp.get("num_days_in_cycle", config.NUM_DAYS))
+    rows.add(Workplace, {"id": wp_id, "name": wp["name"], "num_days_in_cycle": num_days,
+                         "num_shifts_per_day": int(wp.get("num_shifts_per_day", len(shifts)))})
+
+    shift_ids = list(ids.take(ShiftDefinition, len(shifts)))
+    for s_id, shift in zip(shift_ids, shifts):
+        duration = shift.get("duration_minutes")
+        rows.add(ShiftDefinition, {"id": s_id, "workplace_id": wp_id, "shift_name": shift["name"],
+                                   "num_staff": int(shift.get("num_staff", 1)),
+                                   "start_time": _as_time(shift.get("start_time")),
+                                   "duration_minutes": int(duration) if duration is not None else None})
+    shift_by_name = {shift["name"]: s_id for s_id, shift in zip(shift_ids, shifts)}
+
+    def resolve_shift(value):
+        if isinstance(value, int):
+            return shift_ids[value] if 0 <= value < len(shift_ids) else None
+        return shift_by_name.get(value)
+
+    if wp.get("weights") is not None:
+        # Every row of an executemany batch needs the same keys: start from the column defaults
+        weights = {c.key: c.default.arg for c in WorkplaceWeights.__table__.columns
+                   if c.default is not None and not callable(c.default.arg)}
+        weights.update(wp["weights"], id=ids.take(WorkplaceWeights)[0], workplace_id=wp_id)
+        rows.add(WorkplaceWeights, weights)
+
+    # 2. Listed employees
+    employees = wp.get("employees", ())
+    for emp_id, emp in zip(ids.take(Employee, len(employees)), employees):
+        _add_employee(rows, ids, emp_id, wp_id, emp)
+        for c in emp.get("constraints", ()):
+            shift_id = resolve_shift(c["shift"])
+            if shift_id is None:
+                continue  # Same as seed.py: constraints on unknown shifts are skipped
+            rows.add(WeeklyConstraint, {
+                "id": ids.take(WeeklyConstraint)[0],
+                "employee_id": emp_id,
+                "shift_id": shift_id,
+                "date": start_date + timedelta(days=int(c.get("week", 0)) * num_days + int(c["day"])),
+                "constraint_type": ConstraintType(c.get("type", ConstraintType.CANNOT_WORK.value)),
+            })
+
+    # 3. Generated employees
+    generate = wp.get("generate")
+    if generate:
+        _generate_employees(rows, ids, wp_id, generate, shift_ids, num_days, start_date)
+
+
+def _add_employee(rows, ids, emp_id, wp_id, emp):
+    rows.add(Employee, {
+        "id": emp_id,
+        "workplace_id": wp_id,
+        "name": emp["name"],
+        "color": emp.get("color", "FFFFFF"),
+        "phone": emp.get("phone"),
+        "email": emp.get("email"),
+        "is_active": _as_bool(emp.get("is_active", True)),
+        "history_streak": int(emp.get("history_streak", 0)),
+        "worked_last_fri_night": _as_bool(emp.get("worked_last_fri_night", False)),
+        "worked_last_sat_noon": _as_bool(emp.get("worked_last_sat_noon", False)),
+        "worked_last_sat_night": _as_bool(emp.get("worked_last_sat_night", False)),
+    })
+    rows.add(EmployeeSettings, {
+        "id": ids.take(EmployeeSettings)[0],
+        "employee_id": emp_id,
+        "min_shifts_per_week": int(emp.get("min_shifts_per_week", 0)),
+        "max_shifts_per_week": int(emp.get("max_shifts_per_week", 5)),
+    })
+
+
+def _generate_employees(rows, ids, wp_id, spec, shift_ids, num_days, start_date):
+    rng = random.Random(spec.get("seed", 0))
+    count = int(spec.get("employees", 0))
+    weeks = int(spec.get("weeks", 1))
+    unavailability = float(spec.get("unavailability", 0.0))
+    min_low, min_high = spec.get("min_shifts_per_week", [0, 0])
+    max_low, max_high = spec.get("max_shifts_per_week", [3, 6])
+    prefix = spec.get("name_prefix", "Employee ")
+
+    cells = [(w * num_days + d, s_id) for w in range(weeks) for d in range(num_days) for s_id in shift_ids]
+    dates = [start_date + timedelta(days=offset) for offset in range(weeks * num_days)]
+    cannot_work = ConstraintType.CANNOT_WORK
+    for n, emp_id in enumerate(ids.take(Employee, count)):
+        _add_employee(rows, ids, emp_id, wp_id, {
+            "name": f"{prefix}{n + 1:05d}",
+            "color": rng.choice(_COLORS),
+            "min_shifts_per_week": rng.randint(min_low, min_high),
+            "max_shifts_per_week": rng.randint(max_low, max_high),
+        })
+        if unavailability <= 0:
+            continue
+        blocked = [cell for cell in cells if rng.random() < unavailability]
+        for constraint_id, (offset, s_id) in zip(ids.take(WeeklyConstraint, len(blocked)), blocked):
+            rows.add(WeeklyConstraint, {"id": constraint_id, "employee_id": emp_id, "shift_id": s_id,
+                                        "date": dates[offset], "constraint_type": cannot_work})
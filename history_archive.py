@@ -0,0 +1,270 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models import Assignment, ArchivedWeek, ShiftDefinition
+from analytics import WEEKEND_WEEKDAYS
+
+# Compact assignment history. One employee-week is a single integer: bit
+# day * SLOTS_PER_DAY + slot is set when the employee worked that day's shift in that slot
+# (slots = the workplace's shifts in id order). Weeks that left the active planning window
+# move from the Assignment table (one row per shift) into ArchivedWeek bitmaps, and readers
+# load any range as a uint64 array [employee, week] answered with NumPy bit operations.
+
+SLOTS_PER_DAY = 8
+DAYS_PER_WEEK = 7
+FIRST_DAY_OF_WEEK = 6  # date.weekday() of the week start (Sunday), as in analytics.rebuild_weekly_summaries
+
+_DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits):
+    """Number of set bits of every element of a uint64 array."""
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(bits).astype(np.int64)
+    bits = np.ascontiguousarray(bits, dtype=np.uint64)
+    return _POPCOUNT8[bits.view(np.uint8)].reshape(bits.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+
+def week_start_of(day):
+    return day - timedelta(days=(day.weekday() - FIRST_DAY_OF_WEEK) % 7)
+
+
+def _bit(day_index, slot):
+    return 1 << (day_index * SLOTS_PER_DAY + slot)
+
+
+def _shift_layout(session, workplace_id):
+    """The workplace's shift ids in slot order."""
+    shift_ids = [s_id for (s_id,) in session.query(ShiftDefinition.id).filter(
+        ShiftDefinition.workplace_id == workplace_id).order_by(ShiftDefinition.id)]
+    if len(shift_ids) > SLOTS_PER_DAY:
+        raise ValueError(f"Workplace {workplace_id} has {len(shift_ids)} shifts; "
+                         f"archived weeks hold at most {SLOTS_PER_DAY} a day.")
+    return shift_ids
+
+
+def _remap(bits, shift_ids_text, slot_of):
+    """
+    Re-encodes a bitmap archived with another shift layout (shifts added since) to the current one.
+    Shifts that no longer exist are dropped.
+    """
+    old_ids = [int(s_id) for s_id in shift_ids_text.split(",") if s_id]
+    remapped = 0
+    for day in range(DAYS_PER_WEEK):
+        for slot, s_id in enumerate(old_ids):
+            if bits >> (day * SLOTS_PER_DAY + slot) & 1 and s_id in slot_of:
+                remapped |= _bit(day, slot_of[s_id])
+    return remapped
+
+
+def archive_assignments(session: Session, workplace_id, before_date):
+    """
+    Packs the Assignment rows of every week starting before before_date's week into
+    ArchivedWeek bitmaps and deletes the rows. Live rows are the newer schedule of their
+    week, so they replace whatever was archived for it. Weekly summaries are kept, so stats
+    over those weeks are unchanged.
+    :return: Dict with the number of rows archived and bitmaps written
+    """
+    cutoff = week_start_of(before_date)
+    shift_ids = _shift_layout(session, workplace_id)
+    slot_of = {s_id: slot for slot, s_id in enumerate(shift_ids)}
+    layout = ",".join(map(str, shift_ids))
+
+    # 1. Pack the rows, one bitmap per employee-week
+    packed = defaultdict(int)
+    num_rows = 0
+    rows = session.query(Assignment.employee_id, Assignment.shift_id, Assignment.date).filter(
+        Assignment.workplace_id == workplace_id,
+        Assignment.date < cutoff,
+    ).execution_options(yield_per=10000)
+    for emp_id, shift_id, day in rows:
+        week = week_start_of(day)
+        packed[(emp_id, week)] |= _bit((day - week).days, slot_of[shift_id])
+        num_rows += 1
+    if not packed:
+        return {"rows": 0, "bitmaps": 0}
+
+    # 2. Replace the archived bitmaps of those weeks
+    session.query(ArchivedWeek).filter(
+        ArchivedWeek.workplace_id == workplace_id,
+        ArchivedWeek.week_start.in_({week for _, week in packed}),
+    ).delete(synchronize_session=False)
+    session.bulk_insert_mappings(ArchivedWeek, [
+        {"workplace_id": workplace_id, "employee_id": emp_id, "week_start": week, "shift_ids": layout, "bits": bits}
+        for (emp_id, week), bits in packed.items()
+    ])
+
+    # 3. Drop the archived rows
+    session.query(Assignment).filter(
+        Assignment.workplace_id == workplace_id,
+        Assignment.date < cutoff,
+    ).delete(synchronize_session=False)
+    session.commit()
+    return {"rows": num_rows, "bitmaps": len(packed)}
+
+
+def iter_archived_cells(session: Session, workplace_id=None, start_date=None, end_date=None, employee_id=None):
+    """
+    Decodes archived weeks back to (workplace_id, employee_id, date, shift_id) tuples with the
+    date in [start_date, end_date), ordered by employee, date and shift like the Assignment
+    readers, so callers can merge both sources (heapq.merge).
+    """
+    query = session.query(ArchivedWeek.workplace_id, ArchivedWeek.employee_id, ArchivedWeek.week_start,
+                          ArchivedWeek.shift_ids, ArchivedWeek.bits)
+    if workplace_id is not None:
+        query = query.filter(ArchivedWeek.workplace_id == workplace_id)
+    if employee_id is not None:
+        query = query.filter(ArchivedWeek.employee_id == employee_id)
+    if start_date is not None:
+        query = query.filter(ArchivedWeek.week_start > start_date - timedelta(days=DAYS_PER_WEEK))
+    if end_date is not None:
+        query = query.filter(ArchivedWeek.week_start < end_date)
+    query = query.order_by(ArchivedWeek.employee_id, ArchivedWeek.week_start)
+
+    def decode(batch):
+        cells = []
+        for wp_id, emp_id, week, shift_ids, bits in batch:
+            for slot, s_id in enumerate(int(s_id) for s_id in shift_ids.split(",") if s_id):
+                for day in range(DAYS_PER_WEEK):
+                    date = week + timedelta(days=day)
+                    if bits >> (day * SLOTS_PER_DAY + slot) & 1 and (start_date is None or date >= start_date) \
+                            and (end_date is None or date < end_date):
+                        cells.append((wp_id, emp_id, date, s_id))
+        return sorted(cells, key=lambda cell: (cell[2], cell[3]))
+
+    # One employee-week may be archived under several sites: sort each such batch together
+    batch = []
+    for row in query.execution_options(yield_per=1000):
+        if batch and (row[1], row[2]) != (batch[0][1], batch[0][2]):
+            yield from decode(batch)
+            batch = []
+        batch.append(row)
+    yield from decode(batch)
+
+
+@dataclass
+class HistoryBits:
+    """Worked shifts over a range of weeks: bits[employee, week], slots in shift_ids order."""
+    employee_ids: np.ndarray
+    week_starts: List
+    shift_ids: List[int]
+    bits: np.ndarray
+
+    def _mask(self, days=range(DAYS_PER_WEEK), slots=None):
+        slots = range(len(self.shift_ids)) if slots is None else slots
+        return np.uint64(sum(_bit(day, slot) for day in days for slot in slots))
+
+    def total_shifts(self):
+        """Shifts worked per employee."""
+        return popcount(self.bits).sum(axis=1)
+
+    def shift_counts(self):
+        """Shifts worked per employee and shift: int array [employee, shift] in shift_ids order."""
+        counts = np.zeros((len(self.employee_ids), len(self.shift_ids)), dtype=np.int64)
+        for slot in range(len(self.shift_ids)):
+            counts[:, slot] = popcount(self.bits & self._mask(slots=[slot])).sum(axis=1)
+        return counts
+
+    def weekend_shifts(self):
+        """Shifts worked on weekend days (analytics.WEEKEND_WEEKDAYS) per employee."""
+        weekend = [d for d in range(DAYS_PER_WEEK) if (FIRST_DAY_OF_WEEK + d) % 7 in WEEKEND_WEEKDAYS]
+        return popcount(self.bits & self._mask(days=weekend)).sum(axis=1)
+
+    def worked_days(self):
+        """Bool array [employee, day] over the whole range: worked any shift that day."""
+        offsets = np.arange(DAYS_PER_WEEK, dtype=np.uint64) * np.uint64(SLOTS_PER_DAY)
+        per_day = (self.bits[..., None] >> offsets) & np.uint64(_DAY_MASK)
+        return (per_day != 0).reshape(len(self.employee_ids), -1)
+
+    def streaks(self):
+        """
+        Consecutive worked days per employee.
+        :return: (longest run in the range, run ending on the range's last day)
+        """
+        worked = self.worked_days()
+        if worked.shape[1] == 0:
+            zeros = np.zeros(len(self.employee_ids), dtype=np.int64)
+            return zeros, zeros
+        days = np.arange(worked.shape[1])
+        last_off = np.maximum.accumulate(np.where(worked, -1, days), axis=1)
+        runs = days - last_off  # Length of the run ending on each day (0 on days off)
+        return runs.max(axis=1), runs[:, -1]
+
+    def last_week_flags(self, planned_week=None):
+        """
+        The Employee.worked_last_* flags the solver takes when planning the week starting on
+        planned_week: Friday's and Saturday's last shift, and Saturday's second shift, of the
+        week before it (see conflicts.history_cells).
+        :param planned_week: Week start (default: the week right after the range)
+        """
+        none = np.zeros(len(self.employee_ids), dtype=bool)
+        previous = week_start_of(planned_week) - timedelta(days=DAYS_PER_WEEK) if planned_week else (
+            self.week_starts[-1] if self.week_starts else None)
+        if previous not in self.week_starts or not self.shift_ids:
+            return {"worked_last_fri_night": none, "worked_last_sat_noon": none, "worked_last_sat_night": none}
+        last = self.bits[:, self.week_starts.index(previous)]
+        friday = (4 - FIRST_DAY_OF_WEEK) % 7
+        saturday = (5 - FIRST_DAY_OF_WEEK) % 7
+        night = len(self.shift_ids) - 1
+
+        def worked(day, slot):
+            return (last & self._mask(days=[day], slots=[slot])) != 0
+
+        return {
+            "worked_last_fri_night": worked(friday, night),
+            "worked_last_sat_noon": worked(saturday, 1) if len(self.shift_ids) > 1 else none,
+            "worked_last_sat_night": worked(saturday, night),
+        }
+
+
+def load_history(session: Session, workplace_id, start_date, end_date) -> HistoryBits:
+    """
+    Loads every week starting in [start_date's week, end_date) for one workplace, from the
+    archived bitmaps and the live Assignment rows alike (the callers need not know where a
+    week is stored). Employees are those with at least one shift in the range.
+    """
+    week_starts = []
+    week = week_start_of(start_date)
+    while week < end_date:
+        week_starts.append(week)
+        week += timedelta(days=DAYS_PER_WEEK)
+    week_index = {w: i for i, w in enumerate(week_starts)}
+    shift_ids = _shift_layout(session, workplace_id)
+    slot_of = {s_id: slot for slot, s_id in enumerate(shift_ids)}
+    layout = ",".join(map(str, shift_ids))
+
+    emp_col, week_col, bits_col = [], [], []
+    if week_starts:
+        range_end = week_starts[-1] + timedelta(days=DAYS_PER_WEEK)
+        # 1. Archived weeks: one row per employee-week
+        for emp_id, week, ids, bits in session.query(
+                ArchivedWeek.employee_id, ArchivedWeek.week_start, ArchivedWeek.shift_ids, ArchivedWeek.bits
+        ).filter(ArchivedWeek.workplace_id == workplace_id,
+                 ArchivedWeek.week_start >= week_starts[0],
+                 ArchivedWeek.week_start < range_end):
+            emp_col.append(emp_id)
+            week_col.append(week_index[week])
+            bits_col.append(bits if ids == layout else _remap(bits, ids, slot_of))
+
+        # 2. Live rows (the active window), packed on the fly
+        for emp_id, shift_id, day in session.query(Assignment.employee_id, Assignment.shift_id, Assignment.date).filter(
+                Assignment.workplace_id == workplace_id,
+                Assignment.date >= week_starts[0],
+                Assignment.date < range_end):
+            week = week_start_of(day)
+            emp_col.append(emp_id)
+            week_col.append(week_index[week])
+            bits_col.append(_bit((day - week).days, slot_of[shift_id]))
+
+    employee_ids = np.array(sorted(set(emp_col)), dtype=np.int64)
+    bits = np.zeros((len(employee_ids), len(week_starts)), dtype=np.uint64)
+    if bits_col:
+        rows = np.searchsorted(employee_ids, np.array(emp_col, dtype=np.int64))
+        np.bitwise_or.at(bits, (rows, np.array(week_col, dtype=np.intp)), np.array(bits_col, dtype=np.uint64))
+    return HistoryBits(employee_ids, week_starts, shift_ids, bits)
@@ -0,0 +1,147 @@
+import dataclasses
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime
+
+from model_io import model_from_text, solver_from_parameters_text, merge_parameters_text
+from snapshot import (SolverInput, EmployeeSnapshot, ShiftSnapshot, SettingsSnapshot,
+                      WeightsSnapshot, ConstraintSnapshot)
+
+# Bump when the file layout changes; replay refuses unknown versions
+CAPTURE_FORMAT_VERSION = 1
+
+
+# ==========================================
+#   Snapshot <-> JSON
+# ==========================================
+
+def snapshot_to_dict(data: SolverInput) -> dict:
+    result = dataclasses.asdict(data)
+    result["start_date"] = data.start_date.isoformat()
+    if data.demand_cells is not None:
+        result["demand_cells"] = sorted(data.demand_cells)
+    return result
+
+
+def snapshot_from_dict(raw: dict) -> SolverInput:
+    weights = raw.get("weights")
+    if weights is not None:
+        weights = WeightsSnapshot(**{**weights, "priority_order": tuple(weights.get("priority_order", ()))})
+    return SolverInput(
+        workplace_id=raw["workplace_id"],
+        workplace_name=raw["workplace_name"],
+        start_date=date.fromisoformat(raw["start_date"]),
+        num_days=raw["num_days"],
+        employees=tuple(EmployeeSnapshot(**e) for e in raw["employees"]),
+        shifts=tuple(ShiftSnapshot(**s) for s in raw["shifts"]),
+        weights=weights,
+        settings=tuple(SettingsSnapshot(**s) for s in raw.get("settings", ())),
+        constraints=tuple(ConstraintSnapshot(**c) for c in raw.get("constraints", ())),
+        demand_cells=(frozenset(tuple(cell) for cell in raw["demand_cells"])
+                      if raw.get("demand_cells") is not None else None),
+    )
+
+
+# ==========================================
+#   Capture
+# ==========================================
+
+def capture_instance(directory, data: SolverInput, model_text, parameters_text, status_name, objective, wall_time):
+    """
+    Writes one solve (input snapshot, CpModelProto as text, SatParameters and the observed
+    result) to a gzip-compressed JSON file that replay_instance can run offline.
+    :return: The path of the written file
+    """
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(directory, f"wp{data.workplace_id}_{data.start_date.isoformat()}_{stamp}.json.gz")
+
+    payload = {
+        "format": CAPTURE_FORMAT_VERSION,
+        "captured_at": datetime.now().isoformat(timespec="seconds"),
+        "snapshot": snapshot_to_dict(data),
+        "model": model_text,
+        "parameters": parameters_text,
+        "result": {"status": status_name, "objective": objective, "wall_time": wall_time},
+    }
+    # Write to a temp name first so a crash never leaves a truncated capture in the corpus
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_instance(path) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        payload = json.load(f)
+    if payload.get("format") != CAPTURE_FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported capture format {payload.get('format')!r}")
+    payload["snapshot"] = snapshot_from_dict(payload["snapshot"])
+    return payload
+
+
+# ==========================================
+#   Replay
+# ==========================================
+
+def replay_instance(path, parameter_overrides="", repeat=1, rebuild=False):
+    """
+    Re-solves a captured instance offline and compares against the captured run.
+    :param parameter_overrides: SatParameters text merged over the captured ones, e.g. 'num_workers: 1'
+    :param rebuild: Rebuild the model from the snapshot (measures build time, honours solve_mode)
+                    instead of solving the captured proto as-is
+    :return: Dict with captured and replayed status/objective/timings
+    """
+    from ortools.sat.python import cp_model
+    from solver import ShiftOptimizer
+
+    instance = load_instance(path)
+    data = instance["snapshot"]
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if rebuild:
+            optimizer = ShiftOptimizer.from_input(data)
+            optimizer.solver = solver_from_parameters_text(instance["parameters"])
+            merge_parameters_text(optimizer.solver, parameter_overrides)
+            status = optimizer.solve(data.settings_by_employee)
+            solver = optimizer.solver
+            objective = optimizer.objective_value() if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None
+        else:
+            model = model_from_text(instance["model"])
+            solver = solver_from_parameters_text(instance["parameters"])
+            merge_parameters_text(solver, parameter_overrides)
+            status = solver.Solve(model)
+            objective = solver.ObjectiveValue() if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None
+        runs.append({
+            "status": solver.StatusName(status),
+            "objective": objective,
+            "wall_time": time.perf_counter() - start,
+        })
+
+    captured = instance["result"]
+    best = min(run["wall_time"] for run in runs)
+    return {
+        "path": path,
+        "workplace": data.workplace_name,
+        "start_date": data.start_date.isoformat(),
+        "captured": captured,
+        "runs": runs,
+        "best_wall_time": best,
+        "speedup": (captured["wall_time"] / best) if captured.get("wall_time") and best else None,
+        "same_objective": all(run["objective"] == captured["objective"] for run in runs),
+    }
+
+
+def iter_capture_files(paths):
+    """Expands directories into the capture files they contain (sorted), keeps plain files as-is."""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".json.gz"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
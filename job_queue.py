@@ -0,0 +1,151 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, and_, update
+from sqlalchemy.orm import Session
+from models import QueuedSolveJob, JobStatus
+from pooling import linked_workplaces
+import config
+
+# Durable solve queue on top of the application database. Workers (worker.py) claim jobs
+# with a compare-and-set UPDATE, so no row locks or SKIP LOCKED are needed and any SQL
+# database works. A claim is a lease: the worker extends it with heartbeats, and a job whose
+# lease ran out (crashed or partitioned worker) is claimed again by the next worker.
+# Times are naive UTC; hosts only need clocks in sync to well within the lease length.
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue(session: Session, workplace_id, start_date, max_attempts=None):
+    """
+    Adds a solve job, or returns the queued/running job of the same week for any site of
+    workplace_id's linked group: linked sites are solved and saved together as one model.
+    :return: The QueuedSolveJob (committed)
+    """
+    existing = session.query(QueuedSolveJob).filter(
+        QueuedSolveJob.workplace_id.in_(linked_workplaces(session, workplace_id)),
+        QueuedSolveJob.start_date == start_date,
+        QueuedSolveJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]),
+    ).first()
+    if existing is not None:
+        return existing
+
+    job = QueuedSolveJob(workplace_id=workplace_id, start_date=start_date, status=JobStatus.QUEUED,
+                         attempts=0, max_attempts=max_attempts or config.JOB_MAX_ATTEMPTS, submitted_at=_now())
+    session.add(job)
+    session.commit()
+    return job
+
+
+def _fail_exhausted(session, now):
+    """Jobs whose lease expired on their last attempt are failed instead of claimed again."""
+    session.execute(
+        update(QueuedSolveJob)
+        .where(QueuedSolveJob.status == JobStatus.RUNNING,
+               QueuedSolveJob.lease_expires_at < now,
+               QueuedSolveJob.attempts >= QueuedSolveJob.max_attempts)
+        .values(status=JobStatus.FAILED, finished_at=now, lease_token=None,
+                error="Lease expired on the last attempt (worker lost)")
+    )
+
+
+def claim(session: Session, worker_id, lease_seconds=None):
+    """
+    Takes the oldest claimable job: queued, or running with an expired lease.
+    :return: (job id, lease token), or None when there is nothing to do
+    """
+    lease = timedelta(seconds=lease_seconds or config.JOB_LEASE_SECONDS)
+    while True:
+        now = _now()
+        _fail_exhausted(session, now)
+        session.commit()
+
+        claimable = and_(
+            or_(QueuedSolveJob.status == JobStatus.QUEUED,
+                and_(QueuedSolveJob.status == JobStatus.RUNNING, QueuedSolveJob.lease_expires_at < now)),
+            QueuedSolveJob.attempts < QueuedSolveJob.max_attempts,
+        )
+        candidate = session.query(QueuedSolveJob.id).filter(claimable).order_by(QueuedSolveJob.id).first()
+        if candidate is None:
+            return None
+
+        # Compare-and-set: only one worker's UPDATE still matches the claimable condition
+        token = uuid.uuid4().hex
+        claimed = session.execute(
+            update(QueuedSolveJob)
+            .where(QueuedSolveJob.id == candidate.id, claimable)
+            .values(status=JobStatus.RUNNING, worker_id=worker_id, lease_token=token,
+                    lease_expires_at=now + lease, heartbeat_at=now, started_at=now,
+                    attempts=QueuedSolveJob.attempts + 1)
+        ).rowcount
+        session.commit()
+        if claimed == 1:
+            return candidate.id, token
+        # Another worker won the race; look again
+
+
+def hold(session: Session, job_id, token, lease_seconds=None):
+    """
+    Extends the lease of a job this worker still owns, without committing: run inside the
+    transaction that writes the job's results, the row stays locked until that commit, so the
+    results are only saved while the lease is held.
+    :return: False when the lease was lost (expired and claimed by another worker)
+    """
+    now = _now()
+    extended = session.execute(
+        update(QueuedSolveJob)
+        .where(QueuedSolveJob.id == job_id, QueuedSolveJob.lease_token == token,
+               QueuedSolveJob.status == JobStatus.RUNNING)
+        .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=lease_seconds or config.JOB_LEASE_SECONDS))
+    ).rowcount
+    return extended == 1
+
+
+def heartbeat(session: Session, job_id, token, lease_seconds=None):
+    """
+    Extends the lease of a job this worker still owns.
+    :return: False when the lease was lost (expired and claimed by another worker)
+    """
+    extended = hold(session, job_id, token, lease_seconds)
+    session.commit()
+    return extended
+
+
+def complete(session: Session, job_id, token, result_status, objective=None):
+    """Marks an owned job as done. :return: False when the lease had been lost meanwhile"""
+    done = session.execute(
+        update(QueuedSolveJob)
+        .where(QueuedSolveJob.id == job_id, QueuedSolveJob.lease_token == token)
+        .values(status=JobStatus.SUCCEEDED, finished_at=_now(), lease_token=None, lease_expires_at=None,
+                result_status=result_status, objective=objective, error=None)
+    ).rowcount
+    session.commit()
+    return done == 1
+
+
+def fail(session: Session, job_id, token, error):
+    """
+    Records a failed attempt: the job is queued again while attempts remain, else failed.
+    :return: The job's new status, or None when the lease had been lost meanwhile
+    """
+    owned = (QueuedSolveJob.id == job_id, QueuedSolveJob.lease_token == token)
+    released = dict(error=str(error)[:1000], lease_token=None, lease_expires_at=None)
+    status = JobStatus.QUEUED
+    changed = session.execute(
+        update(QueuedSolveJob).where(*owned, QueuedSolveJob.attempts < QueuedSolveJob.max_attempts)
+        .values(status=status, **released)
+    ).rowcount
+    if not changed:
+        status = JobStatus.FAILED
+        changed = session.execute(
+            update(QueuedSolveJob).where(*owned).values(status=status, finished_at=_now(), **released)
+        ).rowcount
+    session.commit()
+    return status if changed else None
+
+
+def list_jobs(session: Session, limit=20):
+    """Most recent jobs first."""
+    return session.query(QueuedSolveJob).order_by(QueuedSolveJob.id.desc()).limit(limit).all()
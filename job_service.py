@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, is_dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from database import session_scope
+from models import JobStatus
+from scheduling import solve_workplace_week
+from pooling import linked_workplaces
+
+
+class JobQueueFull(Exception):
+    """Raised when the service already holds its maximum number of pending jobs."""
+
+
+@dataclass
+class SolveJob:
+    """State of a single workplace/week solve request, as seen by API clients."""
+    job_id: int
+    workplace_id: int
+    start_date: date
+    # The linked sites solved (and saved) together with workplace_id, see pooling.py
+    group: Tuple[int, ...] = ()
+    status: JobStatus = JobStatus.QUEUED
+    progress: dict = field(default_factory=dict)
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    submitted_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def key(self) -> Tuple[Tuple[int, ...], date]:
+        return self.group or (self.workplace_id,), self.start_date
+
+    @property
+    def is_done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def to_dict(self):
+        """JSON-friendly view for a web front end."""
+        return {
+            "job_id": self.job_id,
+            "workplace_id": self.workplace_id,
+            "start_date": self.start_date.isoformat(),
+            "status": self.status.value,
+            "progress": dict(self.progress),
+            "result": self._result_dict(),
+            "error": self.error,
+        }
+
+    def _result_dict(self):
+        # A failed precheck returns its FeasibilityReport dataclass under 'precheck'
+        if not self.result or not is_dataclass(self.result.get("precheck")):
+            return self.result
+        return {**self.result, "precheck": asdict(self.result["precheck"])}
+
+
+def _default_pool_sizes():
+    """
+    Splits the host's cores between concurrent solves and CP-SAT workers per solve,
+    so that (concurrent solves x solver workers) never exceeds the CPU count.
+    """
+    cpu_count = os.cpu_count() or 1
+    solver_workers = min(8, cpu_count)
+    return max(1, cpu_count // solver_workers), solver_workers
+
+
+class JobService:
+    """
+    Asyncio front door for solve requests.
+
+    Jobs run on a bounded thread pool (CP-SAT releases the GIL while searching).
+    Each job opens its own DB session, so no session is ever shared between threads.
+    Submitting a workplace/week that is already queued or running returns the existing job,
+    also when it was submitted for another site of the same linked group (one joint model).
+    Finished jobs stay readable for finished_ttl_seconds, and at most max_finished_jobs are kept.
+    """
+
+    def __init__(self, max_concurrent_solves=None, solver_workers_per_job=None, max_pending_jobs=1000,
+                 finished_ttl_seconds=3600, max_finished_jobs=1000):
+        default_solves, default_workers = _default_pool_sizes()
+        self.max_concurrent_solves = max_concurrent_solves or default_solves
+        self.solver_workers_per_job = solver_workers_per_job or default_workers
+        self.max_pending_jobs = max_pending_jobs
+        self.finished_ttl = timedelta(seconds=finished_ttl_seconds)
+        self.max_finished_jobs = max_finished_jobs
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_solves, thread_name_prefix="solve-job"
+        )
+        self._jobs: Dict[int, SolveJob] = {}
+        self._inflight: Dict[Tuple[Tuple[int, ...], date], SolveJob] = {}
+        self._finished = deque()  # Finished job ids, oldest first
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._ids = itertools.count(1)
+
+    async def submit(self, workplace_id: int, start_date: date) -> SolveJob:
+        """
+        Queues a solve for one workplace/week and returns immediately.
+        Identical in-flight requests (same linked group and week) are deduplicated onto the same job.
+        """
+        self._evict_finished()
+        group = tuple(await asyncio.get_running_loop().run_in_executor(None, self._linked_group, workplace_id))
+        key = (group, start_date)
+        # No await below: the check and the insert cannot interleave with another submit
+        existing = self._inflight.get(key)
+        if existing is not None:
+            return existing
+
+        if len(self._inflight) >= self.max_pending_jobs:
+            raise JobQueueFull(f"{len(self._inflight)} jobs already pending, try again later.")
+
+        job = SolveJob(job_id=next(self._ids), workplace_id=workplace_id, start_date=start_date, group=group)
+        self._jobs[job.job_id] = job
+        self._inflight[key] = job
+        self._tasks[job.job_id] = asyncio.create_task(self._run(job))
+        return job
+
+    @staticmethod
+    def _linked_group(workplace_id):
+        with session_scope() as session:
+            return linked_workplaces(session, workplace_id)
+
+    def _evict_finished(self):
+        """Forgets finished jobs older than the TTL, and the oldest ones above the cap."""
+        cutoff = datetime.now() - self.finished_ttl
+        while self._finished and (len(self._finished) > self.max_finished_jobs
+                                  or self._jobs[self._finished[0]].finished_at < cutoff):
+            self._jobs.pop(self._finished.popleft())
+
+    def get(self, job_id: int) -> Optional[SolveJob]:
+        self._evict_finished()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: int) -> SolveJob:
+        """Waits until the job has finished (successfully or not) and returns it."""
+        job = self._jobs[job_id]
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+        return job
+
+    async def _run(self, job: SolveJob):
+        loop = asyncio.get_running_loop()
+
+        def report_progress(progress):
+            # Called from the solver thread; hand the update back to the event loop
+            loop.call_soon_threadsafe(job.progress.update, progress)
+
+        def mark_running():
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.now()
+
+        def run_in_worker():
+            loop.call_soon_threadsafe(mark_running)
+            with session_scope() as session:
+                return solve_workplace_week(
+                    session, job.workplace_id, job.start_date,
+                    progress_callback=report_progress,
+                    num_workers=self.solver_workers_per_job
+                )
+
+        try:
+            job.result = await loop.run_in_executor(self._executor, run_in_worker)
+            job.status = JobStatus.SUCCEEDED
+        except Exception as e:
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+        finally:
+            job.finished_at = datetime.now()
+            self._inflight.pop(job.key, None)
+            self._tasks.pop(job.job_id, None)
+            self._finished.append(job.job_id)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,45 @@
+from datetime import timedelta
+from sqlalchemy.orm import Session, selectinload
+from models import Workplace, Employee, WorkplaceWeights, WeeklyConstraint
+from snapshot import SolverInput
+
+
+def load_solver_input(session: Session, workplace_id: int, start_date) -> SolverInput:
+    """
+    Loads the complete input of one workplace/week in a constant number of queries
+    (workplace, employees, settings, shifts, weights, weekly constraints),
+    independent of the number of employees.
+    :return: An immutable SolverInput that no longer references the session
+    """
+    # 1. Workplace + employees (+ their settings) + shifts, eagerly loaded
+    workplace = (
+        session.query(Workplace)
+        .options(
+            selectinload(Workplace.employees).selectinload(Employee.settings),
+            selectinload(Workplace.shifts),
+        )
+        .filter(Workplace.id == workplace_id)
+        .one_or_none()
+    )
+    if workplace is None:
+        raise ValueError(f"Workplace {workplace_id} not found.")
+
+    end_date = start_date + timedelta(days=workplace.num_days_in_cycle)
+
+    # 2. Workplace-level optimization weights
+    weights = session.query(WorkplaceWeights).filter(WorkplaceWeights.workplace_id == workplace_id).first()
+
+    # 3. Weekly constraints of this workplace's employees inside the planning window
+    constraints = (
+        session.query(WeeklyConstraint)
+        .join(Employee, Employee.id == WeeklyConstraint.employee_id)
+        .filter(
+            Employee.workplace_id == workplace_id,
+            Employee.is_active.is_(True),
+            WeeklyConstraint.date >= start_date,
+            WeeklyConstraint.date < end_date,
+        )
+        .all()
+    )
+
+    return SolverInput.from_orm(workplace, weights, constraints, start_date)
@@ -1,100 +1,494 @@
+import argparse
 import os
+import sys
 from datetime import date, timedelta
-from database import SessionLocal
-from models import Workplace, Employee, ShiftDefinition, WorkplaceWeights, EmployeeSettings, Assignment
-from solver import ShiftOptimizer
-from excel_writer import create_excel_report_from_db
-from ortools.sat.python import cp_model
-
-
-def get_next_sunday():
-    """
-    Calculates the date of the upcoming Sunday to align the schedule.
-    """
-    today = date.today()
-    days_ahead = 6 - today.weekday()
-    if days_ahead <= 0:
-        days_ahead += 7
-    return today + timedelta(days=days_ahead)
-
-
-def save_results_to_db(session, results, workplace_id, start_date):
-    """
-    Clears old assignments and saves new ones with mapped dates.
-    """
-    # Remove existing assignments for this workplace to prevent duplicates
-    session.query(Assignment).filter(Assignment.workplace_id == workplace_id).delete()
-
-    for res in results:
-        # Map solver day index (0-6) to actual calendar date
-        assignment_date = start_date + timedelta(days=res["day_index"])
-
-        assignment = Assignment(
-            workplace_id=res["workplace_id"],
-            employee_id=res["employee_id"],
-            shift_id=res["shift_id"],
-            date=assignment_date
-        )
-        session.add(assignment)
-    session.commit()
-
-
-def main():
-    session = SessionLocal()
-    workplace_name = "SL_HE"  # Match the name used in seed.py
 
-    try:
+# NOTE: Keep module-level imports light. OR-Tools, SQLAlchemy and openpyxl are
+# imported inside the command that needs them, so short commands such as
+# 'list-workplaces' start without paying for the solver stack.
+
+DEFAULT_WORKPLACE = "SL_HE"  # Match the name used in seed.py
+
+
+def _parse_date(value):
+    return date.fromisoformat(value)
+
+
+def _week_start(day):
+    """Returns the Sunday on or before the given date."""
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+def cmd_solve(args):
+    if args.all:
+        return _solve_all(args)
+
+    from database import session_scope
+    from models import Workplace
+    from scheduling import get_next_sunday, solve_workplace_week
+
+    with session_scope() as session:
         # 1. Fetch Environment from DB
-        workplace = session.query(Workplace).filter(Workplace.name == workplace_name).first()
+        workplace = session.query(Workplace).filter(Workplace.name == args.workplace).first()
         if not workplace:
-            print(f"Error: Workplace '{workplace_name}' not found. Please run seed.py first.")
+            print(f"Error: Workplace '{args.workplace}' not found. Please run seed.py first.")
             return
 
-        # Prepare data for solver
-        employees = [e for e in workplace.employees if e.is_active]
-        shifts = workplace.shifts
-        weights = session.query(WorkplaceWeights).filter(WorkplaceWeights.workplace_id == workplace.id).first()
-
-        # Load specific employee contract settings
-        emp_settings_dict = {
-            s.employee_id: s for s in session.query(EmployeeSettings).filter(
-                EmployeeSettings.employee_id.in_([e.id for e in employees])
-            ).all()
-        }
-
         print(f"--- System Ready: Starting Optimization for {workplace.name} ---")
 
-        # 2. Execute Solver
-        optimizer = ShiftOptimizer(
-            workplace_id=workplace.id,
-            employees=employees,
-            shifts=shifts,
-            weights=weights
-        )
-        status = optimizer.solve(emp_settings_dict)
+        # 2. Execute Solver and persist to Database
+        start_date = args.start_date or get_next_sunday()
+        outcome = solve_workplace_week(session, workplace.id, start_date, num_alternatives=args.alternatives,
+                                       capture_dir=args.capture_dir, decompose=args.decompose)
+        if outcome.get("parts"):
+            sizes = ", ".join(f"{p['num_employees']}x{p['num_cells']}" for p in outcome["parts"])
+            print(f"Solved {len(outcome['parts'])} independent part(s) (employees x cells): {sizes}")
+        if outcome.get("capture_path"):
+            print(f"Captured instance: {outcome['capture_path']}")
+        if outcome.get("presolve"):
+            report = outcome["presolve"]
+            print(f"Presolve: fixed {report['cells_fixed']} of {report['cells']} cells "
+                  f"({report['employees_dropped']} employee(s) dropped), eliminated "
+                  f"{report['variables_eliminated']} variables and {report['constraints_eliminated']} constraints")
+        if len(outcome.get("workplace_ids", ())) > 1:
+            print(f"Solved jointly with linked workplaces (shared staff): {outcome['workplace_ids']}")
 
         # 3. Handle Output
-        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-            print(f"✅ Solver Success! Objective: {optimizer.solver.ObjectiveValue()}")
-
-            # Extract results and determine start date
-            results = optimizer.get_results_as_dicts()
-            start_date = get_next_sunday()
-
-            # Persist to Database
-            save_results_to_db(session, results, workplace.id, start_date)
+        if outcome["objective"] is not None:
+            print(f"✅ Solver Success! Objective: {outcome['objective']}")
+            by_family = {}
+            for row in outcome.get("penalties", ()):
+                by_family[row["family"]] = by_family.get(row["family"], 0) + row["penalty"]
+            if by_family:
+                print("Penalties: " + ", ".join(f"{family} {total}" for family, total in sorted(by_family.items()))
+                      + " (details: 'python main.py explain')")
+            if outcome.get("draft_ids"):
+                print(f"Saved {len(outcome['draft_ids'])} alternative schedules as drafts: {outcome['draft_ids']}")
 
             # Generate Visual Excel Report from the saved DB data
+            from excel_writer import create_excel_report_from_db
             create_excel_report_from_db(session, workplace.id, start_date)
 
         else:
             print("❌ Solver failed to find a valid solution.")
+            if outcome.get("precheck"):
+                print("Infeasible before solving:")
+                for reason in outcome["precheck"].reasons:
+                    print(f"  - {reason}")
+
+
+def _solve_all(args):
+    from database import session_scope
+    from models import Workplace
+    from pooling import solve_all_workplaces
+    from scheduling import get_next_sunday
+
+    with session_scope() as session:
+        start_date = args.start_date or get_next_sunday()
+        names = dict(session.query(Workplace.id, Workplace.name))
+        print(f"--- System Ready: Starting Optimization for all {len(names)} workplaces ---")
+
+        for outcome in solve_all_workplaces(session, start_date):
+            sites = " + ".join(names[wp_id] for wp_id in outcome["workplace_ids"])
+            if outcome["objective"] is not None:
+                print(f"✅ {sites}: {outcome['status']}, objective {outcome['objective']}")
+                from excel_writer import create_excel_report_from_db
+                for wp_id in outcome["workplace_ids"]:
+                    create_excel_report_from_db(session, wp_id, start_date)
+            else:
+                print(f"❌ {sites}: {outcome['status']}")
+                for reason in outcome["precheck"].reasons if outcome.get("precheck") else ():
+                    print(f"  - {reason}")
+
+
+def cmd_list_workplaces(args):
+    from database import session_scope
+    from models import Workplace
+
+    with session_scope() as session:
+        for workplace in session.query(Workplace).order_by(Workplace.id):
+            print(f"{workplace.id}\t{workplace.name}")
+
+
+def cmd_export(args):
+    from sqlalchemy import func
+    from database import session_scope
+    from models import Workplace, Assignment
+
+    with session_scope() as session:
+        workplace = session.query(Workplace).filter(Workplace.name == args.workplace).first()
+        if not workplace:
+            print(f"Error: Workplace '{args.workplace}' not found.")
+            return
+
+        if args.format != "xlsx":
+            return _export_stream(session, workplace, args)
+
+        start_date = args.start_date
+        if start_date is None:
+            # Default to the last week that has saved assignments
+            last_date = session.query(func.max(Assignment.date)).filter(
+                Assignment.workplace_id == workplace.id
+            ).scalar()
+            if last_date is None:
+                print(f"No assignments saved for '{workplace.name}' yet.")
+                return
+            start_date = _week_start(last_date)
+
+        from excel_writer import create_excel_report_from_db
+        create_excel_report_from_db(session, workplace.id, start_date)
+
+
+def _export_stream(session, workplace, args):
+    """Machine formats: the whole history unless --start-date/--end-date narrow it."""
+    from exporters import iter_assignment_rows, iter_csv, iter_ndjson, write_chunks, write_ical_feeds
+
+    rows = iter_assignment_rows(session, workplace.id, args.start_date, args.end_date)
+    if args.format == "ics":
+        directory = args.output if args.output != "-" else "calendars"
+        count = write_ical_feeds(rows, directory)
+        print(f"✅ Wrote {count} employee calendar(s) to: {directory}")
+        return
+
+    write_chunks(iter_csv(rows) if args.format == "csv" else iter_ndjson(rows), args.output)
+    if args.output != "-":
+        print(f"✅ Schedule exported as: {args.output}")
+
+
+def cmd_stats(args):
+    from database import session_scope
+    from models import Workplace
+    from analytics import employee_shift_counts, fairness_report
+
+    with session_scope() as session:
+        workplace = session.query(Workplace).filter(Workplace.name == args.workplace).first()
+        if not workplace:
+            print(f"Error: Workplace '{args.workplace}' not found.")
+            return
+
+        end_date = _week_start(date.today()) + timedelta(days=7 * 2)  # Include the upcoming planned week
+        start_date = end_date - timedelta(days=7 * args.weeks)
+
+        print(f"--- {workplace.name}: weeks {start_date} .. {end_date - timedelta(days=1)} ---")
+        for row in employee_shift_counts(session, workplace.id, start_date, end_date):
+            print(f"{row['employee_name']:<12}{row['shift_name']:<10}"
+                  f"shifts={row['shifts']:<4}weekend={row['weekend_shifts']:<4}rest_gaps={row['rest_gaps']}")
+        for metric, value in fairness_report(session, workplace.id, start_date, end_date).items():
+            print(f"Fairness ({metric}): {value:.3f}")
+
+
+def cmd_scenarios(args):
+    from database import session_scope
+    from models import Workplace
+    from loader import load_solver_input
+    from scheduling import get_next_sunday
+    from scenarios import ScenarioRunner, load_scenarios, format_comparison
+
+    with session_scope() as session:
+        workplace = session.query(Workplace).filter(Workplace.name == args.workplace).first()
+        if not workplace:
+            print(f"Error: Workplace '{args.workplace}' not found.")
+            return
+        data = load_solver_input(session, workplace.id, args.start_date or get_next_sunday())
+
+    # The session is closed here: scenarios run on the snapshot only and never touch the DB
+    runner = ScenarioRunner(data, max_workers=args.workers, time_limit=args.time_limit)
+    rows = runner.run(load_scenarios(args.file))
+    print(f"--- {data.workplace_name}: {len(rows)} scenarios (base model built in {runner.base_build_ms:.1f} ms) ---")
+    print(format_comparison(rows))
+
+
+def cmd_replay(args):
+    from instance_capture import replay_instance, iter_capture_files
+
+    overrides = " ".join(p.replace("=", ": ", 1) for p in args.param)
+    print(f"{'instance':<48}{'captured':>22}{'replayed':>22}{'captured s':>12}{'best s':>10}{'speedup':>9}")
+    for path in iter_capture_files(args.paths):
+        r = replay_instance(path, overrides, repeat=args.repeat, rebuild=args.rebuild)
+        run = r["runs"][-1]
+        captured = f"{r['captured']['status']} {r['captured']['objective']}"
+        replayed = f"{run['status']} {run['objective']}" + ("" if r["same_objective"] else " (!)")
+        speedup = f"{r['speedup']:.2f}x" if r["speedup"] else "-"
+        print(f"{os.path.basename(path):<48}{captured:>22}{replayed:>22}"
+              f"{r['captured']['wall_time'] or 0:>12.3f}{r['best_wall_time']:>10.3f}{speedup:>9}")
+
+
+def cmd_validate(args):
+    from database import session_scope
+    from models import Workplace
+    from pooling import linked_workplaces, load_pooled_input
+    from validator import ScheduleValidator, HARD_RULES
+
+    with session_scope() as session:
+        workplace = session.query(Workplace).filter(Workplace.name == args.workplace).first()
+        if not workplace:
+            print(f"Error: Workplace '{args.workplace}' not found.")
+            return
+        # Linked sites were solved as one schedule, so they are validated as one
+        data = load_pooled_input(session, linked_workplaces(session, workplace.id), args.start_date)
+        validator = ScheduleValidator(data)
+        report = validator.evaluate(validator.load_assignments(session, draft_id=args.draft))
+
+    label = f"draft {args.draft}" if args.draft else "live schedule"
+    print(f"--- {data.workplace_name} {data.start_date} ({label}) ---")
+    for rule in HARD_RULES:
+        print(f"{'✅' if report[rule] == 0 else '❌'} {rule}: {int(report[rule])}")
+    print(f"Objective: {int(report['objective'])} "
+          f"(rest_gap={int(report['rest_gap'])}, target_shifts={int(report['target_shifts'])})")
+    print(f"Short rests: {int(report['rest_gap_pairs'])}, 3-night sequences: {int(report['consecutive_nights'])}")
 
+
+def cmd_import_availability(args):
+    from database import session_scope
+    from models import Workplace
+    from scheduling import get_next_sunday
+    from availability_import import read_availability, import_availability, AvailabilityError
+
+    with session_scope() as session:
+        workplace = session.query(Workplace).filter(Workplace.name == args.workplace).first()
+        if not workplace:
+            print(f"Error: Workplace '{args.workplace}' not found.")
+            return
+        start_date = args.start_date or get_next_sunday()
+        try:
+            summary = import_availability(session, workplace.id, start_date, read_availability(args.file, args.sheet))
+        except AvailabilityError as e:
+            print(f"❌ Nothing imported, {len(e.errors)} invalid row(s):")
+            for row, message in e.errors:
+                print(f"  row {row}: {message}")
+            return
+        print(f"✅ Imported {summary['inserted']} constraint(s) for {summary['employees']} employee(s) "
+              f"(replaced {summary['replaced']}), week of {start_date}")
+
+
+def cmd_explain(args):
+    from database import session_scope
+    from models import Workplace, Employee, PenaltyBreakdown
+
+    with session_scope() as session:
+        workplace = session.query(Workplace).filter(Workplace.name == args.workplace).first()
+        if not workplace:
+            print(f"Error: Workplace '{args.workplace}' not found.")
+            return
+
+        query = session.query(Employee.name, PenaltyBreakdown.date, PenaltyBreakdown.family,
+                              PenaltyBreakdown.units, PenaltyBreakdown.penalty).join(
+            Employee, Employee.id == PenaltyBreakdown.employee_id).filter(
+            PenaltyBreakdown.workplace_id == workplace.id, PenaltyBreakdown.week_start == args.start_date)
+        if args.employee:
+            query = query.filter(Employee.name == args.employee)
+        rows = query.order_by(Employee.name, PenaltyBreakdown.date, PenaltyBreakdown.family).all()
+
+        print(f"--- {workplace.name}: penalties of the week of {args.start_date} ---")
+        if not rows:
+            print("No penalties stored (no penalized rule was hit, or the week was not solved).")
+            return
+        totals = {}
+        for name, day, family, units, penalty in rows:
+            totals[name] = totals.get(name, 0) + penalty
+            print(f"{name:<12}{str(day) if day else 'week':<12}{family:<20}units={units:<4}penalty={penalty}")
+        for name, total in sorted(totals.items(), key=lambda item: -item[1]):
+            print(f"Total {name}: {total}")
+
+
+def cmd_archive(args):
+    from database import session_scope
+    from models import Workplace
+    from history_archive import archive_assignments
+    import config
+
+    keep_weeks = config.ARCHIVE_KEEP_WEEKS if args.keep_weeks is None else args.keep_weeks
+    before = _week_start(date.today()) - timedelta(days=7 * keep_weeks)
+    with session_scope() as session:
+        query = session.query(Workplace).order_by(Workplace.id)
+        workplaces = query.all() if args.all else query.filter(Workplace.name == args.workplace).all()
+        if not workplaces:
+            print(f"Error: Workplace '{args.workplace}' not found.")
+            return
+        for workplace in workplaces:
+            summary = archive_assignments(session, workplace.id, before)
+            print(f"✅ {workplace.name}: archived {summary['rows']} assignment(s) before {before} "
+                  f"into {summary['bitmaps']} weekly bitmap(s)")
+
+
+def cmd_history(args):
+    from database import session_scope
+    from models import Workplace, Employee
+    from history_archive import load_history
+
+    with session_scope() as session:
+        workplace = session.query(Workplace).filter(Workplace.name == args.workplace).first()
+        if not workplace:
+            print(f"Error: Workplace '{args.workplace}' not found.")
+            return
+
+        planned_week = _week_start(date.today()) + timedelta(days=7)
+        end_date = planned_week + timedelta(days=7)  # Include the upcoming planned week
+        start_date = end_date - timedelta(days=7 * args.weeks)
+        history = load_history(session, workplace.id, start_date, end_date)
+        names = dict(session.query(Employee.id, Employee.name))
+
+        totals, per_shift, weekend = history.total_shifts(), history.shift_counts(), history.weekend_shifts()
+        longest, current = history.streaks()
+        flags = history.last_week_flags(planned_week)  # From the week before the planned one
+        print(f"--- {workplace.name}: weeks {start_date} .. {end_date - timedelta(days=1)} "
+              f"(last_weekend = the weekend before the week of {planned_week}) ---")
+        for i, emp_id in enumerate(history.employee_ids):
+            last_weekend = ",".join(name[len("worked_last_"):] for name, values in flags.items() if values[i])
+            print(f"{names.get(int(emp_id), emp_id):<12}shifts={totals[i]:<4}"
+                  f"by_shift={'/'.join(str(c) for c in per_shift[i]):<10}weekend={weekend[i]:<4}"
+                  f"longest_streak={longest[i]:<4}current_streak={current[i]:<4}last_weekend={last_weekend or '-'}")
+
+
+def cmd_enqueue(args):
+    from database import session_scope
+    from models import Workplace
+    from scheduling import get_next_sunday
+    import job_queue
+
+    with session_scope() as session:
+        query = session.query(Workplace).order_by(Workplace.id)
+        workplaces = query.all() if args.all else query.filter(Workplace.name == args.workplace).all()
+        if not workplaces:
+            print(f"Error: Workplace '{args.workplace}' not found.")
+            return
+        start_date = args.start_date or get_next_sunday()
+        for workplace in workplaces:
+            job = job_queue.enqueue(session, workplace.id, start_date)
+            print(f"✅ Job {job.id}: {workplace.name}, week of {start_date} ({job.status.value})")
+
+
+def cmd_worker(args):
+    from worker import run_worker
+
+    run_worker(worker_id=args.worker_id, lease_seconds=args.lease, poll_seconds=args.poll,
+               num_workers=args.solver_workers, exit_when_idle=args.drain)
+
+
+def cmd_jobs(args):
+    from database import session_scope
+    import job_queue
+
+    with session_scope() as session:
+        for job in job_queue.list_jobs(session, args.limit):
+            result = f"{job.result_status} {job.objective}" if job.result_status else (job.error or "")
+            print(f"{job.id}\t{job.status.value}\tworkplace {job.workplace_id}\t{job.start_date}\t"
+                  f"attempt {job.attempts}/{job.max_attempts}\t{job.worker_id or '-'}\t{result}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Auto-shift scheduling")
+    sub = parser.add_subparsers(dest="command")
+
+    solve = sub.add_parser("solve", help="Solve a week and save the schedule (default command)")
+    solve.add_argument("--workplace", default=DEFAULT_WORKPLACE)
+    solve.add_argument("--start-date", type=_parse_date, default=None, help="Week start (YYYY-MM-DD), default next Sunday")
+    solve.add_argument("--alternatives", type=int, default=0, help="Also store up to N near-optimal drafts")
+    solve.add_argument("--capture-dir", default=None, help="Dump the solve instance for offline replay")
+    solve.add_argument("--all", action="store_true",
+                       help="Solve every workplace (linked sites jointly, the rest in parallel)")
+    solve.add_argument("--decompose", action="store_true",
+                       help="Solve independent employee/shift groups as separate models in parallel")
+    solve.set_defaults(handler=cmd_solve)
+
+    list_wp = sub.add_parser("list-workplaces", help="List workplaces in the database")
+    list_wp.set_defaults(handler=cmd_list_workplaces)
+
+    export = sub.add_parser("export", help="Write the Excel report of a saved week")
+    export.add_argument("--workplace", default=DEFAULT_WORKPLACE)
+    export.add_argument("--start-date", type=_parse_date, default=None,
+                        help="Week start (xlsx, default the last saved week) or first day of the range")
+    export.add_argument("--end-date", type=_parse_date, default=None, help="End of the range, exclusive (csv/ndjson/ics)")
+    export.add_argument("--format", choices=("xlsx", "csv", "ndjson", "ics"), default="xlsx")
+    export.add_argument("--output", default="-",
+                        help="File for csv/ndjson ('-' = stdout), directory for ics (default 'calendars')")
+    export.set_defaults(handler=cmd_export)
+
+    stats = sub.add_parser("stats", help="Per-employee load and fairness over recent weeks")
+    stats.add_argument("--workplace", default=DEFAULT_WORKPLACE)
+    stats.add_argument("--weeks", type=int, default=13, help="Number of weeks to cover (13 = a quarter)")
+    stats.set_defaults(handler=cmd_stats)
+
+    scenarios = sub.add_parser("scenarios", help="Compare what-if variants without saving anything")
+    scenarios.add_argument("file", help="JSON list of scenarios (see scenarios.Scenario)")
+    scenarios.add_argument("--workplace", default=DEFAULT_WORKPLACE)
+    scenarios.add_argument("--start-date", type=_parse_date, default=None)
+    scenarios.add_argument("--workers", type=int, default=None, help="Parallel solves (default: CPU count)")
+    scenarios.add_argument("--time-limit", type=float, default=None, help="Seconds per scenario")
+    scenarios.set_defaults(handler=cmd_scenarios)
+
+    replay = sub.add_parser("replay", help="Re-run captured instances offline and compare timings")
+    replay.add_argument("paths", nargs="+", help="Capture files or directories")
+    replay.add_argument("--param", action="append", default=[], help="SatParameters override, e.g. num_workers=1")
+    replay.add_argument("--repeat", type=int, default=1)
+    replay.add_argument("--rebuild", action="store_true", help="Rebuild the model from the captured snapshot")
+    replay.set_defaults(handler=cmd_replay)
+
+    validate = sub.add_parser("validate", help="Check a saved week (or draft) against the rules without solving")
+    validate.add_argument("--workplace", default=DEFAULT_WORKPLACE)
+    validate.add_argument("--start-date", type=_parse_date, required=True)
+    validate.add_argument("--draft", type=int, default=None, help="Validate a ScheduleDraft instead of the live week")
+    validate.set_defaults(handler=cmd_validate)
+
+    availability = sub.add_parser("import-availability",
+                                  help="Load a week's availability (.xlsx/.csv: employee, date|day, shift, type)")
+    availability.add_argument("file")
+    availability.add_argument("--workplace", default=DEFAULT_WORKPLACE)
+    availability.add_argument("--start-date", type=_parse_date, default=None, help="Week start, default next Sunday")
+    availability.add_argument("--sheet", default=None, help="Worksheet name (default: the active sheet)")
+    availability.set_defaults(handler=cmd_import_availability)
+
+    explain = sub.add_parser("explain", help="Show where a saved week's objective penalties come from")
+    explain.add_argument("--workplace", default=DEFAULT_WORKPLACE)
+    explain.add_argument("--start-date", type=_parse_date, required=True)
+    explain.add_argument("--employee", default=None, help="Only this employee (by name)")
+    explain.set_defaults(handler=cmd_explain)
+
+    archive = sub.add_parser("archive", help="Pack old assignment rows into weekly bitmaps")
+    archive.add_argument("--workplace", default=DEFAULT_WORKPLACE)
+    archive.add_argument("--all", action="store_true", help="Archive every workplace")
+    archive.add_argument("--keep-weeks", type=int, default=None,
+                         help="Weeks before the current one kept as rows (default config.ARCHIVE_KEEP_WEEKS)")
+    archive.set_defaults(handler=cmd_archive)
+
+    history = sub.add_parser("history", help="Per-employee counts, streaks and weekend flags from the history")
+    history.add_argument("--workplace", default=DEFAULT_WORKPLACE)
+    history.add_argument("--weeks", type=int, default=13, help="Number of weeks to cover (13 = a quarter)")
+    history.set_defaults(handler=cmd_history)
+
+    enqueue = sub.add_parser("enqueue", help="Queue a week's solve for the workers")
+    enqueue.add_argument("--workplace", default=DEFAULT_WORKPLACE)
+    enqueue.add_argument("--start-date", type=_parse_date, default=None, help="Week start, default next Sunday")
+    enqueue.add_argument("--all", action="store_true", help="Queue every workplace")
+    enqueue.set_defaults(handler=cmd_enqueue)
+
+    worker = sub.add_parser("worker", help="Claim and solve queued weeks until stopped")
+    worker.add_argument("--worker-id", default=None, help="Name recorded on claimed jobs (default host:pid)")
+    worker.add_argument("--lease", type=int, default=None, help="Lease length in seconds")
+    worker.add_argument("--poll", type=float, default=None, help="Seconds between polls of an empty queue")
+    worker.add_argument("--solver-workers", type=int, default=None, help="CP-SAT workers per solve")
+    worker.add_argument("--drain", action="store_true", help="Exit once the queue is empty")
+    worker.set_defaults(handler=cmd_worker)
+
+    jobs = sub.add_parser("jobs", help="List recent queued solves")
+    jobs.add_argument("--limit", type=int, default=20)
+    jobs.set_defaults(handler=cmd_jobs)
+
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        # No command: 'python main.py [--workplace ...]' keeps its original meaning (solve)
+        argv = ["solve"] + argv
+    args = build_parser().parse_args(argv)
+
+    try:
+        args.handler(args)
     except Exception as e:
         print(f"Critical Error: {e}")
-    finally:
-        session.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,47 @@
+from ortools.sat.python import cp_model
+
+# CP-SAT models and parameters are moved between processes (and files) as protobuf
+# text format. Depending on the OR-Tools version, protos are either regular protobuf
+# messages or pybind wrappers without SerializeToString; text format works for both.
+
+
+def _parse_text(text, proto):
+    if hasattr(proto, "parse_text_format"):
+        proto.parse_text_format(text)
+    else:
+        from google.protobuf import text_format
+        text_format.Parse(text, proto)
+
+
+def _merge_text(text, proto):
+    if hasattr(proto, "merge_text_format"):
+        proto.merge_text_format(text)
+    else:
+        from google.protobuf import text_format
+        text_format.Merge(text, proto)
+
+
+def model_to_text(model: cp_model.CpModel) -> str:
+    return str(model.Proto())
+
+
+def model_from_text(text: str) -> cp_model.CpModel:
+    model = cp_model.CpModel()
+    _parse_text(text, model.Proto())
+    return model
+
+
+def parameters_to_text(solver: cp_model.CpSolver) -> str:
+    return str(solver.parameters)
+
+
+def solver_from_parameters_text(text: str) -> cp_model.CpSolver:
+    solver = cp_model.CpSolver()
+    if text:
+        _parse_text(text, solver.parameters)
+    return solver
+
+
+def merge_parameters_text(solver: cp_model.CpSolver, text: str):
+    """Overrides individual parameters, e.g. 'num_workers: 8 max_time_in_seconds: 10'."""
+    _merge_text(text, solver.parameters)
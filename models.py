@@ -1,7 +1,8 @@
 import enum
-from datetime import datetime
+from datetime import datetime, time
 from typing import Optional, List
-from sqlalchemy import String, Integer, ForeignKey, Boolean, Date, DateTime
+from sqlalchemy import (String, Integer, BigInteger, ForeignKey, Boolean, Date, DateTime, Time,
+                        UniqueConstraint, Index)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -55,11 +56,25 @@ class ShiftDefinition(Base):
     workplace_id: Mapped[int] = mapped_column(ForeignKey("workplaces.id"))
     shift_name: Mapped[str] = mapped_column(String(50))  # e.g., 'Morning'
     num_staff: Mapped[int] = mapped_column(default=1)
+    # When the shift runs; a night shift may end after midnight. NULL = derived from the shift's
+    # position in the day (see conflicts.shift_windows)
+    start_time: Mapped[Optional[time]] = mapped_column(Time, nullable=True)
+    duration_minutes: Mapped[Optional[int]] = mapped_column(nullable=True)
 
     # Relationships
     workplace: Mapped["Workplace"] = relationship(back_populates="shifts")
 
 
+class SharedEmployee(Base):
+    """Lets an employee also work at a workplace other than their home Employee.workplace_id."""
+    __tablename__ = "shared_employees"
+    __table_args__ = (UniqueConstraint("employee_id", "workplace_id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    employee_id: Mapped[int] = mapped_column(ForeignKey("employees.id"))
+    workplace_id: Mapped[int] = mapped_column(ForeignKey("workplaces.id"))
+
+
 class Assignment(Base):
     """The final result produced by OR-Tools: who works where and when."""
     __tablename__ = "assignments"
@@ -74,6 +89,57 @@ class Assignment(Base):
     employee: Mapped["Employee"] = relationship(back_populates="assignments")
 
 
+class ArchivedWeek(Base):
+    """
+    Assignment history past the active planning window: one bitmap per employee and week
+    replaces that week's Assignment rows (see history_archive.py for the bit layout).
+    """
+    __tablename__ = "archived_weeks"
+    __table_args__ = (
+        UniqueConstraint("workplace_id", "employee_id", "week_start"),
+        Index("ix_archived_weeks_workplace_week", "workplace_id", "week_start"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    workplace_id: Mapped[int] = mapped_column(ForeignKey("workplaces.id"))
+    employee_id: Mapped[int] = mapped_column(ForeignKey("employees.id"))
+    week_start: Mapped[datetime] = mapped_column(Date, nullable=False)
+    # Shift ids in bit-slot order at archive time, comma-separated (e.g. '1,2,3')
+    shift_ids: Mapped[str] = mapped_column(String(100))
+    # Bit (day * SLOTS_PER_DAY + slot) set = worked that shift that day
+    bits: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class ScheduleDraft(Base):
+    """A named alternative schedule for one week, kept for the planner to choose from."""
+    __tablename__ = "schedule_drafts"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    workplace_id: Mapped[int] = mapped_column(ForeignKey("workplaces.id"))
+    start_date: Mapped[datetime] = mapped_column(Date, nullable=False)
+    name: Mapped[str] = mapped_column(String(100))  # e.g., 'Option 2'
+    rank: Mapped[int] = mapped_column(default=1)  # 1 = best objective
+    objective: Mapped[int] = mapped_column(default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+    # Relationships
+    assignments: Mapped[List["DraftAssignment"]] = relationship(back_populates="draft", cascade="all, delete-orphan")
+
+
+class DraftAssignment(Base):
+    """Same shape as Assignment, but belonging to a ScheduleDraft instead of the live schedule."""
+    __tablename__ = "draft_assignments"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    draft_id: Mapped[int] = mapped_column(ForeignKey("schedule_drafts.id"))
+    employee_id: Mapped[int] = mapped_column(ForeignKey("employees.id"))
+    shift_id: Mapped[int] = mapped_column(ForeignKey("shift_definitions.id"))
+    date: Mapped[datetime] = mapped_column(Date, nullable=False)
+
+    # Relationships
+    draft: Mapped["ScheduleDraft"] = relationship(back_populates="assignments")
+
+
 # Define types of constraints for better code clarity
 class ConstraintType(enum.Enum):
     CANNOT_WORK = "cannot_work"  # Absolute block
@@ -82,6 +148,44 @@ class ConstraintType(enum.Enum):
     PREFER_YES = "prefer_yes"  # Soft constraint (reward)
 
 
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class QueuedSolveJob(Base):
+    """
+    A workplace/week solve in the durable queue (see job_queue.py). A worker owns a running
+    job while its lease is valid; an expired lease means the worker died and the job is retried.
+    """
+    __tablename__ = "solve_queue"
+    __table_args__ = (Index("ix_solve_queue_status", "status", "lease_expires_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    workplace_id: Mapped[int] = mapped_column(ForeignKey("workplaces.id"))
+    start_date: Mapped[datetime] = mapped_column(Date, nullable=False)
+    status: Mapped[JobStatus] = mapped_column(default=JobStatus.QUEUED)
+    attempts: Mapped[int] = mapped_column(default=0)
+    max_attempts: Mapped[int] = mapped_column(default=3)
+
+    # Lease: set on claim, extended by heartbeats; lease_token identifies the current claim
+    worker_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    lease_token: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    submitted_at: Mapped[datetime] = mapped_column(DateTime)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    # Outcome: solver status name and objective, or the last error
+    result_status: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    objective: Mapped[Optional[int]] = mapped_column(nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+
+
 class EmployeeSettings(Base):
     """Specific contract/preference settings for an employee."""
     __tablename__ = "employee_settings"
@@ -127,4 +231,49 @@ class WorkplaceWeights(Base):
     min_evenings: Mapped[int] = mapped_column(default=2)
 
     # Specific logic weights
-    consecutive_nights: Mapped[int] = mapped_column(default=100)
\ No newline at end of file
+    consecutive_nights: Mapped[int] = mapped_column(default=100)
+
+    # 'weighted' = one blended objective; 'lexicographic' = optimize penalty families one
+    # at a time in priority_order (comma-separated family names, highest priority first)
+    solve_mode: Mapped[str] = mapped_column(String(20), default="weighted")
+    priority_order: Mapped[str] = mapped_column(String(200), default="consecutive_nights,rest_gap,target_shifts")
+
+
+class WeeklySummary(Base):
+    """Materialized per-week assignment counts (employee x shift), kept in sync by save_results_to_db."""
+    __tablename__ = "weekly_summaries"
+    __table_args__ = (
+        UniqueConstraint("workplace_id", "employee_id", "shift_id", "week_start"),
+        Index("ix_weekly_summaries_workplace_week", "workplace_id", "week_start"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    workplace_id: Mapped[int] = mapped_column(ForeignKey("workplaces.id"))
+    employee_id: Mapped[int] = mapped_column(ForeignKey("employees.id"))
+    shift_id: Mapped[int] = mapped_column(ForeignKey("shift_definitions.id"))
+    week_start: Mapped[datetime] = mapped_column(Date, nullable=False)
+
+    num_shifts: Mapped[int] = mapped_column(default=0)
+    num_weekend_shifts: Mapped[int] = mapped_column(default=0)
+    # Short rests ending in this shift (rest below config.SHORT_REST_HOURS after an earlier worked shift)
+    num_rest_gaps: Mapped[int] = mapped_column(default=0)
+
+
+class PenaltyBreakdown(Base):
+    """
+    The saved schedule's objective split by employee, day and rule family, written by
+    save_results_to_db in the same transaction as the assignments (explains a schedule without re-solving).
+    """
+    __tablename__ = "penalty_breakdowns"
+    __table_args__ = (
+        Index("ix_penalty_breakdowns_workplace_week", "workplace_id", "week_start"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    workplace_id: Mapped[int] = mapped_column(ForeignKey("workplaces.id"))
+    employee_id: Mapped[int] = mapped_column(ForeignKey("employees.id"))
+    week_start: Mapped[datetime] = mapped_column(Date, nullable=False)
+    date: Mapped[Optional[datetime]] = mapped_column(Date, nullable=True)  # NULL = weekly term (e.g. target_shifts)
+    family: Mapped[str] = mapped_column(String(30))  # Objective family, e.g. 'rest_gap'
+    units: Mapped[int] = mapped_column(default=0)  # Value of the penalized quantity (short rests, shifts off target)
+    penalty: Mapped[int] = mapped_column(default=0)  # units * the family's weight
@@ -1,5 +1,7 @@
 from ortools.sat.python import cp_model
 import config
+from conflicts import ConflictGraph, history_cells
+from snapshot import ShiftSnapshot
 
 
 def build_and_solve_model(employees):
@@ -8,6 +10,9 @@ def build_and_solve_model(employees):
     num_shifts = config.NUM_SHIFTS
 
     model = cp_model.CpModel()
+    # Shifts are plain indices here; their default time windows give the conflicting pairs
+    shifts = [ShiftSnapshot(id=s, shift_name=f"Shift_{s}") for s in range(num_shifts)]
+    conflicts = ConflictGraph(shifts, num_days)
 
     # --- Variables ---
     shift_vars = {}
@@ -35,22 +40,17 @@ def build_and_solve_model(employees):
                     model.Add(shift_vars[(e_idx, d, s)] == 0)
             continue
 
-        # B. Prevent back-to-back shifts (Global logic, same as before)
-        for total_s in range(num_days * num_shifts - 1):
-            day = total_s // num_shifts
-            shift = total_s % num_shifts
-            next_total_s = total_s + 1
-            next_day = next_total_s // num_shifts
-            next_shift = next_total_s % num_shifts
-            model.Add(shift_vars[(e_idx, day, shift)] + shift_vars[(e_idx, next_day, next_shift)] <= 1)
+        # B. Minimum rest between shifts (hard edges of the conflict graph, incl. last week)
+        for c in conflicts.within_week(hard=True):
+            model.Add(shift_vars[(e_idx, *c.first)] + shift_vars[(e_idx, *c.second)] <= 1)
+        for c in conflicts.from_history(history_cells(emp.state, shifts)):
+            if c.hard:
+                model.Add(shift_vars[(e_idx, *c.second)] == 0)
 
         # Assign unavailable_requests
         for day, shift in emp.state.unavailable_shifts:
             model.Add(shift_vars[(e_idx, day, shift)] == 0)
 
-        if emp.state.worked_last_sat_night:
-            model.Add(shift_vars[(e_idx, 0, 0)] == 0)  # Cannot work Sunday morning
-
         for day, shift in emp.state.forced_shifts:
             # internal validation
             if (day, shift) in emp.state.unavailable_shifts:
@@ -168,26 +168,19 @@ def build_and_solve_model(employees):
             ]).OnlyEnforceIf(is_3night_sequence_start.Not())
             objective_terms.append(is_3night_sequence_start * w['CONSECUTIVE_NIGHTS'])
 
-        # Rest Gap
-        for total_s in range(num_days * num_shifts - 2):
-            day = total_s // num_shifts
-            shift = total_s % num_shifts
-            t_total_s = total_s + 2
-            t_day = t_total_s // num_shifts
-            t_shift = t_total_s % num_shifts
-            both_working = model.NewBoolVar(f'bad_gap_{e_idx}_{total_s}')
-            model.AddBoolAnd([shift_vars[(e_idx, day, shift)], shift_vars[(e_idx, t_day, t_shift)]]).OnlyEnforceIf(
-                both_working)
-            model.AddBoolOr(
-                [shift_vars[(e_idx, day, shift)].Not(), shift_vars[(e_idx, t_day, t_shift)].Not()]).OnlyEnforceIf(
-                both_working.Not())
+        # Rest Gap (soft edges of the conflict graph)
+        for c in conflicts.within_week(hard=False):
+            first = shift_vars[(e_idx, *c.first)]
+            second = shift_vars[(e_idx, *c.second)]
+            both_working = model.NewBoolVar(f'bad_gap_{e_idx}_{c.first[0]}_{c.first[1]}_{c.second[0]}_{c.second[1]}')
+            model.AddBoolAnd([first, second]).OnlyEnforceIf(both_working)
+            model.AddBoolOr([first.Not(), second.Not()]).OnlyEnforceIf(both_working.Not())
             objective_terms.append(both_working * w['REST_GAP'])
 
-        # CHANGE 10: Previous week rest gap using 'emp.state'
-        if emp.state.worked_last_sat_noon:
-            objective_terms.append(shift_vars[(e_idx, 0, 0)] * w['REST_GAP'])
-        if emp.state.worked_last_sat_night:
-            objective_terms.append(shift_vars[(e_idx, 0, 1)] * w['REST_GAP'])
+        # Previous week rest gap using 'emp.state'
+        for c in conflicts.from_history(history_cells(emp.state, shifts)):
+            if not c.hard:
+                objective_terms.append(shift_vars[(e_idx, *c.second)] * w['REST_GAP'])
 
         # Target Shifts using 'emp.prefs'
         total_worked = sum(emp_shifts)
@@ -0,0 +1,143 @@
+import dataclasses
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from models import Workplace, Employee, SharedEmployee
+from snapshot import SolverInput, ConstraintSnapshot, CANNOT_WORK
+from decomposition import DisjointSet, solve_snapshot
+from loader import load_solver_input
+
+
+# ==========================================
+#   Linked sites
+# ==========================================
+
+def linked_workplace_groups(session, workplace_ids=None) -> List[List[int]]:
+    """
+    Groups workplaces that share staff. Two sites are linked when an active employee of
+    one has a SharedEmployee row for the other; links are transitive.
+    :param workplace_ids: Only return the groups containing these sites (default: all groups)
+    :return: Groups of workplace ids (each sorted, ordered by their smallest id)
+    """
+    groups = DisjointSet()
+    for (wp_id,) in session.query(Workplace.id):
+        groups.add(wp_id)
+
+    links = (
+        session.query(Employee.workplace_id, SharedEmployee.workplace_id)
+        .join(Employee, Employee.id == SharedEmployee.employee_id)
+        .filter(Employee.is_active.is_(True))
+    )
+    for home_id, other_id in links:
+        groups.add(home_id)
+        groups.add(other_id)
+        groups.union(home_id, other_id)
+
+    members = {}
+    for wp_id in groups.parent:
+        members.setdefault(groups.find(wp_id), []).append(wp_id)
+    result = sorted(sorted(group) for group in members.values())
+    if workplace_ids is not None:
+        wanted = set(workplace_ids)
+        result = [group for group in result if wanted.intersection(group)]
+    return result
+
+
+def linked_workplaces(session, workplace_id) -> List[int]:
+    """The sites that must be solved together with workplace_id (including itself)."""
+    groups = linked_workplace_groups(session, [workplace_id])
+    return groups[0] if groups else [workplace_id]
+
+
+def load_pooled_input(session, workplace_ids, start_date) -> SolverInput:
+    """
+    Loads linked sites as one SolverInput: all their employees and shifts in one model, so a
+    shared employee's one-shift-per-day and weekly limits hold across sites.
+    Employees may only work the shifts of their home site and of the sites they are shared
+    with; the other cells are added as CANNOT_WORK constraints. The joint objective uses the
+    weights of the lowest-id site, whose id also identifies the input.
+    """
+    sites = [load_solver_input(session, wp_id, start_date) for wp_id in sorted(workplace_ids)]
+    if len(sites) == 1:
+        return sites[0]
+    if len({site.num_days for site in sites}) > 1:
+        raise ValueError(f"Linked workplaces {sorted(workplace_ids)} must have the same num_days_in_cycle.")
+
+    # 1. Sites each (active) employee may work at: home + shared
+    eligible = {emp.id: {site.workplace_id} for site in sites for emp in site.employees}
+    shared = session.query(SharedEmployee.employee_id, SharedEmployee.workplace_id).filter(
+        SharedEmployee.employee_id.in_(list(eligible))
+    )
+    for emp_id, wp_id in shared:
+        eligible[emp_id].add(wp_id)
+
+    # 2. Merge, blocking the shifts of sites an employee does not belong to
+    primary = sites[0]
+    employees = tuple(sorted((emp for site in sites for emp in site.employees), key=lambda e: e.id))
+    shifts = tuple(s for site in sites for s in site.shifts)
+    off_site = tuple(
+        ConstraintSnapshot(employee_id=emp.id, day=d, shift_id=s.id, kind=CANNOT_WORK)
+        for emp in employees
+        for s in shifts if s.workplace_id not in eligible[emp.id]
+        for d in range(primary.num_days)
+    )
+    return dataclasses.replace(
+        primary,
+        workplace_name=" + ".join(site.workplace_name for site in sites),
+        employees=employees,
+        shifts=shifts,
+        settings=tuple(s for site in sites for s in site.settings),
+        constraints=tuple(c for site in sites for c in site.constraints) + off_site,
+    )
+
+
+# ==========================================
+#   All sites of a week
+# ==========================================
+
+def solve_all_workplaces(session, start_date, max_workers=None, num_workers=None):
+    """
+    Solves one week for every workplace: linked sites jointly, unlinked sites (or groups)
+    independently in a process pool. Results are saved per site.
+    :param max_workers: Parallel group solves (default: CPU count)
+    :param num_workers: CP-SAT workers per group (default: CPUs / parallel solves)
+    :return: One outcome dict per group (status, objective, assignments, workplace_ids)
+    """
+    from feasibility import check_feasibility
+    from scheduling import save_pooled_results
+
+    groups = linked_workplace_groups(session)
+    inputs = [load_pooled_input(session, group, start_date) for group in groups]
+
+    # 1. Groups the precheck proves infeasible never reach CP-SAT
+    outcomes = [None] * len(groups)
+    pending = []
+    for i, data in enumerate(inputs):
+        report = check_feasibility(data)
+        if report.feasible:
+            pending.append(i)
+        else:
+            outcomes[i] = {"status": "INFEASIBLE", "objective": None, "assignments": [], "precheck": report}
+
+    # 2. Solve the remaining groups side by side
+    if pending:
+        max_workers = min(max_workers or os.cpu_count() or 1, len(pending))
+        if num_workers is None:
+            num_workers = max(1, (os.cpu_count() or 1) // max_workers)
+        if max_workers == 1:
+            for i in pending:
+                outcomes[i] = solve_snapshot(inputs[i], num_workers)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = {i: pool.submit(solve_snapshot, inputs[i], num_workers) for i in pending}
+                for i, future in futures.items():
+                    outcomes[i] = future.result()
+
+    # 3. Persist (in this process; the session never leaves it)
+    for group, data, outcome in zip(groups, inputs, outcomes):
+        outcome["workplace_ids"] = group
+        if outcome["objective"] is not None:
+            save_pooled_results(session, outcome["assignments"], group, start_date, data.num_days,
+                                penalties=outcome["penalties"])
+    return outcomes
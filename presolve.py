@@ -0,0 +1,123 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from conflicts import ConflictGraph, history_cells
+from snapshot import SolverInput, CANNOT_WORK, MUST_WORK
+
+
+@dataclass
+class PresolveResult:
+    """
+    Cells whose value every feasible schedule shares, found before the model is built.
+    ShiftOptimizer turns them into constants instead of BoolVars.
+    """
+    fixed: Dict[Tuple[int, int, int], int] = field(default_factory=dict)  # (emp_id, day, shift_id) -> 0/1
+    # Employees with every cell fixed to 0: none of their variables or constraints reach the model
+    dropped_employees: List[int] = field(default_factory=list)
+    # Set when the rules contradict each other; nothing is fixed then and CP-SAT reports INFEASIBLE
+    contradiction: Optional[str] = None
+    num_cells: int = 0
+
+
+class _Contradiction(Exception):
+    pass
+
+
+def find_fixed_cells(data: SolverInput, conflicts: Optional[ConflictGraph] = None, use_limits=True) -> PresolveResult:
+    """
+    Fixes cells implied by the hard rules, propagated until nothing changes:
+      - CANNOT_WORK and shifts too close to last week's -> 0, MUST_WORK -> 1
+      - a worked cell -> 0 for the employee's other shifts that day and its hard rest conflicts
+      - a cell whose fixed staff reaches num_staff -> 0 for everyone else; a cell with exactly
+        num_staff employees left -> 1 for all of them
+      - an employee whose fixed shifts reach the weekly maximum -> 0 elsewhere (max 0 = all cells)
+    :param conflicts: The ConflictGraph of data's shifts (built here when omitted)
+    :param use_limits: Also apply the num_staff / weekly-maximum rules. Callers that patch those
+                       bounds on a built model afterwards (scenarios) must pass False.
+    """
+    conflicts = conflicts or ConflictGraph(data.shifts, data.num_days)
+    emp_ids = [e.id for e in data.employees if e.is_active]
+    shift_ids = [s.id for s in data.shifts]
+    staff = {s.id: s.num_staff for s in data.shifts}
+    settings = data.settings_by_employee
+    days = range(data.num_days)
+    result = PresolveResult(num_cells=len(emp_ids) * data.num_days * len(shift_ids))
+
+    partners = {}  # (day, shift_id) -> cells in hard conflict with it
+    for c in conflicts.within_week(hard=True):
+        partners.setdefault(c.first, []).append(c.second)
+        partners.setdefault(c.second, []).append(c.first)
+
+    fixed = {}
+
+    def fix(key, value):
+        if key in fixed:
+            if fixed[key] != value:
+                raise _Contradiction(f"Employee {key[0]}, day {key[1]}, shift {key[2]} must be both 0 and 1")
+            return False
+        fixed[key] = value
+        return True
+
+    try:
+        # 1. Direct facts
+        active = set(emp_ids)
+        for c in data.constraints:
+            if c.employee_id in active and c.day in days and c.shift_id in staff:
+                if c.kind == CANNOT_WORK:
+                    fix((c.employee_id, c.day, c.shift_id), 0)
+                elif c.kind == MUST_WORK:
+                    fix((c.employee_id, c.day, c.shift_id), 1)
+        for emp in data.employees:
+            for c in conflicts.from_history(history_cells(emp, data.shifts)):
+                if c.hard:
+                    fix((emp.id, *c.second), 0)
+
+        # 2. Propagation (each pass is linear in the number of cells)
+        changed = True
+        while changed:
+            changed = False
+            for (emp_id, d, s_id), value in list(fixed.items()):
+                if value != 1:
+                    continue
+                for other in shift_ids:
+                    if other != s_id:
+                        changed |= fix((emp_id, d, other), 0)
+                for pd, ps in partners.get((d, s_id), ()):
+                    changed |= fix((emp_id, pd, ps), 0)
+
+            if not use_limits:
+                continue
+            for d in days:
+                for s_id in shift_ids:
+                    if data.demand_cells is not None and (d, s_id) not in data.demand_cells:
+                        continue  # No demand constraint on this cell
+                    ones = [e for e in emp_ids if fixed.get((e, d, s_id)) == 1]
+                    open_ids = [e for e in emp_ids if (e, d, s_id) not in fixed]
+                    if len(ones) > staff[s_id] or len(ones) + len(open_ids) < staff[s_id]:
+                        raise _Contradiction(f"Day {d}, shift {s_id} cannot get exactly {staff[s_id]} employees")
+                    if open_ids and len(ones) == staff[s_id]:
+                        for e in open_ids:
+                            changed |= fix((e, d, s_id), 0)
+                    elif open_ids and len(ones) + len(open_ids) == staff[s_id]:
+                        for e in open_ids:
+                            changed |= fix((e, d, s_id), 1)
+            for emp_id in emp_ids:
+                s = settings.get(emp_id)
+                if s is None:
+                    continue
+                ones = sum(1 for d in days for s_id in shift_ids if fixed.get((emp_id, d, s_id)) == 1)
+                if ones > s.max_shifts_per_week:
+                    raise _Contradiction(f"Employee {emp_id} must work {ones} shifts, maximum is {s.max_shifts_per_week}")
+                if ones == s.max_shifts_per_week:
+                    for d in days:
+                        for s_id in shift_ids:
+                            if (emp_id, d, s_id) not in fixed:
+                                changed |= fix((emp_id, d, s_id), 0)
+    except _Contradiction as e:
+        result.contradiction = str(e)
+        return result
+
+    result.fixed = fixed
+    result.dropped_employees = [e for e in emp_ids
+                                if all(fixed.get((e, d, s_id)) == 0 for d in days for s_id in shift_ids)]
+    return result
@@ -0,0 +1,250 @@
+import dataclasses
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from ortools.sat.python import cp_model
+from model_io import model_to_text, model_from_text, parameters_to_text, solver_from_parameters_text
+from snapshot import SolverInput, SettingsSnapshot, WeightsSnapshot
+from solver import ShiftOptimizer
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """
+    A what-if variant of a workplace/week. Keys may be ids or names:
+      weights:   WeightsSnapshot field -> weight, e.g. {"rest_gap": 80}
+      num_staff: shift id or shift_name -> staff, e.g. {"לילה": 1}
+      settings:  employee id or name -> {"min_shifts_per_week": .., "max_shifts_per_week": ..}
+    """
+    name: str
+    weights: Dict[str, int] = field(default_factory=dict)
+    num_staff: Dict[object, int] = field(default_factory=dict)
+    settings: Dict[object, Dict[str, int]] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            name=data["name"],
+            weights=dict(data.get("weights", {})),
+            num_staff=dict(data.get("num_staff", {})),
+            settings=dict(data.get("settings", {})),
+        )
+
+
+def load_scenarios(path) -> List[Scenario]:
+    """Reads a JSON list of scenario objects (see Scenario)."""
+    with open(path, encoding="utf-8") as f:
+        return [Scenario.from_dict(item) for item in json.load(f)]
+
+
+def _resolve(key, items, name_attr):
+    """Maps an override key (id, numeric string or name) to the id of the matching snapshot."""
+    for item in items:
+        if key == item.id or str(key) == str(item.id) or key == getattr(item, name_attr):
+            return item.id
+    raise ValueError(f"Unknown {name_attr} '{key}' in scenario override.")
+
+
+def apply_overrides(data: SolverInput, scenario: Scenario) -> SolverInput:
+    """
+    Returns a new SolverInput with the scenario's overrides applied (the base is left untouched).
+    A base without weights gets ShiftOptimizer's defaults, so every variant has explicit weights.
+    """
+    weights = data.weights or WeightsSnapshot()
+    if scenario.weights:
+        unknown = set(scenario.weights) - {f.name for f in dataclasses.fields(weights)}
+        if unknown:
+            raise ValueError(f"Unknown weight(s) {sorted(unknown)} in scenario '{scenario.name}'.")
+        weights = dataclasses.replace(weights, **scenario.weights)
+
+    staff = {_resolve(k, data.shifts, "shift_name"): v for k, v in scenario.num_staff.items()}
+    shifts = tuple(dataclasses.replace(s, num_staff=staff[s.id]) if s.id in staff else s for s in data.shifts)
+
+    settings = data.settings_by_employee
+    for key, values in scenario.settings.items():
+        emp_id = _resolve(key, data.employees, "name")
+        base = settings.get(emp_id, SettingsSnapshot(employee_id=emp_id))
+        settings[emp_id] = dataclasses.replace(base, **values)
+
+    return dataclasses.replace(data, weights=weights, shifts=shifts, settings=tuple(settings.values()))
+
+
+def _shift_bounds(model, ct, lower_delta=0, upper_delta=0):
+    """Moves the finite bounds of a linear constraint's domain in the model proto."""
+    domain = model.Proto().constraints[ct.Index()].linear.domain
+    if domain[0] != cp_model.INT_MIN:
+        domain[0] = domain[0] + lower_delta
+    if domain[1] != cp_model.INT_MAX:
+        domain[1] = domain[1] + upper_delta
+
+
+def _solve_model_text(name, model_text, parameters_text, terms):
+    """
+    Process-pool worker: solves a serialized model and splits the objective by family.
+    :param terms: List of (family, var_index, coefficient); var_index None = constant penalty
+    """
+    model = model_from_text(model_text)
+    solver = solver_from_parameters_text(parameters_text)
+    start = time.perf_counter()
+    status = solver.Solve(model)
+    solve_seconds = time.perf_counter() - start
+
+    row = {"scenario": name, "status": solver.StatusName(status), "objective": None,
+           "penalties": {}, "solve_ms": solve_seconds * 1000.0}
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        solution = solver.ResponseProto().solution
+        for family, var_index, coeff in terms:
+            value = 1 if var_index is None else solution[var_index]
+            row["penalties"][family] = row["penalties"].get(family, 0) + coeff * value
+        row["objective"] = sum(row["penalties"].values())
+    return row
+
+
+class ScenarioRunner:
+    """
+    Builds the base model of a workplace/week once, derives each scenario from it by
+    patching constraint bounds and objective coefficients, and solves all variants
+    concurrently in a process pool. Nothing is written to the database.
+
+    Scenarios always use the weighted objective (solve_mode is ignored).
+    """
+
+    def __init__(self, data: SolverInput, max_workers=None, time_limit=None):
+        self.data = data
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.time_limit = time_limit
+
+        start = time.perf_counter()
+        # Demand and weekly limits are patched per variant, so presolve must not fix cells from them
+        optimizer = ShiftOptimizer.from_input(data, presolve_limits=False)
+        self._manager = optimizer.build_model(data.settings_by_employee)
+        self._base_model = optimizer.model
+        self.base_build_ms = (time.perf_counter() - start) * 1000.0
+
+    def _parameters_text(self):
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = max(1, (os.cpu_count() or 1) // self.max_workers)
+        if self.time_limit:
+            solver.parameters.max_time_in_seconds = self.time_limit
+        return parameters_to_text(solver)
+
+    def _is_patchable(self, variant: SolverInput):
+        """
+        Settings for employees without base settings add constraints, so they need a full build.
+        So do changes to constraints presolve turned into constants (no handle to patch).
+        """
+        base = self.data.settings_by_employee
+        if not all(emp_id in base for emp_id in variant.settings_by_employee):
+            return False
+        manager = self._manager
+        base_staff = {s.id: s.num_staff for s in self.data.shifts}
+        changed_shifts = {s.id for s in variant.shifts if s.num_staff != base_staff[s.id]}
+        if any(ct is None for (d, s_id), ct in manager.demand_constraints.items() if s_id in changed_shifts):
+            return False
+        for emp_id, settings in variant.settings_by_employee.items():
+            if settings != base[emp_id] and (any(ct is None for ct in manager.weekly_limit_constraints[emp_id])
+                                             or emp_id not in manager.target_constraints):
+                return False
+        return True
+
+    def build_variant(self, variant: SolverInput):
+        """
+        :return: (model, terms) where terms is a list of (family, var_index, coefficient)
+                 (var_index None for constant penalties)
+        """
+        if not self._is_patchable(variant):
+            optimizer = ShiftOptimizer.from_input(variant)
+            manager = optimizer.build_model(variant.settings_by_employee)
+            model = optimizer.model
+        else:
+            manager = self._manager
+            model = self._base_model.Clone()
+
+            # 1. Demand (sum == num_staff)
+            base_staff = {s.id: s.num_staff for s in self.data.shifts}
+            for s_def in variant.shifts:
+                delta = s_def.num_staff - base_staff[s_def.id]
+                if delta:
+                    for (d, s_id), ct in manager.demand_constraints.items():
+                        if s_id == s_def.id:
+                            _shift_bounds(model, ct, delta, delta)
+
+            # 2. Weekly limits and the target derived from them
+            base_settings = self.data.settings_by_employee
+            for emp_id, settings in variant.settings_by_employee.items():
+                base = base_settings[emp_id]
+                if settings == base:
+                    continue
+                max_ct, min_ct = manager.weekly_limit_constraints[emp_id]
+                _shift_bounds(model, max_ct, upper_delta=settings.max_shifts_per_week - base.max_shifts_per_week)
+                _shift_bounds(model, min_ct, lower_delta=settings.min_shifts_per_week - base.min_shifts_per_week)
+                if emp_id in manager.target_constraints:
+                    over_ct, under_ct, target = manager.target_constraints[emp_id]
+                    delta = (settings.min_shifts_per_week + settings.max_shifts_per_week) // 2 - target
+                    _shift_bounds(model, over_ct, upper_delta=delta)   # total - delta_var <= target
+                    _shift_bounds(model, under_ct, upper_delta=-delta)  # -total - delta_var <= -target
+
+        # 3. Objective: same terms, re-weighted by family (constant terms go to the offset)
+        coefficients = {}
+        families = {}
+        constants = {}
+        for term in manager.objective_terms:
+            if isinstance(term.var, int):
+                constants[term.family] = constants.get(term.family, 0) + term.var * getattr(variant.weights, term.family)
+                continue
+            index = term.var.Index()
+            coefficients[index] = coefficients.get(index, 0) + getattr(variant.weights, term.family)
+            families[index] = term.family
+        model.Minimize(sum(coeff * model.GetIntVarFromProtoIndex(index) for index, coeff in coefficients.items())
+                       + sum(constants.values()))
+        terms = [(families[index], index, coeff) for index, coeff in coefficients.items()]
+        terms += [(family, None, value) for family, value in constants.items()]
+        return model, terms
+
+    def run(self, scenarios: List[Scenario]):
+        """
+        Solves the base case plus every scenario.
+        :return: List of result rows (base first), see format_comparison
+        """
+        if not any(s.name == "base" for s in scenarios):
+            scenarios = [Scenario(name="base")] + list(scenarios)
+
+        parameters_text = self._parameters_text()
+        jobs = []
+        for scenario in scenarios:
+            start = time.perf_counter()
+            model, terms = self.build_variant(apply_overrides(self.data, scenario))
+            build_ms = (time.perf_counter() - start) * 1000.0
+            jobs.append((scenario.name, model_to_text(model), terms, build_ms))
+
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as pool:
+            futures = [pool.submit(_solve_model_text, name, text, parameters_text, terms)
+                       for name, text, terms, _ in jobs]
+            rows = [future.result() for future in futures]
+
+        for row, (_, _, _, build_ms) in zip(rows, jobs):
+            row["build_ms"] = build_ms
+        return rows
+
+
+def format_comparison(rows):
+    """Renders scenario results as a fixed-width comparison table."""
+    families = sorted({family for row in rows for family in row["penalties"]})
+    base = next((row["objective"] for row in rows if row["scenario"] == "base"), None)
+
+    header = f"{'scenario':<24}{'status':<12}{'objective':>10}{'vs base':>9}"
+    header += "".join(f"{family:>20}" for family in families) + f"{'build ms':>10}{'solve ms':>10}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        objective = row["objective"]
+        diff = objective - base if objective is not None and base is not None else None
+        line = f"{row['scenario']:<24}{row['status']:<12}"
+        line += f"{'-' if objective is None else objective:>10}{'-' if diff is None else f'{diff:+d}':>9}"
+        line += "".join(f"{row['penalties'].get(family, '-'):>20}" for family in families)
+        line += f"{row['build_ms']:>10.1f}{row['solve_ms']:>10.1f}"
+        lines.append(line)
+    return "\n".join(lines)
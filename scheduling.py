@@ -0,0 +1,252 @@
+from datetime import date, timedelta
+from models import Assignment, ScheduleDraft, DraftAssignment, Employee, PenaltyBreakdown, ArchivedWeek
+from analytics import refresh_weekly_summary
+import config
+
+
+def get_next_sunday():
+    """
+    Calculates the date of the upcoming Sunday to align the schedule.
+    """
+    today = date.today()
+    days_ahead = 6 - today.weekday()
+    if days_ahead <= 0:
+        days_ahead += 7
+    return today + timedelta(days=days_ahead)
+
+
+def save_results_to_db(session, results, workplace_id, start_date, num_days=7, penalties=None, commit=True):
+    """
+    Clears old assignments of the planning window and saves new ones with mapped dates.
+    Only the solved week is replaced, so concurrent jobs for other weeks are not affected.
+    The week's analytics summary rows are refreshed in the same transaction.
+    :param penalties: The schedule's ShiftOptimizer.penalty_breakdown rows, stored with it.
+                      None (e.g. a promoted draft) just clears the previous schedule's rows.
+    :param commit: False leaves the transaction open for the caller (several sites saved atomically)
+    """
+    end_date = start_date + timedelta(days=num_days)
+
+    # Remove existing assignments for this workplace/week to prevent duplicates
+    session.query(Assignment).filter(
+        Assignment.workplace_id == workplace_id,
+        Assignment.date >= start_date,
+        Assignment.date < end_date
+    ).delete(synchronize_session=False)
+    # A re-solved week that was already archived (history_archive.py) is live again
+    session.query(ArchivedWeek).filter(
+        ArchivedWeek.workplace_id == workplace_id,
+        ArchivedWeek.week_start >= start_date,
+        ArchivedWeek.week_start < end_date
+    ).delete(synchronize_session=False)
+
+    for res in results:
+        # Map solver day index (0-6) to actual calendar date
+        assignment_date = start_date + timedelta(days=res["day_index"])
+
+        assignment = Assignment(
+            workplace_id=res["workplace_id"],
+            employee_id=res["employee_id"],
+            shift_id=res["shift_id"],
+            date=assignment_date
+        )
+        session.add(assignment)
+
+    session.query(PenaltyBreakdown).filter(
+        PenaltyBreakdown.workplace_id == workplace_id,
+        PenaltyBreakdown.week_start == start_date
+    ).delete(synchronize_session=False)
+    session.bulk_insert_mappings(PenaltyBreakdown, [
+        {
+            "workplace_id": workplace_id,
+            "employee_id": row["employee_id"],
+            "week_start": start_date,
+            "date": start_date + timedelta(days=row["day_index"]) if row["day_index"] is not None else None,
+            "family": row["family"],
+            "units": row["units"],
+            "penalty": row["penalty"],
+        }
+        for row in penalties or ()
+    ])
+
+    # Keep the materialized analytics summary in sync, in the same transaction
+    session.flush()
+    refresh_weekly_summary(session, workplace_id, start_date, num_days)
+    if commit:
+        session.commit()
+
+
+def save_pooled_results(session, results, workplace_ids, start_date, num_days=7, penalties=None):
+    """
+    Saves a week solved jointly for linked sites: every site's window is replaced by
+    the assignments of its own shifts (a site without any is cleared), in one transaction.
+    Penalties are filed under each employee's home site.
+    """
+    by_site = {wp_id: [] for wp_id in workplace_ids}
+    for res in results:
+        by_site[res["workplace_id"]].append(res)
+
+    penalties_by_site = {wp_id: [] for wp_id in workplace_ids}
+    if penalties:
+        home = dict(session.query(Employee.id, Employee.workplace_id).filter(
+            Employee.id.in_({row["employee_id"] for row in penalties})))
+        for row in penalties:
+            penalties_by_site[home[row["employee_id"]]].append(row)  # A home outside the group is a bug: fail loudly
+
+    for wp_id, site_results in by_site.items():
+        save_results_to_db(session, site_results, wp_id, start_date, num_days,
+                           penalties=penalties_by_site[wp_id] if penalties is not None else None, commit=False)
+    session.commit()
+
+
+def save_drafts_to_db(session, alternatives, workplace_id, start_date):
+    """
+    Replaces the week's drafts with the given alternative schedules ('Option 1' = best).
+    :param alternatives: List of dicts {"objective", "assignments"} from ShiftOptimizer.collect_alternatives
+    :return: The ids of the saved drafts, in rank order
+    """
+    for draft in session.query(ScheduleDraft).filter(
+            ScheduleDraft.workplace_id == workplace_id, ScheduleDraft.start_date == start_date):
+        session.delete(draft)  # Cascades to its DraftAssignment rows
+
+    drafts = []
+    for rank, alternative in enumerate(alternatives, start=1):
+        draft = ScheduleDraft(
+            workplace_id=workplace_id,
+            start_date=start_date,
+            name=f"Option {rank}",
+            rank=rank,
+            objective=int(alternative["objective"]),
+            assignments=[
+                DraftAssignment(
+                    employee_id=res["employee_id"],
+                    shift_id=res["shift_id"],
+                    date=start_date + timedelta(days=res["day_index"])
+                )
+                for res in alternative["assignments"]
+            ]
+        )
+        session.add(draft)
+        drafts.append(draft)
+    session.commit()
+    return [draft.id for draft in drafts]
+
+
+def promote_draft(session, draft_id, num_days=7):
+    """Makes a draft the live schedule of its week (replacing the current assignments)."""
+    draft = session.get(ScheduleDraft, draft_id)
+    if draft is None:
+        raise ValueError(f"Draft {draft_id} not found.")
+    results = [
+        {
+            "workplace_id": draft.workplace_id,
+            "employee_id": a.employee_id,
+            "shift_id": a.shift_id,
+            "day_index": (a.date - draft.start_date).days,
+        }
+        for a in draft.assignments
+    ]
+    save_results_to_db(session, results, draft.workplace_id, draft.start_date, num_days)
+
+
+def _guard_save(session, save_guard, outcome):
+    """Runs the caller's save guard; on refusal rolls back and marks the outcome unsaved."""
+    if save_guard is None or save_guard(session):
+        return True
+    session.rollback()
+    outcome["saved"] = False
+    return False
+
+
+def solve_workplace_week(session, workplace_id, start_date, progress_callback=None, num_workers=None,
+                         num_alternatives=0, capture_dir=None, decompose=False,
+                         precheck=True, save_guard=None):
+    """
+    Loads a workplace from the DB, solves one week and persists the assignments.
+    Sites sharing staff with this one (see pooling.py) are solved and saved together.
+    :param session: A session owned by the caller (one per job, never shared between threads)
+    :param progress_callback: Optional callable receiving solver progress dicts
+    :param num_workers: CP-SAT worker threads for this solve (None = solver default)
+    :param num_alternatives: If > 1, also store up to this many near-optimal schedules as drafts
+                             (single sites only; drafts belong to one workplace)
+    :param capture_dir: Dump the instance for offline replay here (default: config.CAPTURE_DIR
+                        when config.CAPTURE_INSTANCES is enabled)
+    :param decompose: Split the week into independent employee/shift groups and solve them in
+                      parallel processes (see decomposition.py). Alternatives and capture
+                      need the monolithic model and are skipped in this mode.
+    :param precheck: Run the capacity/max-flow precheck first and skip CP-SAT when it proves
+                     the week infeasible (the FeasibilityReport is returned under 'precheck')
+    :param save_guard: Optional callable(session) -> bool run right before saving, in the save
+                       transaction (e.g. a queue worker re-checking its lease). When it returns
+                       False nothing is saved and the outcome has 'saved': False.
+    :return: Dict with the status name, objective value, the saved assignments and penalty
+             breakdown ('penalties'), the ids of the workplaces solved ('workplace_ids') and
+             what presolve eliminated ('presolve')
+    """
+    # OR-Tools is only loaded by callers that actually solve
+    from pooling import linked_workplaces, load_pooled_input
+    from solver import ShiftOptimizer
+    from ortools.sat.python import cp_model
+
+    # 1. Fetch the whole solver input in a constant number of queries per site
+    group = linked_workplaces(session, workplace_id)
+    data = load_pooled_input(session, group, start_date)
+
+    if precheck:
+        from feasibility import check_feasibility
+        report = check_feasibility(data)
+        if not report.feasible:
+            return {"status": "INFEASIBLE", "objective": None, "assignments": [], "precheck": report,
+                    "workplace_ids": group}
+
+    if decompose:
+        from decomposition import solve_decomposed
+        outcome = solve_decomposed(data, num_workers=num_workers)
+        outcome["workplace_ids"] = group
+        if outcome["objective"] is not None:
+            if not _guard_save(session, save_guard, outcome):
+                return outcome
+            save_pooled_results(session, outcome["assignments"], group, start_date, data.num_days,
+                                penalties=outcome["penalties"])
+        return outcome
+
+    if capture_dir is None and config.CAPTURE_INSTANCES:
+        capture_dir = config.CAPTURE_DIR
+
+    # 2. Execute Solver
+    optimizer = ShiftOptimizer.from_input(data, num_workers=num_workers)
+    status = optimizer.solve(data.settings_by_employee, progress_callback=progress_callback,
+                             capture_model=capture_dir is not None)
+
+    outcome = {
+        "status": optimizer.solver.StatusName(status),
+        "objective": None,
+        "assignments": [],
+        "workplace_ids": group,
+        "presolve": optimizer.presolve_report,
+    }
+
+    if capture_dir is not None:
+        from instance_capture import capture_instance
+        from model_io import parameters_to_text
+        solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        outcome["capture_path"] = capture_instance(
+            capture_dir, data, optimizer.captured_model_text, parameters_to_text(optimizer.solver),
+            outcome["status"], optimizer.objective_value() if solved else None, optimizer.solver.WallTime()
+        )
+
+    # 3. Persist the result
+    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+        results = optimizer.get_results_as_dicts()
+        penalties = optimizer.penalty_breakdown()
+        if not _guard_save(session, save_guard, outcome):
+            return outcome
+        save_pooled_results(session, results, group, start_date, data.num_days, penalties=penalties)
+        outcome["objective"] = optimizer.objective_value()
+        outcome["assignments"] = results
+        outcome["penalties"] = penalties
+
+        if num_alternatives > 1 and len(group) == 1:
+            alternatives = optimizer.collect_alternatives(max_solutions=num_alternatives)
+            outcome["draft_ids"] = save_drafts_to_db(session, alternatives, data.workplace_id, start_date)
+
+    return outcome
@@ -1,10 +1,10 @@
-import datetime
+import sys
 from datetime import timedelta, date
 
 # Import models and database connection
 from database import SessionLocal, init_db
-from models import (Workplace, Employee, ShiftDefinition,
-                    EmployeeSettings, WorkplaceWeights, ConstraintType, WeeklyConstraint)
+from models import Workplace, ConstraintType
+from fixtures import load_fixture, read_fixture
 
 # Import the existing configuration file
 import config
@@ -24,9 +24,62 @@ def get_next_sunday():
     return today + timedelta(days=days_ahead)
 
 
-def seed_data():
+def config_fixture():
     """
-    Populates the database with initial data derived from 'config.py'.
+    Describes the workplace, shifts, weights and employees of 'config.py' as a fixture
+    (see fixtures.py). Day/shift indices of the constraints are relative to week 0.
+    """
+    # Assuming indices in config map to: 0=Morning, 1=Afternoon, 2=Night, etc.
+    shift_names = ["בוקר", "ערב", "לילה"]
+    w_config = config.WEIGHTS
+
+    employees = []
+    for cfg_emp in config.EMPLOYEES:
+        constraints = []
+        if cfg_emp.state:
+            constraints += [{"day": day_idx, "shift": shift_idx, "type": ConstraintType.CANNOT_WORK.value}
+                            for day_idx, shift_idx in cfg_emp.state.unavailable_shifts]
+            constraints += [{"day": day_idx, "shift": shift_idx, "type": ConstraintType.MUST_WORK.value}
+                            for day_idx, shift_idx in cfg_emp.state.forced_shifts]
+        employees.append({
+            "name": cfg_emp.name,
+            "color": cfg_emp.color,
+            "is_active": cfg_emp.is_active,
+            # Note: Currently mapping max_shifts. Other specific prefs (min_nights)
+            # would require schema updates to be stored persistently.
+            "min_shifts_per_week": 0,  # Assuming 0 as default min
+            "max_shifts_per_week": cfg_emp.prefs.max_shifts,
+            "constraints": constraints,
+        })
+
+    return {"workplaces": [{
+        "name": "SL_HE",
+        "num_days_in_cycle": config.NUM_DAYS,
+        "num_shifts_per_day": config.NUM_SHIFTS,
+        "shifts": [
+            {"name": shift_names[i] if i < len(shift_names) else f"Shift_{i}", "num_staff": config.SHIFTS_PER_DAY_DEMAND}
+            for i in range(config.NUM_SHIFTS)
+        ],
+        # Mapping keys from config.WEIGHTS to DB columns
+        "weights": {
+            "target_shifts": w_config.get('TARGET_SHIFTS', 40),
+            "rest_gap": w_config.get('REST_GAP', 40),
+            "max_nights": w_config.get('MAX_NIGHTS', 5),
+            "max_mornings": w_config.get('MAX_MORNINGS', 6),
+            "max_evenings": w_config.get('MAX_EVENINGS', 2),
+            "min_nights": w_config.get('MIN_NIGHTS', 5),
+            "min_mornings": w_config.get('MIN_MORNINGS', 4),
+            "min_evenings": w_config.get('MIN_EVENINGS', 2),
+            "consecutive_nights": w_config.get('CONSECUTIVE_NIGHTS', 100),
+        },
+        "employees": employees,
+    }]}
+
+
+def seed_data(fixture=None):
+    """
+    Populates the database with initial data derived from 'config.py'
+    (or from the given fixture, see fixtures.py).
     """
     print("--- Starting Database Seed from Config ---")
 
@@ -41,127 +94,18 @@ def seed_data():
             print("To re-seed: Delete the 'auto_shift.db' file and run this script again.")
             return
 
-        # 2. Create a Workplace entity
-        print("Creating Workplace based on config...")
-        factory = Workplace(
-            name="SL_HE",
-            num_days_in_cycle=config.NUM_DAYS,
-            num_shifts_per_day=config.NUM_SHIFTS
-        )
-        session.add(factory)
-        session.flush()  # Flush to generate the ID for the factory
-
-        # 3. Define Shift Types dynamically based on config.NUM_SHIFTS
-        # Assuming indices in config map to: 0=Morning, 1=Afternoon, 2=Night, etc.
-        print(f"Creating {config.NUM_SHIFTS} Shift Definitions...")
-
-        # Default names fallback
-        shift_names = ["בוקר", "ערב", "לילה"]
-        db_shifts = []
-
-        for i in range(config.NUM_SHIFTS):
-            # Determine name: Use predefined list or generic name if index exceeds list
-            name = shift_names[i] if i < len(shift_names) else f"Shift_{i}"
-
-            s_def = ShiftDefinition(
-                workplace_id=factory.id,
-                shift_name=name,
-                num_staff=config.SHIFTS_PER_DAY_DEMAND
-            )
-            session.add(s_def)
-            db_shifts.append(s_def)
-
-        session.flush()  # Flush to populate IDs for the shift definitions
-
-        # 4. Define Workplace Optimization Weights
-        # Mapping keys from config.WEIGHTS to DB columns
-        print("Creating Workplace Weights...")
-        w_config = config.WEIGHTS
-
-        weights = WorkplaceWeights(
-            workplace_id=factory.id,
-
-            target_shifts=w_config.get('TARGET_SHIFTS', 40),
-            rest_gap=w_config.get('REST_GAP', 40),
-
-            max_nights=w_config.get('MAX_NIGHTS', 5),
-            max_mornings=w_config.get('MAX_MORNINGS', 6),
-            max_evenings=w_config.get('MAX_EVENINGS', 2),
-
-            min_nights=w_config.get('MIN_NIGHTS', 5),
-            min_mornings=w_config.get('MIN_MORNINGS', 4),
-            min_evenings=w_config.get('MIN_EVENINGS', 2),
-
-            consecutive_nights=w_config.get('CONSECUTIVE_NIGHTS', 100)
-        )
-        session.add(weights)
-
-        # 5. Import Employees and constraints from Config
-        print(f"Importing {len(config.EMPLOYEES)} employees from config.py...")
-
-        reference_sunday = get_next_sunday()
+        # 2. Describe the data, then bulk-insert it in one transaction
+        if fixture is None:
+            fixture = config_fixture()
+        reference_sunday = date.fromisoformat(str(fixture["start_date"])) if fixture.get("start_date") else get_next_sunday()
         print(f"Mapping day index 0 (Sunday) to date: {reference_sunday}")
 
-        for cfg_emp in config.EMPLOYEES:
-            # A. Create Employee record
-            db_emp = Employee(
-                workplace_id=factory.id,
-                name=cfg_emp.name,
-                color=cfg_emp.color,
-                is_active=cfg_emp.is_active
-            )
-            session.add(db_emp)
-            session.flush()  # Generate Employee ID
-
-            # B. Create Employee Settings (Contract/Preferences)
-            # Note: Currently mapping max_shifts. Other specific prefs (min_nights)
-            # would require schema updates to be stored persistently.
-            settings = EmployeeSettings(
-                employee_id=db_emp.id,
-                min_shifts_per_week=0,  # Assuming 0 as default min
-                max_shifts_per_week=cfg_emp.prefs.max_shifts
-            )
-            session.add(settings)
-
-            # --- C. Create Constraints (Unavailability & Forced) ---
-            if cfg_emp.state:
-                # 1. Unavailable Shifts (CANNOT_WORK)
-                for day_idx, shift_idx in cfg_emp.state.unavailable_shifts:
-                    if shift_idx >= len(db_shifts): continue
-
-                    target_date = reference_sunday + timedelta(days=day_idx)
-                    target_shift_id = db_shifts[shift_idx].id
-
-                    c1 = WeeklyConstraint(
-                        employee_id=db_emp.id,
-                        shift_id=target_shift_id,
-                        date=target_date,
-                        constraint_type=ConstraintType.CANNOT_WORK
-                    )
-                    session.add(c1)
-
-                # 2. Forced Shifts (MUST_WORK) - הוספה חדשה
-                for day_idx, shift_idx in cfg_emp.state.forced_shifts:
-                    if shift_idx >= len(db_shifts): continue
-
-                    target_date = reference_sunday + timedelta(days=day_idx)
-                    target_shift_id = db_shifts[shift_idx].id
-
-                    c2 = WeeklyConstraint(
-                        employee_id=db_emp.id,
-                        shift_id=target_shift_id,
-                        date=target_date,
-                        constraint_type=ConstraintType.MUST_WORK
-                    )
-                    session.add(c2)
-
-        # Commit all changes to the database
-        session.commit()
+        counts = load_fixture(session, fixture, start_date=reference_sunday)
+        print(f"Inserted {counts['workplaces']} workplace(s), {counts['employees']} employee(s), "
+              f"{counts['weekly_constraints']} constraint(s).")
         print("Seed data populated successfully from config!")
 
     except Exception as e:
-        # Rollback in case of any error to maintain DB integrity
-        session.rollback()
         print(f"Error during seeding: {e}")
         raise
     finally:
@@ -169,4 +113,5 @@ def seed_data():
 
 
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    # Optional fixture file (JSON/YAML/CSV) instead of config.py: python seed.py staging.yaml
+    seed_data(read_fixture(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, FrozenSet, Optional, Tuple
+
+
+# ==========================================
+#   Immutable solver input (detached from DB)
+# ==========================================
+# These types carry only the fields the solver reads. They hold no session
+# reference, so they can be cached, compared and pickled to worker processes.
+# The solver core (ShiftOptimizer / ConstraintManager) accepts only these types.
+
+# ConstraintType values as carried in ConstraintSnapshot.kind
+CANNOT_WORK = "cannot_work"
+MUST_WORK = "must_work"
+PREFER_NOT = "prefer_not"
+PREFER_YES = "prefer_yes"
+
+
+@dataclass(frozen=True, slots=True)
+class EmployeeSnapshot:
+    id: int
+    name: str
+    color: str = "FFFFFF"
+    is_active: bool = True
+    history_streak: int = 0
+    worked_last_fri_night: bool = False
+    worked_last_sat_noon: bool = False
+    worked_last_sat_night: bool = False
+    # Home site; the worked_last_* flags refer to its shifts (see conflicts.history_cells)
+    workplace_id: Optional[int] = None
+
+    @classmethod
+    def from_orm(cls, emp):
+        return cls(
+            id=emp.id,
+            name=emp.name,
+            color=emp.color,
+            is_active=emp.is_active,
+            history_streak=emp.history_streak,
+            worked_last_fri_night=emp.worked_last_fri_night,
+            worked_last_sat_noon=emp.worked_last_sat_noon,
+            worked_last_sat_night=emp.worked_last_sat_night,
+            workplace_id=emp.workplace_id,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ShiftSnapshot:
+    id: int
+    shift_name: str
+    num_staff: int = 1
+    # Owning site; results are saved under it (matters when linked sites are solved jointly)
+    workplace_id: Optional[int] = None
+    # Minutes after midnight and length; None = derived from the shift's position (conflicts.py)
+    start_minute: Optional[int] = None
+    duration_minutes: Optional[int] = None
+
+    @classmethod
+    def from_orm(cls, s_def):
+        start = s_def.start_time
+        return cls(id=s_def.id, shift_name=s_def.shift_name, num_staff=s_def.num_staff,
+                   workplace_id=s_def.workplace_id,
+                   start_minute=start.hour * 60 + start.minute if start is not None else None,
+                   duration_minutes=s_def.duration_minutes)
+
+
+@dataclass(frozen=True, slots=True)
+class SettingsSnapshot:
+    employee_id: int
+    min_shifts_per_week: int = 0
+    max_shifts_per_week: int = 5
+
+    @classmethod
+    def from_orm(cls, settings):
+        return cls(
+            employee_id=settings.employee_id,
+            min_shifts_per_week=settings.min_shifts_per_week,
+            max_shifts_per_week=settings.max_shifts_per_week,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class WeightsSnapshot:
+    target_shifts: int = 40
+    rest_gap: int = 40
+    max_nights: int = 5
+    max_mornings: int = 6
+    max_evenings: int = 2
+    min_nights: int = 5
+    min_mornings: int = 4
+    min_evenings: int = 2
+    consecutive_nights: int = 100
+    solve_mode: str = "weighted"
+    priority_order: Tuple[str, ...] = ("consecutive_nights", "rest_gap", "target_shifts")
+
+    @classmethod
+    def from_orm(cls, weights):
+        return cls(
+            target_shifts=weights.target_shifts,
+            rest_gap=weights.rest_gap,
+            max_nights=weights.max_nights,
+            max_mornings=weights.max_mornings,
+            max_evenings=weights.max_evenings,
+            min_nights=weights.min_nights,
+            min_mornings=weights.min_mornings,
+            min_evenings=weights.min_evenings,
+            consecutive_nights=weights.consecutive_nights,
+            solve_mode=weights.solve_mode or "weighted",
+            priority_order=tuple(f.strip() for f in (weights.priority_order or "").split(",") if f.strip()),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ConstraintSnapshot:
+    """A WeeklyConstraint mapped onto the planning window (day index instead of date)."""
+    employee_id: int
+    day: int
+    shift_id: int
+    kind: str  # ConstraintType value, e.g. 'cannot_work'
+
+    @classmethod
+    def from_orm(cls, constraint, start_date):
+        return cls(
+            employee_id=constraint.employee_id,
+            day=(constraint.date - start_date).days,
+            shift_id=constraint.shift_id,
+            kind=constraint.constraint_type.value,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SolverInput:
+    """Everything needed to build and solve one workplace/week."""
+    workplace_id: int
+    workplace_name: str
+    start_date: date
+    num_days: int
+    employees: Tuple[EmployeeSnapshot, ...]
+    shifts: Tuple[ShiftSnapshot, ...]
+    weights: Optional[WeightsSnapshot]
+    settings: Tuple[SettingsSnapshot, ...] = ()
+    constraints: Tuple[ConstraintSnapshot, ...] = ()
+    # (day, shift_id) cells whose demand this input must cover; None = every cell.
+    # Set on the sub-problems produced by decomposition.py.
+    demand_cells: Optional[FrozenSet[Tuple[int, int]]] = None
+
+    @property
+    def settings_by_employee(self) -> Dict[int, SettingsSnapshot]:
+        return {s.employee_id: s for s in self.settings}
+
+    @classmethod
+    def from_orm(cls, workplace, weights, constraints, start_date):
+        """
+        Converts an already-loaded Workplace (with employees, settings and shifts),
+        its WorkplaceWeights and the week's WeeklyConstraint rows into a snapshot.
+        Inactive employees are dropped; employees and shifts are ordered by id.
+        """
+        employees = sorted((e for e in workplace.employees if e.is_active), key=lambda e: e.id)
+        active_ids = {e.id for e in employees}
+        return cls(
+            workplace_id=workplace.id,
+            workplace_name=workplace.name,
+            start_date=start_date,
+            num_days=workplace.num_days_in_cycle,
+            employees=tuple(EmployeeSnapshot.from_orm(e) for e in employees),
+            shifts=tuple(ShiftSnapshot.from_orm(s) for s in sorted(workplace.shifts, key=lambda s: s.id)),
+            weights=WeightsSnapshot.from_orm(weights) if weights else None,
+            settings=tuple(SettingsSnapshot.from_orm(e.settings) for e in employees if e.settings),
+            constraints=tuple(ConstraintSnapshot.from_orm(c, start_date)
+                              for c in constraints if c.employee_id in active_ids),
+        )
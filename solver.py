@@ -1,57 +1,335 @@
 from ortools.sat.python import cp_model
 from constraints_manager import ConstraintManager
+from model_io import model_to_text
+from conflicts import ConflictGraph
+from presolve import find_fixed_cells
+from snapshot import (EmployeeSnapshot, ShiftSnapshot, WeightsSnapshot, SettingsSnapshot, ConstraintSnapshot,
+                      SolverInput)
+
+# WorkplaceWeights.solve_mode values
+WEIGHTED = "weighted"
+LEXICOGRAPHIC = "lexicographic"
+
+
+def _require_snapshots(items, expected_type, label):
+    """The solver core works on detached snapshots only (see snapshot.py), never on ORM rows."""
+    for item in items:
+        if not isinstance(item, expected_type):
+            raise TypeError(
+                f"ShiftOptimizer expects {expected_type.__name__} {label}, got {type(item).__name__}. "
+                f"Convert ORM objects with {expected_type.__name__}.from_orm() or use loader.load_solver_input()."
+            )
+
+
+class _ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """Reports every improving solution found by CP-SAT to a plain callable."""
+
+    def __init__(self, on_progress):
+        super().__init__()
+        self._on_progress = on_progress
+        self._solution_count = 0
+
+    def OnSolutionCallback(self):
+        self._solution_count += 1
+        self._on_progress({
+            "solutions": self._solution_count,
+            "objective": self.ObjectiveValue(),
+            "best_bound": self.BestObjectiveBound(),
+            "wall_time": self.WallTime(),
+        })
+
+
+class _SolutionPoolCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Collects up to max_solutions schedules during an enumeration pass, keeping only
+    those that differ from every kept schedule in at least min_difference cells.
+    """
+
+    def __init__(self, shift_vars, objective_terms, max_solutions, min_difference):
+        super().__init__()
+        self._items = list(shift_vars.items())
+        self._objective_terms = objective_terms
+        self._max_solutions = max_solutions
+        self._min_difference = min_difference
+        self.solutions = []  # (objective, frozenset of (emp_id, day, shift_id))
+
+    def OnSolutionCallback(self):
+        cells = frozenset(key for key, var in self._items if self.Value(var))
+        if any(len(cells ^ kept) < self._min_difference for _, kept in self.solutions):
+            return
+        objective = sum(self.Value(expr) for expr in self._objective_terms)
+        self.solutions.append((objective, cells))
+        if len(self.solutions) >= self._max_solutions:
+            self.StopSearch()
 
 
 class ShiftOptimizer:
-    def __init__(self, workplace_id, employees, shifts, weights):
+    def __init__(self, workplace_id, employees, shifts, weights, num_workers=None, weekly_constraints=(), num_days=7,
+                 demand_cells=None, presolve=True, presolve_limits=True):
+        # A workplace without a WorkplaceWeights row falls back to the column defaults
+        weights = weights if weights is not None else WeightsSnapshot()
+        _require_snapshots(employees, EmployeeSnapshot, "employees")
+        _require_snapshots(shifts, ShiftSnapshot, "shifts")
+        _require_snapshots([weights], WeightsSnapshot, "weights")
+        _require_snapshots(weekly_constraints, ConstraintSnapshot, "weekly constraints")
+
         self.workplace_id = workplace_id
+        # Jointly solved sites: every assignment is saved under its shift's workplace
+        self.shift_workplace = {s.id: s.workplace_id if s.workplace_id is not None else workplace_id
+                                for s in shifts}
         self.employees = [e for e in employees if e.is_active]
-        self.shifts = shifts
+        self.shifts = list(shifts)
         self.weights = weights
+        self.weekly_constraints = weekly_constraints
+        self.num_days = num_days
+        self.demand_cells = demand_cells
+        # Fix decided cells before building (presolve.py). presolve_limits=False skips the rules
+        # derived from num_staff / weekly maximums, for models whose bounds are patched later.
+        self.presolve = presolve
+        self.presolve_limits = presolve_limits
+        self.presolve_result = None
+        self.presolve_report = None
 
         self.model = cp_model.CpModel()
         self.solver = cp_model.CpSolver()
+        # Limit CP-SAT's internal parallelism when several solves share the host
+        if num_workers:
+            self.solver.parameters.num_workers = num_workers
         self.shift_vars = {}
+        self.manager = None
+        self.captured_model_text = None
+        self.objective_terms = []
+        # Lexicographic mode: optimum of each stage, keyed by family
+        self.stage_values = {}
 
-    def _create_variables(self):
-        """Initializes decision variables using DB-based IDs."""
+    @classmethod
+    def from_input(cls, data, num_workers=None, presolve=True, presolve_limits=True):
+        """Builds an optimizer for a SolverInput produced by loader.load_solver_input."""
+        return cls(
+            workplace_id=data.workplace_id,
+            employees=data.employees,
+            shifts=data.shifts,
+            weights=data.weights,
+            num_workers=num_workers,
+            weekly_constraints=data.constraints,
+            num_days=data.num_days,
+            demand_cells=data.demand_cells,
+            presolve=presolve,
+            presolve_limits=presolve_limits
+        )
+
+    def _create_variables(self, fixed=None):
+        """
+        Initializes decision variables using DB-based IDs.
+        :param fixed: (emp_id, day, shift_id) -> 0/1 from presolve; these cells become int constants
+        """
+        fixed = fixed or {}
+        shift_ids = [s_def.id for s_def in self.shifts]
         for emp in self.employees:
-            for d in range(7):
-                for s_def in self.shifts:
-                    self.shift_vars[(emp.id, d, s_def.id)] = self.model.NewBoolVar(
-                        f'shift_e{emp.id}_d{d}_s{s_def.id}'
+            emp_id = emp.id
+            for d in range(self.num_days):
+                for s_id in shift_ids:
+                    key = (emp_id, d, s_id)
+                    if key in fixed:
+                        self.shift_vars[key] = fixed[key]
+                        continue
+                    self.shift_vars[key] = self.model.NewBoolVar(
+                        f'shift_e{emp_id}_d{d}_s{s_id}'
                     )
 
-    def solve(self, employee_settings_dict):
+    def build_model(self, employee_settings_dict):
         """
-        Prepares and solves the model.
-        :param employee_settings_dict: Dict mapping emp_id to EmployeeSettings object
+        Creates the variables, constraints and objective terms without solving.
+        :param employee_settings_dict: Dict mapping emp_id to SettingsSnapshot
+        :return: The ConstraintManager (holds the tagged objective terms and constraint handles)
         """
-        self._create_variables()
+        _require_snapshots(employee_settings_dict.values(), SettingsSnapshot, "settings")
+        conflicts = ConflictGraph(self.shifts, self.num_days)
+
+        # Cells every feasible schedule agrees on become constants (see presolve.py)
+        fixed = {}
+        if self.presolve:
+            self.presolve_result = find_fixed_cells(self._as_input(employee_settings_dict), conflicts,
+                                                    use_limits=self.presolve_limits)
+            fixed = self.presolve_result.fixed
+        self._create_variables(fixed)
 
         manager = ConstraintManager(
-            self.model, self.shift_vars, self.employees, self.shifts, self.weights
+            self.model, self.shift_vars, self.employees, self.shifts, self.weights,
+            num_days=self.num_days, weekly_constraints=self.weekly_constraints,
+            demand_cells=self.demand_cells, conflicts=conflicts
         )
 
         # Apply constraints and get objective terms
-        # We no longer need a separate 'states' dict if we use fields from the Employee objects
-        objective_terms = manager.apply_all_constraints(employee_settings_dict, {})
+        # We no longer need a separate 'states' dict: history fields live on EmployeeSnapshot
+        self.objective_terms = manager.apply_all_constraints(employee_settings_dict, {})
+        self.manager = manager
+
+        if self.presolve_result is not None:
+            self.presolve_report = {
+                "cells": self.presolve_result.num_cells,
+                "cells_fixed": len(fixed),
+                "employees_dropped": len(self.presolve_result.dropped_employees),
+                "variables_eliminated": len(fixed) + manager.eliminated_variables,
+                "constraints_eliminated": manager.eliminated_constraints,
+                "contradiction": self.presolve_result.contradiction,
+            }
+        return manager
+
+    def _as_input(self, employee_settings_dict):
+        """The optimizer's own data as a SolverInput (what presolve reads)."""
+        return SolverInput(
+            workplace_id=self.workplace_id, workplace_name="", start_date=None, num_days=self.num_days,
+            employees=tuple(self.employees), shifts=tuple(self.shifts), weights=self.weights,
+            settings=tuple(employee_settings_dict.values()), constraints=tuple(self.weekly_constraints),
+            demand_cells=self.demand_cells,
+        )
+
+    def solve(self, employee_settings_dict, progress_callback=None, capture_model=False):
+        """
+        Prepares and solves the model.
+        :param employee_settings_dict: Dict mapping emp_id to SettingsSnapshot
+        :param progress_callback: Optional callable receiving a dict for every improving solution
+        :param capture_model: Keep the built model (with the weighted objective) as text in
+                              self.captured_model_text, for instance_capture
+        """
+        manager = self.build_model(employee_settings_dict)
+        objective_terms = self.objective_terms
+
+        if capture_model:
+            self.model.Minimize(sum(objective_terms))
+            self.captured_model_text = model_to_text(self.model)
+        self.stage_values = {}
+
+        if self.weights.solve_mode == LEXICOGRAPHIC:
+            return self._solve_lexicographic(manager.objective_by_family(), progress_callback)
 
         # Set Objective: Minimize penalties
         self.model.Minimize(sum(objective_terms))
+        return self._run_solver(progress_callback)
+
+    def _run_solver(self, progress_callback=None):
+        if progress_callback:
+            return self.solver.Solve(self.model, _ProgressCallback(progress_callback))
+        return self.solver.Solve(self.model)
+
+    def _solve_lexicographic(self, terms_by_family, progress_callback=None):
+        """
+        Optimizes one penalty family at a time, in the workplace's priority order.
+        Each stage's optimum is fixed as an upper bound for the following stages,
+        and the previous stage's solution is passed on as a hint.
+        Families missing from priority_order are optimized together in a last stage.
+        """
+        order = [f for f in self.weights.priority_order if f in terms_by_family]
+        stages = [(family, terms_by_family[family]) for family in order]
+        remaining = [expr for family, exprs in terms_by_family.items() if family not in order for expr in exprs]
+        if remaining:
+            stages.append(("others", remaining))
+        if not stages:
+            return self._run_solver(progress_callback)
+
+        status = cp_model.OPTIMAL
+        for family, exprs in stages:
+            stage_objective = sum(exprs)
+            self.model.Minimize(stage_objective)
+
+            stage_callback = None
+            if progress_callback:
+                stage_callback = lambda progress, family=family: progress_callback({**progress, "stage": family})
+
+            stage_status = self._run_solver(stage_callback)
+            if stage_status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                return stage_status
+            if stage_status == cp_model.FEASIBLE:
+                status = cp_model.FEASIBLE  # A stage hit its limits: the sequence is no longer proven optimal
+
+            # Lock in this stage's result and warm-start the next stage from it
+            best = int(round(self.solver.ObjectiveValue()))
+            self.stage_values[family] = best
+            self.manager.add(stage_objective <= best)
+            self.model.ClearHints()
+            for var in self.shift_vars.values():
+                if not isinstance(var, int):  # Presolved cells are constants
+                    self.model.AddHint(var, self.solver.Value(var))
 
-        status = self.solver.Solve(self.model)
         return status
 
+    def collect_alternatives(self, max_solutions=5, max_gap=0.1, min_difference=4, time_limit=30.0):
+        """
+        Collects up to max_solutions distinct schedules whose objective is within max_gap
+        (relative) of the optimum found by solve(). Must be called after a successful solve().
+
+        CP-SAT only reports improving solutions while optimizing, so the pool is gathered
+        in a single enumeration pass over the same model, bounded by the objective.
+        :param min_difference: Minimum number of differing (employee, day, shift) cells between kept schedules
+        :return: List of dicts {"objective", "assignments"}, best first; the solve() result is always first
+        """
+        best_cells = frozenset(key for key, var in self.shift_vars.items() if self.solver.Value(var))
+        best_objective = self.objective_value()
+        best = {"objective": best_objective, "assignments": self.get_results_as_dicts()}
+        if max_solutions <= 1:
+            return [best]
+
+        # Bound the objective instead of optimizing it, then enumerate feasible schedules
+        bound = int(best_objective * (1 + max_gap))
+        self.model.ClearObjective()
+        self.model.ClearHints()
+        self.manager.add(sum(self.objective_terms) <= bound)
+
+        pool_solver = cp_model.CpSolver()
+        pool_solver.parameters.enumerate_all_solutions = True
+        pool_solver.parameters.num_workers = 1  # Required for enumeration
+        pool_solver.parameters.max_time_in_seconds = time_limit
+
+        callback = _SolutionPoolCallback(self.shift_vars, self.objective_terms, max_solutions, min_difference)
+        # The optimum is already known; seed the diversity filter with it
+        callback.solutions.append((best_objective, best_cells))
+        pool_solver.Solve(self.model, callback)
+
+        alternatives = [best]
+        for objective, cells in sorted(callback.solutions[1:], key=lambda item: item[0]):
+            alternatives.append({
+                "objective": objective,
+                "assignments": [
+                    {"workplace_id": self.shift_workplace[shift_id], "employee_id": emp_id, "shift_id": shift_id,
+                     "day_index": day}
+                    for emp_id, day, shift_id in sorted(cells)
+                ],
+            })
+        return alternatives
+
+    def objective_value(self):
+        """Weighted objective of the current solution (comparable across solve modes)."""
+        return sum(self.solver.Value(expr) for expr in self.objective_terms)
+
+    def penalty_breakdown(self):
+        """
+        Splits the current solution's objective by employee, day and family, reading the
+        solved values of the tagged objective terms (no extra solve). Call it before
+        collect_alternatives, which moves the solver on to other solutions.
+        :return: List of dicts {employee_id, day_index (None = weekly), family, units, penalty},
+                 non-zero penalties only; the penalties sum to objective_value()
+        """
+        rows = {}
+        for term in self.manager.objective_terms:
+            units = term.var if isinstance(term.var, int) else self.solver.Value(term.var)
+            if units and term.weight:
+                key = (term.employee_id, term.day, term.family)
+                row = rows.setdefault(key, {"employee_id": term.employee_id, "day_index": term.day,
+                                            "family": term.family, "units": 0, "penalty": 0})
+                row["units"] += units
+                row["penalty"] += units * term.weight
+        return list(rows.values())
+
     def get_results_as_dicts(self):
         """Returns the solution in a format ready for DB insertion."""
         assignments = []
         for (emp_id, day, shift_id), var in self.shift_vars.items():
             if self.solver.Value(var):
                 assignments.append({
-                    "workplace_id": self.workplace_id,
+                    "workplace_id": self.shift_workplace[shift_id],
                     "employee_id": emp_id,
                     "shift_id": shift_id,
                     "day_index": day
                 })
-        return assignments
\ No newline at end of file
+        return assignments
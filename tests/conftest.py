@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+from datetime import date
+
+# Flat modules at the repository root; the tests get their own SQLite file, set before
+# database.py builds its engine on import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='auto_shift_tests_'), 'test.db')}"
+
+import pytest
+
+from database import engine, SessionLocal
+from fixtures import load_fixture
+from models import Base, Employee, SharedEmployee, Workplace
+
+WEEK = date(2026, 10, 25)  # A Sunday, week 0 of the fixture
+
+
+def _site(name, num_employees=6):
+    return {
+        "name": name,
+        "shifts": [{"name": shift, "num_staff": 1} for shift in ("Morning", "Evening", "Night")],
+        "employees": [{"name": f"{name}-{i}", "max_shifts_per_week": 5} for i in range(num_employees)],
+    }
+
+
+@pytest.fixture
+def session():
+    """A fresh schema per test."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def sites(session):
+    """
+    Workplaces A and B, linked by one A employee shared with B, and an unlinked C.
+    :return: Dict of workplace name -> id
+    """
+    load_fixture(session, {"workplaces": [_site("A"), _site("B"), _site("C")]}, start_date=WEEK)
+    ids = dict(session.query(Workplace.name, Workplace.id))
+    shared = session.query(Employee.id).filter(Employee.name == "A-0").scalar()
+    session.add(SharedEmployee(employee_id=shared, workplace_id=ids["B"]))
+    session.commit()
+    return ids
@@ -0,0 +1,48 @@
+from datetime import date
+
+import pytest
+
+from availability_import import AvailabilityError, import_availability, parse_availability
+from models import Employee, WeeklyConstraint
+
+WEEK = date(2026, 10, 25)
+
+
+def _errors(session, workplace_id, *rows):
+    entries, errors = parse_availability(session, workplace_id, WEEK, list(enumerate(rows, start=2)))
+    return dict(errors)
+
+
+@pytest.mark.parametrize("day", ["inf", "-inf", "nan", "1e400", "99999999999", "7", "-1"])
+def test_out_of_range_days_are_row_errors(session, sites, day):
+    errors = _errors(session, sites["C"], {"employee": "C-0", "shift": "Morning", "day": day})
+    assert "outside the planning window" in errors[2]
+
+
+def test_fractional_and_non_numeric_days_are_row_errors(session, sites):
+    errors = _errors(session, sites["C"],
+                     {"employee": "C-0", "shift": "Morning", "day": "1.5"},
+                     {"employee": "C-0", "shift": "Morning", "day": "monday"},
+                     {"employee": "C-0", "shift": "Morning", "day": "2.0"})
+    assert "not a whole number" in errors[2]
+    assert "not a number" in errors[3]
+    assert 4 not in errors
+
+
+def test_ambiguous_names_are_row_errors(session, sites):
+    twin = Employee(workplace_id=sites["C"], name="C-1", color="FFFFFF")
+    session.add(twin)
+    session.commit()
+
+    errors = _errors(session, sites["C"],
+                     {"employee": "C-1", "shift": "Morning", "day": "0"},
+                     {"employee": str(twin.id), "shift": "Morning", "day": "0"})
+    assert "matches several records" in errors[2]
+    assert 3 not in errors
+
+
+def test_invalid_file_writes_nothing(session, sites):
+    with pytest.raises(AvailabilityError):
+        import_availability(session, sites["C"], WEEK, [(2, {"employee": "C-0", "shift": "Morning", "day": "0"}),
+                                                        (3, {"employee": "C-0", "shift": "Night", "day": "inf"})])
+    assert session.query(WeeklyConstraint).count() == 0
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from exporters import iter_assignment_rows, iter_csv, iter_ical
+from history_archive import archive_assignments
+from scheduling import solve_workplace_week
+
+WEEK = date(2026, 10, 25)
+
+
+def _uids(rows):
+    return [line for line in "".join(iter_ical(rows)).splitlines() if line.startswith("UID:")]
+
+
+def test_archived_weeks_are_exported_like_live_rows(session, sites):
+    solve_workplace_week(session, sites["C"], WEEK)
+    before = "".join(iter_csv(iter_assignment_rows(session, sites["C"])))
+
+    archive_assignments(session, sites["C"], WEEK + timedelta(days=7))
+    rows = list(iter_assignment_rows(session, sites["C"]))
+
+    assert rows and all(row["assignment_id"] is None for row in rows)
+    assert "".join(iter_csv(rows)) == before
+
+
+def test_ical_uids_are_unique_and_survive_archiving(session, sites):
+    solve_workplace_week(session, sites["C"], WEEK)
+    live = _uids(iter_assignment_rows(session, sites["C"]))
+
+    archive_assignments(session, sites["C"], WEEK + timedelta(days=7))
+    archived = _uids(iter_assignment_rows(session, sites["C"]))
+
+    assert len(set(archived)) == len(archived) == 21
+    assert archived == live
@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from history_archive import archive_assignments, load_history
+from models import Assignment, Employee, ShiftDefinition
+
+WEEK = date(2026, 10, 25)
+
+
+def test_last_week_flags_come_from_the_week_before_the_planned_one(session, sites):
+    wp_id = sites["C"]
+    emp_id = session.query(Employee.id).filter(Employee.workplace_id == wp_id).order_by(Employee.id).first()[0]
+    night = session.query(ShiftDefinition.id).filter(
+        ShiftDefinition.workplace_id == wp_id).order_by(ShiftDefinition.id.desc()).first()[0]
+    # Saturday night of the week before WEEK, archived like any older week
+    session.add(Assignment(workplace_id=wp_id, employee_id=emp_id, shift_id=night, date=WEEK - timedelta(days=1)))
+    session.commit()
+    archive_assignments(session, wp_id, WEEK)
+
+    # The range ends with the planned week, as in 'python main.py history'
+    history = load_history(session, wp_id, WEEK - timedelta(days=7), WEEK + timedelta(days=7))
+
+    planned = history.last_week_flags(WEEK)
+    assert list(history.employee_ids) == [emp_id]
+    assert planned["worked_last_sat_night"][0] and not planned["worked_last_fri_night"][0]
+    # Without planned_week the range's last week (WEEK itself, empty) is the previous one
+    assert not history.last_week_flags()["worked_last_sat_night"][0]
@@ -0,0 +1,58 @@
+from datetime import date, datetime, timedelta
+
+import job_queue
+import worker
+from models import Assignment, JobStatus, QueuedSolveJob
+
+WEEK = date(2026, 10, 25)
+
+
+def test_enqueue_dedups_on_the_linked_group(session, sites):
+    a = job_queue.enqueue(session, sites["A"], WEEK)
+    b = job_queue.enqueue(session, sites["B"], WEEK)
+    c = job_queue.enqueue(session, sites["C"], WEEK)
+    next_week = job_queue.enqueue(session, sites["B"], WEEK + timedelta(days=7))
+
+    assert b.id == a.id
+    assert len({a.id, c.id, next_week.id}) == 3
+
+
+def test_lost_lease_saves_nothing(session, sites):
+    job_id = job_queue.enqueue(session, sites["C"], WEEK).id
+    _, stale_token = job_queue.claim(session, "worker-a", lease_seconds=60)
+    # worker-a stalls past its lease and worker-b takes the job over
+    session.query(QueuedSolveJob).filter(QueuedSolveJob.id == job_id).update(
+        {QueuedSolveJob.lease_expires_at: datetime(2000, 1, 1)})
+    session.commit()
+    assert job_queue.claim(session, "worker-b", lease_seconds=60)[0] == job_id
+
+    assert worker.run_job(job_id, stale_token, lease_seconds=60) == "lost"
+    session.expire_all()
+    assert session.query(Assignment).count() == 0
+    assert session.get(QueuedSolveJob, job_id).worker_id == "worker-b"
+
+
+def test_run_job_saves_while_the_lease_is_held(session, sites):
+    job_id = job_queue.enqueue(session, sites["C"], WEEK).id
+    _, token = job_queue.claim(session, "worker-a", lease_seconds=60)
+
+    assert worker.run_job(job_id, token, lease_seconds=60) == "succeeded"
+    session.expire_all()
+    assert session.query(Assignment).count() == 21
+    assert session.get(QueuedSolveJob, job_id).status == JobStatus.SUCCEEDED
+
+
+def test_drain_retries_a_failed_claim(monkeypatch):
+    calls = []
+
+    def claim(session, worker_id, lease_seconds):
+        calls.append(worker_id)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return None
+
+    monkeypatch.setattr(job_queue, "claim", claim)
+    monkeypatch.setattr(worker.signal, "signal", lambda signum, handler: None)
+
+    assert worker.run_worker(worker_id="w", poll_seconds=0.01, exit_when_idle=True) == 0
+    assert len(calls) == 2
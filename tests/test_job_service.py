@@ -0,0 +1,57 @@
+import asyncio
+import json
+from datetime import date, timedelta
+
+from feasibility import FeasibilityReport
+from job_service import JobService, SolveJob
+from models import JobStatus
+
+WEEK = date(2026, 10, 25)
+
+
+def test_to_dict_is_json_serializable_after_a_failed_precheck():
+    report = FeasibilityReport(feasible=False, understaffed_cells=[(0, 1, 2, 1)], reasons=["understaffed"])
+    job = SolveJob(job_id=1, workplace_id=1, start_date=WEEK, status=JobStatus.SUCCEEDED,
+                   result={"status": "INFEASIBLE", "objective": None, "assignments": [], "precheck": report,
+                           "workplace_ids": [1]})
+
+    view = json.loads(json.dumps(job.to_dict()))
+    assert view["result"]["precheck"]["reasons"] == ["understaffed"]
+    assert job.result["precheck"] is report
+
+
+def test_submit_dedups_on_the_linked_group(session, sites):
+    async def scenario():
+        service = JobService(max_concurrent_solves=2, solver_workers_per_job=1)
+        try:
+            a = await service.submit(sites["A"], WEEK)
+            b = await service.submit(sites["B"], WEEK)
+            c = await service.submit(sites["C"], WEEK)
+            await service.wait(a.job_id)
+            await service.wait(c.job_id)
+            return a, b, c
+        finally:
+            service.shutdown()
+
+    a, b, c = asyncio.run(scenario())
+    assert b is a and c is not a
+    assert a.status == JobStatus.SUCCEEDED
+    assert sorted(a.group) == sorted([sites["A"], sites["B"]])
+
+
+def test_finished_jobs_are_evicted(session, sites):
+    async def scenario(**limits):
+        service = JobService(max_concurrent_solves=1, solver_workers_per_job=1, **limits)
+        try:
+            first = await service.submit(sites["C"], WEEK)
+            await service.wait(first.job_id)
+            second = await service.submit(sites["C"], WEEK + timedelta(days=7))
+            await service.wait(second.job_id)
+            return service.get(first.job_id), service.get(second.job_id)
+        finally:
+            service.shutdown()
+
+    first, second = asyncio.run(scenario(max_finished_jobs=1))
+    assert first is None and second is not None
+    first, second = asyncio.run(scenario(finished_ttl_seconds=0))
+    assert first is None and second is None
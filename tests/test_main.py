@@ -0,0 +1,27 @@
+import pytest
+
+import main
+
+
+@pytest.fixture
+def handled(monkeypatch):
+    """The parsed args of each command run, instead of running it."""
+    calls = []
+    for name in ("cmd_solve", "cmd_jobs"):
+        monkeypatch.setattr(main, name, lambda args, name=name: calls.append((name, args)))
+    return calls
+
+
+@pytest.mark.parametrize("argv", [[], ["--workplace", "B", "--all"]])
+def test_no_command_means_solve(handled, argv):
+    main.main(argv)
+    (name, args), = handled
+    assert name == "cmd_solve"
+    assert args.workplace == (argv[1] if argv else main.DEFAULT_WORKPLACE)
+
+
+def test_commands_and_help_are_not_rewritten(handled):
+    main.main(["jobs", "--limit", "3"])
+    assert handled[0][0] == "cmd_jobs" and handled[0][1].limit == 3
+    with pytest.raises(SystemExit):
+        main.main(["--help"])
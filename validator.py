@@ -0,0 +1,201 @@
+from datetime import timedelta
+
+import numpy as np
+
+from snapshot import SolverInput, WeightsSnapshot, CANNOT_WORK, MUST_WORK
+from constraints_manager import REST_GAP, TARGET_SHIFTS
+from conflicts import ConflictGraph, history_cells
+
+# Hard-rule counters reported by ScheduleValidator.evaluate (0 everywhere = valid schedule)
+HARD_RULES = ("demand", "one_shift_per_day", "weekly_max", "weekly_min", "cannot_work", "must_work", "min_rest")
+
+
+class ScheduleValidator:
+    """
+    Checks and scores schedules without CP-SAT.
+
+    A schedule is an int8 array x[employee, day, shift] (0/1), laid out in the order of
+    data.employees / range(num_days) / data.shifts. Every rule is an array expression over
+    the last three axes, so a stack of candidates x[n, employee, day, shift] is scored in
+    one call. Soft penalties reproduce ConstraintManager's objective term by term.
+    """
+
+    def __init__(self, data: SolverInput):
+        self.data = data
+        self.emp_index = {emp.id: i for i, emp in enumerate(data.employees)}
+        self.shift_index = {s.id: i for i, s in enumerate(data.shifts)}
+        self.shape = (len(data.employees), data.num_days, len(data.shifts))
+        num_emps, num_days, num_shifts = self.shape
+        weights = data.weights or WeightsSnapshot()  # Same defaults as ShiftOptimizer
+
+        self.demand = np.array([s.num_staff for s in data.shifts], dtype=np.int32)
+        # Cells whose demand is checked (all of them unless this is a decomposition sub-problem)
+        self.demand_mask = np.ones((num_days, num_shifts), dtype=bool)
+        if data.demand_cells is not None:
+            self.demand_mask[:] = False
+            for day, shift_id in data.demand_cells:
+                if shift_id in self.shift_index and 0 <= day < num_days:
+                    self.demand_mask[day, self.shift_index[shift_id]] = True
+
+        # Weekly limits and target (only employees with settings are constrained)
+        settings = data.settings_by_employee
+        self.has_settings = np.zeros(num_emps, dtype=bool)
+        self.min_shifts = np.zeros(num_emps, dtype=np.int32)
+        self.max_shifts = np.zeros(num_emps, dtype=np.int32)
+        for emp_id, i in self.emp_index.items():
+            s = settings.get(emp_id)
+            if s is not None:
+                self.has_settings[i] = True
+                self.min_shifts[i] = s.min_shifts_per_week
+                self.max_shifts[i] = s.max_shifts_per_week
+        self.target = (self.min_shifts + self.max_shifts) // 2
+
+        # Weekly requests
+        self.cannot_work = np.zeros(self.shape, dtype=bool)
+        self.must_work = np.zeros(self.shape, dtype=bool)
+        for c in data.constraints:
+            cell = self._cell(c.employee_id, c.day, c.shift_id)
+            if cell is None:
+                continue
+            if c.kind == CANNOT_WORK:
+                self.cannot_work[cell] = True
+            elif c.kind == MUST_WORK:
+                self.must_work[cell] = True
+
+        # Rest rules from the same conflict graph as ConstraintManager: (day, shift) index
+        # pairs inside the week, plus per-employee cells too close to last week's shifts
+        conflicts = ConflictGraph(data.shifts, num_days)
+        self.hard_pairs = self._pair_indices(conflicts.within_week(hard=True))
+        self.soft_pairs = self._pair_indices(conflicts.within_week(hard=False))
+        self.rest_blocked = np.zeros(self.shape, dtype=bool)
+        self.rest_gap_weights = np.zeros(self.shape, dtype=np.int64)
+        for emp in data.employees:
+            e = self.emp_index[emp.id]
+            for c in conflicts.from_history(history_cells(emp, data.shifts)):
+                day, shift_id = c.second
+                if c.hard:
+                    self.rest_blocked[e, day, self.shift_index[shift_id]] = True
+                else:
+                    self.rest_gap_weights[e, day, self.shift_index[shift_id]] += weights.rest_gap
+        self.rest_gap_weight = weights.rest_gap
+        self.target_weight = weights.target_shifts
+
+        # History flags used by the diagnostics (last shift of the day = night)
+        self.last_fri_night = np.array([e.worked_last_fri_night for e in data.employees], dtype=bool)
+        self.last_sat_night = np.array([e.worked_last_sat_night for e in data.employees], dtype=bool)
+
+    def _pair_indices(self, conflicts):
+        """(first day, first shift, second day, second shift) index arrays of conflict pairs."""
+        rows = [(c.first[0], self.shift_index[c.first[1]], c.second[0], self.shift_index[c.second[1]])
+                for c in conflicts]
+        return tuple(np.array(column, dtype=np.intp) for column in zip(*rows)) if rows else None
+
+    @staticmethod
+    def _pairs_worked(x, pairs):
+        """Number of conflict pairs worked by the same employee, per leading index of x."""
+        if pairs is None:
+            return np.zeros(x.shape[:-3], dtype=np.int64)
+        d1, s1, d2, s2 = pairs
+        return (x[..., d1, s1] * x[..., d2, s2]).sum(axis=(-1, -2))
+
+    def _cell(self, emp_id, day, shift_id):
+        e = self.emp_index.get(emp_id)
+        s = self.shift_index.get(shift_id)
+        if e is None or s is None or not 0 <= day < self.data.num_days:
+            return None
+        return e, day, s
+
+    # ------------------------------------------
+    #   Building arrays
+    # ------------------------------------------
+
+    def to_array(self, assignments):
+        """
+        Converts assignment rows to x[employee, day, shift].
+        Rows are dicts with employee_id, shift_id and either day_index or date.
+        Rows that fall outside the snapshot (unknown employee/shift/day) are ignored.
+        """
+        x = np.zeros(self.shape, dtype=np.int8)
+        start_date = self.data.start_date
+        for row in assignments:
+            day = row["day_index"] if "day_index" in row else (row["date"] - start_date).days
+            cell = self._cell(row["employee_id"], day, row["shift_id"])
+            if cell is not None:
+                x[cell] = 1
+        return x
+
+    def load_assignments(self, session, draft_id=None):
+        """Reads the week's live assignments (or a draft) into an array."""
+        from models import Assignment, DraftAssignment
+
+        end_date = self.data.start_date + timedelta(days=self.data.num_days)
+        if draft_id is not None:
+            query = session.query(DraftAssignment.employee_id, DraftAssignment.shift_id, DraftAssignment.date
+                                  ).filter(DraftAssignment.draft_id == draft_id)
+        else:
+            # A jointly solved snapshot spans the sites owning its shifts
+            workplace_ids = {s.workplace_id for s in self.data.shifts if s.workplace_id is not None}
+            workplace_ids.add(self.data.workplace_id)
+            query = session.query(Assignment.employee_id, Assignment.shift_id, Assignment.date).filter(
+                Assignment.workplace_id.in_(workplace_ids),
+                Assignment.date >= self.data.start_date,
+                Assignment.date < end_date,
+            )
+        return self.to_array({"employee_id": e, "shift_id": s, "date": d} for e, s, d in query)
+
+    # ------------------------------------------
+    #   Evaluation
+    # ------------------------------------------
+
+    def evaluate(self, x):
+        """
+        :param x: Array [..., employee, day, shift] of 0/1
+        :return: Dict of arrays shaped like x's leading axes:
+                 hard-rule violation counts (HARD_RULES), 'hard_total', per-family penalties,
+                 'objective' and diagnostics ('rest_gap_pairs', 'consecutive_nights')
+        """
+        x = np.asarray(x, dtype=np.int32)
+        per_cell = x.sum(axis=-3)           # [..., day, shift]
+        per_day = x.sum(axis=-1)            # [..., employee, day]
+        totals = per_day.sum(axis=-1)       # [..., employee]
+
+        result = {
+            "demand": (np.abs(per_cell - self.demand) * self.demand_mask).sum(axis=(-1, -2)),
+            "one_shift_per_day": np.maximum(per_day - 1, 0).sum(axis=(-1, -2)),
+            "weekly_max": (np.maximum(totals - self.max_shifts, 0) * self.has_settings).sum(axis=-1),
+            "weekly_min": (np.maximum(self.min_shifts - totals, 0) * self.has_settings).sum(axis=-1),
+            "cannot_work": (x * self.cannot_work).sum(axis=(-1, -2, -3)),
+            "must_work": ((1 - x) * self.must_work).sum(axis=(-1, -2, -3)),
+            "min_rest": self._pairs_worked(x, self.hard_pairs) + (x * self.rest_blocked).sum(axis=(-1, -2, -3)),
+        }
+        result["hard_total"] = sum(result[rule] for rule in HARD_RULES)
+
+        # Soft penalties, identical to ConstraintManager's objective terms
+        short_rests = self._pairs_worked(x, self.soft_pairs)
+        result[REST_GAP] = short_rests * self.rest_gap_weight + (x * self.rest_gap_weights).sum(axis=(-1, -2, -3))
+        result[TARGET_SHIFTS] = (np.abs(totals - self.target) * self.has_settings).sum(axis=-1) * self.target_weight
+        result["objective"] = result[REST_GAP] + result[TARGET_SHIFTS]
+
+        result.update(self._diagnostics(x))
+        # Every conflict pair worked inside the week, hard or soft
+        result["rest_gap_pairs"] = short_rests + self._pairs_worked(x, self.hard_pairs)
+        return result
+
+    def _diagnostics(self, x):
+        """Rule counts the solver does not (yet) penalize, reported for planners."""
+        num_days, num_shifts = self.shape[1], self.shape[2]
+
+        # Three nights in a row, including sequences continued from last Friday/Saturday
+        nights = x[..., num_shifts - 1] if num_shifts else np.zeros(x.shape[:-1], dtype=np.int32)
+        triples = (nights[..., :-2] * nights[..., 1:-1] * nights[..., 2:]).sum(axis=(-1, -2))
+        both_nights = self.last_fri_night & self.last_sat_night
+        only_sat = self.last_sat_night & ~self.last_fri_night
+        carried = (nights[..., 0] * both_nights).sum(axis=-1)
+        if num_days > 1:
+            carried = carried + (nights[..., 0] * nights[..., 1] * only_sat).sum(axis=-1)
+
+        return {"consecutive_nights": triples + carried}
+
+    def score(self, x):
+        """Objective of one or many schedules (only meaningful where hard_total == 0)."""
+        return self.evaluate(x)["objective"]
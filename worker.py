@@ -0,0 +1,119 @@
+import os
+import signal
+import socket
+import threading
+
+from database import session_scope
+from models import QueuedSolveJob
+import job_queue
+import config
+
+
+class _Heartbeat(threading.Thread):
+    """Extends the running job's lease every third of its length, with its own session."""
+
+    def __init__(self, job_id, token, lease_seconds):
+        super().__init__(name=f"heartbeat-{job_id}", daemon=True)
+        self.job_id = job_id
+        self.token = token
+        self.lease_seconds = lease_seconds
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                with session_scope() as session:
+                    if not job_queue.heartbeat(session, self.job_id, self.token, self.lease_seconds):
+                        print(f"Job {self.job_id}: lease lost, finishing the solve anyway")
+                        return
+            except Exception as e:
+                # Transient DB error (e.g. locked): the next beat still comes before the lease ends
+                print(f"Heartbeat for job {self.job_id} failed: {e}")
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def run_job(job_id, token, lease_seconds, num_workers=None):
+    """
+    Solves one claimed job and records the outcome. solve_workplace_week saves the results only
+    after re-checking the lease in the same transaction, so a worker whose lease expired and
+    was re-claimed never overwrites the week (its inputs may have changed since).
+    :return: The job's final JobStatus value (or 'lost' when another worker owns it now)
+    """
+    from scheduling import solve_workplace_week
+
+    with session_scope() as session:
+        job = session.get(QueuedSolveJob, job_id)
+        workplace_id, start_date, attempt = job.workplace_id, job.start_date, job.attempts
+    print(f"--- Job {job_id}: workplace {workplace_id}, week {start_date} (attempt {attempt}) ---")
+
+    heartbeat = _Heartbeat(job_id, token, lease_seconds)
+    heartbeat.start()
+    try:
+        with session_scope() as session:
+            outcome = solve_workplace_week(
+                session, workplace_id, start_date, num_workers=num_workers,
+                save_guard=lambda s: job_queue.hold(s, job_id, token, lease_seconds))
+    except Exception as e:
+        heartbeat.stop()
+        with session_scope() as session:
+            status = job_queue.fail(session, job_id, token, e)
+        print(f"❌ Job {job_id} failed: {e} -> {status.value if status else 'lost'}")
+        return status.value if status else "lost"
+
+    heartbeat.stop()
+    if outcome.get("saved") is False:
+        print(f"Job {job_id}: lease lost while solving, results discarded (another worker owns it now)")
+        return "lost"
+    objective = outcome["objective"]
+    with session_scope() as session:
+        done = job_queue.complete(session, job_id, token, outcome["status"],
+                                  int(objective) if objective is not None else None)
+    if not done:
+        print(f"Job {job_id}: lease lost while solving, another worker owns it now")
+        return "lost"
+    print(f"✅ Job {job_id}: {outcome['status']}, objective {objective}")
+    return "succeeded"
+
+
+def run_worker(worker_id=None, lease_seconds=None, poll_seconds=None, num_workers=None,
+               exit_when_idle=False, stop_event=None):
+    """
+    Claims and solves queued jobs until stopped (SIGTERM/SIGINT finish the current job first).
+    Start one per container or host; they coordinate only through the database.
+    :param worker_id: Recorded on claimed jobs (default: hostname:pid)
+    :param num_workers: CP-SAT workers per solve (default: solver default)
+    :param exit_when_idle: Return as soon as the queue is empty (batch / cron use)
+    :return: Number of jobs processed
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    lease_seconds = lease_seconds or config.JOB_LEASE_SECONDS
+    poll_seconds = poll_seconds or config.WORKER_POLL_SECONDS
+    stop = stop_event or threading.Event()
+
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: stop.set())
+
+    print(f"Worker {worker_id} polling the solve queue")
+    processed = 0
+    while not stop.is_set():
+        try:
+            with session_scope() as session:
+                claimed = job_queue.claim(session, worker_id, lease_seconds)
+        except Exception as e:
+            # Transient DB error (e.g. locked): not an empty queue, so even --drain retries
+            print(f"Claim failed, retrying in {poll_seconds}s: {e}")
+            stop.wait(poll_seconds)
+            continue
+        if claimed is None:
+            if exit_when_idle:
+                break
+            stop.wait(poll_seconds)
+            continue
+        run_job(*claimed, lease_seconds, num_workers=num_workers)
+        processed += 1
+    print(f"Worker {worker_id} stopped after {processed} job(s)")
+    return processed